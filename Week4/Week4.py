@@ -6,6 +6,7 @@ try the exercises in Lab 03
 
 import math
 import random
+from collections import deque
 from typing import override
 
 from co2114.optimisation.planning import *
@@ -22,47 +23,6 @@ class HospitalPlacementEnv(HospitalPlacement):
     def percept(self, agent: Agent) -> tuple[State, list[State]]:
         return self.state, self.neighbours
 
-    @property
-    def state(self) -> State:
-        return {
-            "hospitals": {
-                thing: thing.location
-                for thing in self.things
-                if isinstance(thing, Hospital)
-            },
-            "houses": {
-                thing: thing.location
-                for thing in self.things
-                if isinstance(thing, House)
-            },
-            "bounds": {
-                "xmin": 0,
-                "xmax": self.width - 1,
-                "ymin": 0,
-                "ymax": self.height - 1,
-            },
-        }
-
-    @property
-    def neighbours(self) -> list[State]:
-        neighbours = []
-
-        for hospital, location in self.state["hospitals"].items():
-
-            for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-
-                new_location = (location[0] + dx, location[1] + dy)
-
-                if self.is_inbounds(new_location):
-
-                    candidate = self.state.copy()
-                    candidate["hospitals"] = candidate["hospitals"].copy()
-                    candidate["hospitals"][hospital] = new_location
-
-                    neighbours.append(candidate)
-
-        return neighbours
-
     @override
     def execute_action(self, agent: HospitalOptimiser, action: tuple[str, State]) -> None:
         command, state = action
@@ -87,19 +47,28 @@ class HospitalPlacementEnv(HospitalPlacement):
     @override
     def utility(self, state: State) -> Numeric:
 
-        houses: dict[House, Location] = state["houses"]
-        hospitals: dict[Hospital, Location] = state["hospitals"]
+        houses = as_array(state["houses"])
+        hospitals = as_array(state["hospitals"])
 
-        max_dist = 0
-        for house in houses:
-            house_loc= houses[house]
-            nearest = min(manhattan(house_loc, hospitals[h]) for h in hospitals)
-            if nearest > max_dist:
-                max_dist = nearest
-        return -max_dist
+        if state.get("travel") is not None:  # obstacles, travel around them
+            return -state["travel"].nearest(hospitals).max()
+        return -max_distance(houses, hospitals)
 
     
 class HillClimbOptimiser(HospitalOptimiser):
+
+    def __init__(self, strategy: str = "steepest"):
+        """ Hill climbing, moving to a better neighbour until none is found
+
+        :param strategy: "steepest" scores every neighbour and moves to the
+            best, "first" scores neighbours in random order and moves to the
+            first that improves on the current state
+        """
+        super().__init__()
+        if strategy not in ("steepest", "first"):
+            raise ValueError(f"{self}: unknown strategy {strategy}")
+        self.strategy = strategy
+
     @override
     def program(self, 
                 percepts:tuple[State, list[State]]) -> tuple[str, State | None]:
@@ -108,14 +77,82 @@ class HillClimbOptimiser(HospitalOptimiser):
         objective = self.utility(state)
  
         print(f"{self}: current distance {-objective}")
-        print(f"{self}: possible new objectives {[-self.utility(n) for n in neighbours]}")
-        
-        choice = self.maximise_utility(neighbours)
+
+        match self.strategy:
+            case "steepest":  # evaluate every neighbour once, take the best
+                objectives = [self.utility(n) for n in neighbours]
+                print(f"{self}: possible new objectives {[-u for u in objectives]}")
+
+                choice, best = None, objective
+                for neighbour, u in zip(neighbours, objectives):
+                    if u > best:
+                        choice, best = neighbour, u
+            case "first":  # take the first improving neighbour found
+                choice = None
+                for neighbour in random.sample(neighbours, len(neighbours)):
+                    if self.utility(neighbour) > objective:
+                        choice = neighbour
+                        break
  
-        if self.utility(choice) > objective:
+        if choice is not None:
             return ("explore", choice)
         else:
             return ("done", None)
+
+
+class TabuSearchOptimiser(HospitalOptimiser):
+    """ Tabu search, moving to the best neighbour not visited recently
+
+    Recently visited layouts are tabu, unless moving to one beats the best
+    layout found so far (aspiration). Finishes on the best layout found.
+    """
+
+    def __init__(self, tenure: int = 10, patience: int = 20):
+        """ Tabu search with an empty tabu list
+
+        :param tenure: # of recent layouts kept tabu
+        :param patience: # of steps without a new best before finishing
+        """
+        super().__init__()
+        self.tabu = deque(maxlen=tenure)  # recently visited layouts
+        self.patience = patience  # steps allowed without a new best
+        self.best, self.best_utility = None, -math.inf
+        self.since_best = 0
+
+    @staticmethod
+    def layout(state: State) -> frozenset[Location]:
+        return frozenset(state["hospitals"].values())
+
+    @override
+    def program(self,
+                percepts: tuple[State, list[State]]) -> tuple[str, State | None]:
+
+        state, neighbours = percepts
+        objective = self.utility(state)
+        self.tabu.append(self.layout(state))
+
+        if objective > self.best_utility:
+            self.best, self.best_utility = state, objective
+            self.since_best = 0
+        else:
+            self.since_best += 1
+
+        print(f"{self}: current distance {-objective}, best {-self.best_utility}")
+
+        if self.since_best >= self.patience:
+            return ("done", self.best)
+
+        # best non-tabu neighbour, or a tabu one that beats the best so far
+        choice, best = None, -math.inf
+        for neighbour in neighbours:
+            u = self.utility(neighbour)
+            if u > best and (self.layout(neighbour) not in self.tabu
+                             or u > self.best_utility):
+                choice, best = neighbour, u
+
+        if choice is None:
+            return ("done", self.best)
+        return ("explore", choice)
         
 class SimulatedAnnealingOptimiser(HospitalOptimiser):
 
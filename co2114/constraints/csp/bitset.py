@@ -0,0 +1,393 @@
+from collections import deque
+from copy import deepcopy
+
+from typing import TypeVar, Hashable
+
+# from ..csp import Variable, CSP, Factor # avoid circular imports
+Variable = TypeVar("Variable")
+CSP = TypeVar("CSP")
+Factor = TypeVar("Factor")
+
+Bitset = int  # bit i set if i-th value of a variable's domain is possible
+
+
+def bits(mask:Bitset) -> list[int]:
+    """ Indices of set bits in a bitset, lowest first """
+    indices = []
+    while mask:
+        low = mask & -mask  # lowest set bit
+        indices.append(low.bit_length() - 1)
+        mask ^= low
+    return indices
+
+
+def _ordered(domain:set[Hashable]) -> list[Hashable]:
+    """ Values of a domain in a fixed order, sorted if possible """
+    try:
+        return sorted(domain)
+    except TypeError:
+        return list(domain)
+
+
+class BitsetCSP:
+    """ Constraint propagation engine over integer bitset domains.
+
+    Each variable's domain is fixed to an ordered list of values when the
+    engine is built, and its current domain is an int with one bit per value.
+    Binary constraints become pairs of arcs with integer ids. For each arc
+    (A, B) a support table gives, for every value of A, the bitset of values
+    of B that satisfy the constraint, so revising an arc is a few bitwise
+    ANDs rather than re-evaluating the constraint. The AC-3 queue holds arc
+    ids with an O(1) in-queue flag.
+
+    Global constraints that provide a `propagator(engine, scope)` method
+    are not decomposed: their Propagator is scheduled alongside the arcs
+    whenever a domain in its scope changes.
+
+    Every domain change is recorded on a trail (undo log), so a search can
+    return to an earlier point with `undo(mark)` instead of copying domains.
+    Domains are only written back to the CSP's variables by `apply`.
+    """
+    def __init__(self, csp:CSP, log:bool=False) -> None:
+        """ Build bitset domains and support tables for a CSP.
+
+        :param csp: The constraint satisfaction problem
+        :param log: If True, prints log messages during propagation
+        """
+        self.csp = csp
+        self.log = log
+        self.variables:list[Variable] = list(csp.variables)
+        self.index:dict[int, int] = {  # variable equality is by value, use id
+            id(variable): i for i, variable in enumerate(self.variables)}
+        self.values:list[list[Hashable]] = [
+            _ordered(variable.domain) for variable in self.variables]
+        self.position:list[dict[Hashable, int]] = [
+            {value: j for j, value in enumerate(values)}
+                for values in self.values]
+
+        self.domains:list[Bitset] = []
+        for i, variable in enumerate(self.variables):
+            if variable.is_assigned:  # assigned variables are singletons
+                self.domains.append(1 << self.position[i][variable.value])
+            else:
+                self.domains.append((1 << len(self.values[i])) - 1)
+
+        self.trail:list[tuple[int, Bitset]] = []  # (variable, previous domain)
+
+        self.unary:list[tuple[Factor, int]] = []
+        self.nary:list[list[Factor]] = [[] for _ in self.variables]  # global factors by variable
+        self.arc_factor:list[Factor] = []
+        self.arc_x:list[int] = []  # variable revised by arc
+        self.arc_y:list[int] = []  # variable supporting arc
+        self.support:list[list[Bitset]] = []
+        self.watchers:list[list[int]] = [[] for _ in self.variables]  # arcs into variable
+        self.outgoing:list[list[int]] = [[] for _ in self.variables]  # arcs out of variable
+        self.propagators:list[Propagator] = []
+        self.triggers:list[list[int]] = [[] for _ in self.variables]  # propagators watching variable
+
+        for constraint in csp.constraints:
+            if constraint.is_unary:
+                variable, = constraint.variables
+                self.unary.append((constraint, self.index[id(variable)]))
+            elif constraint.is_binary:
+                a, b = (self.index[id(v)] for v in constraint.variables)
+                self._add_arc(constraint, a, b)
+                self._add_arc(constraint, b, a)
+            else:
+                scope = [self.index[id(v)] for v in constraint.variables]
+                if hasattr(constraint, "propagator"):
+                    self._add_propagator(constraint.propagator(self, scope))
+                    continue
+                for i in scope:
+                    self.nary[i].append(constraint)
+
+        self.queue:deque[int] = deque()
+        self.in_queue = bytearray(len(self.arc_x))
+        self.agenda:deque[int] = deque()  # propagators waiting to run
+        self.on_agenda = bytearray(len(self.propagators))
+
+
+    def _add_arc(self, factor:Factor, x:int, y:int) -> None:
+        """ Register the arc revising variable x against y for a binary factor.
+
+        :param factor: The binary factor between variables x and y
+        :param x: Index of variable to be revised
+        :param y: Index of supporting variable
+        """
+        arc = len(self.arc_x)
+        self.arc_factor.append(factor)
+        self.arc_x.append(x)
+        self.arc_y.append(y)
+        self.support.append(self._supports(factor, x, y))
+        self.watchers[y].append(arc)
+        self.outgoing[x].append(arc)
+
+
+    def _add_propagator(self, propagator:"Propagator") -> None:
+        """ Register a global constraint propagator, triggered by its scope.
+
+        :param propagator: Propagator bound to this engine
+        """
+        p = len(self.propagators)
+        self.propagators.append(propagator)
+        for i in set(propagator.scope):
+            self.triggers[i].append(p)
+
+
+    def _supports(self, factor:Factor, x:int, y:int) -> list[Bitset]:
+        """ Support table for an arc, evaluating the factor once per pair of values.
+
+        :return: list over values of x of bitsets of supporting values of y
+        """
+        A, B = self.variables[x], self.variables[y]
+        saved = A.value, B.value
+        table = []
+        for value in self.values[x]:
+            A.value = value  # temporarily assign A
+            mask = 0
+            for j, _value in enumerate(self.values[y]):
+                B.value = _value  # temporarily assign B
+                if factor.is_satisfied: mask |= 1 << j
+            table.append(mask)
+        A.value, B.value = saved  # restore any original assignment
+        return table
+
+
+    def name(self, i:int) -> str:
+        """ Name of variable i, for logging. """
+        return str(self.variables[i].name)
+
+
+    def domain(self, i:int) -> list[Hashable]:
+        """ Current domain of variable i as a list of values. """
+        return [self.values[i][j] for j in bits(self.domains[i])]
+
+
+    def set_domain(self, i:int, domain:Bitset) -> None:
+        """ Change the domain of variable i, recording the old domain on the trail.
+
+        :param i: Index of variable
+        :param domain: New bitset domain
+        """
+        if domain != self.domains[i]:
+            self.trail.append((i, self.domains[i]))
+            self.domains[i] = domain
+
+
+    def mark(self) -> int:
+        """ Current position of the trail, to undo back to later. """
+        return len(self.trail)
+
+
+    def undo(self, mark:int) -> None:
+        """ Restore every domain changed since the trail was at mark.
+
+        :param mark: Position of the trail returned by `mark`
+        """
+        while len(self.trail) > mark:
+            i, domain = self.trail.pop()
+            self.domains[i] = domain
+
+
+    def make_node_consistent(self) -> bool:
+        """ Enforce unary constraints on the bitset domains.
+
+        :return: False if any domain is wiped out, else True
+        """
+        for factor, i in self.unary:
+            variable = self.variables[i]
+            if variable.is_assigned: continue  # ignore any assigned variables
+            domain = self.domains[i]
+            for j in bits(domain):
+                variable.value = self.values[i][j]
+                if not factor.is_satisfied:
+                    domain &= ~(1 << j)
+                variable.value = None
+            self.set_domain(i, domain)
+            if not self.domains[i]: return False
+        return True
+
+
+    def revise(self, arc:int) -> bool:
+        """ Remove values of the arc's variable x with no support in y.
+
+        :param arc: Id of the arc to revise
+        :return: True if the domain of x was reduced
+        """
+        x, y = self.arc_x[arc], self.arc_y[arc]
+        domain, other, support = self.domains[x], self.domains[y], self.support[arc]
+        revised = domain
+        for j in bits(domain):
+            if not support[j] & other:  # no valid value of y for x=value
+                revised &= ~(1 << j)
+        if revised == domain: return False
+        self.set_domain(x, revised)
+        return True
+
+
+    def push(self, arc:int) -> None:
+        """ Add an arc to the queue unless it is already there. """
+        if not self.in_queue[arc]:
+            self.in_queue[arc] = 1
+            self.queue.append(arc)
+
+
+    def schedule(self, p:int) -> None:
+        """ Add a propagator to the agenda unless it is already there. """
+        if not self.on_agenda[p]:
+            self.on_agenda[p] = 1
+            self.agenda.append(p)
+
+
+    def propagate(self, p:int) -> bool:
+        """ Run propagator p once.
+
+        :param p: Id of the propagator
+        :return: False if the propagator fails or wipes out a domain, else True
+        """
+        propagator = self.propagators[p]
+        if self.log:
+            print(f"propagating {propagator} over {[self.name(i) for i in propagator.scope]}")
+        mark = self.mark()
+        if not propagator.propagate(): return False
+        return all(self.domains[i] for i, _ in self.trail[mark:])
+
+
+    def _fail(self) -> bool:
+        """ Empty the queue and agenda after a wipe out. """
+        self.queue.clear()
+        self.in_queue = bytearray(len(self.arc_x))
+        self.agenda.clear()
+        self.on_agenda = bytearray(len(self.propagators))
+        return False
+
+
+    def ac3(self,
+            arcs:list[int] | None = None,
+            propagators:list[int] | None = None) -> bool:
+        """ AC-3 over bitset domains, with global constraint propagators.
+
+        Arcs are revised first; propagators run when the arc queue is empty,
+        and any domains they change requeue the arcs and other propagators
+        watching those variables.
+
+        :param arcs: Ids of arcs to start from
+        :param propagators: Ids of propagators to start from
+        :return: False if a domain is wiped out, else True
+
+        If neither arcs nor propagators are given, starts from all of them.
+        """
+        if arcs is None and propagators is None:
+            arcs, propagators = range(len(self.arc_x)), range(len(self.propagators))
+        for arc in (arcs or ()):
+            self.push(arc)
+        for p in (propagators or ()):
+            self.schedule(p)
+
+        while self.queue or self.agenda:
+            if not self.queue:  # arcs are cheap, so propagators go last
+                p = self.agenda.popleft()
+                self.on_agenda[p] = 0
+                mark = self.mark()
+                if not self.propagate(p):
+                    return self._fail()
+                for x in {x for x, _ in self.trail[mark:]}:  # changed variables
+                    for arc in self.watchers[x]:
+                        self.push(arc)
+                    for other in self.triggers[x]:
+                        if other != p: self.schedule(other)
+                continue
+
+            arc = self.queue.popleft()
+            self.in_queue[arc] = 0
+            x, y = self.arc_x[arc], self.arc_y[arc]
+            if self.log:
+                print(f"considering arc from {self.name(x)} to {self.name(y)}")
+                print(f"  before: {self.name(x)} in {self.domain(x)}, {self.name(y)} in {self.domain(y)}")
+            if not self.revise(arc):
+                continue
+            if self.log:
+                print(f"  after: {self.name(x)} in {self.domain(x)}, {self.name(y)} in {self.domain(y)}")
+            if not self.domains[x]:  # domain wiped out, failure
+                return self._fail()
+            for other in self.watchers[x]:  # arcs pointing to x, except from y
+                if self.arc_x[other] != y:
+                    self.push(other)
+            for p in self.triggers[x]:
+                self.schedule(p)
+        return True
+
+
+    def apply(self) -> None:
+        """ Write the bitset domains back to the domains of the CSP's variables. """
+        for i, variable in enumerate(self.variables):
+            if variable.is_assigned: continue
+            keep = set(self.domain(i))
+            for value in [value for value in variable.domain if value not in keep]:
+                variable.domain.remove(value)
+
+
+class Propagator:
+    """ Base class for global constraint propagators run by BitsetCSP.
+
+    A propagator is bound to one engine and a scope of variable indices.
+    `propagate` narrows domains with `engine.set_domain`, so changes are
+    trailed and requeue dependent arcs and propagators. Propagators are
+    expected to reach their own fixpoint, as they are not rerun for the
+    changes they make themselves.
+    """
+    def __init__(self, engine:BitsetCSP, scope:list[int]) -> None:
+        """ Constructor for Propagator
+
+        :param engine: Propagation engine holding the domains
+        :param scope: Indices of the constrained variables
+        """
+        self.engine = engine
+        self.scope = scope
+
+    def __repr__(self) -> str:
+        """ String representation of the propagator """
+        return self.__class__.__name__
+
+    def propagate(self) -> bool:
+        """ Remove unsupported values from the domains in scope.
+
+        :return: False if the constraint cannot be satisfied, else True
+        """
+        raise NotImplementedError
+
+
+def ac3(csp:CSP, log:bool=False, inplace:bool=True) -> CSP | bool | None:
+    """ AC-3 algorithm for enforcing arc consistency on a CSP, using bitset domains.
+
+    Drop-in replacement for `util.ac3`.
+
+    :param csp: The constraint satisfaction problem to enforce arc consistency on
+    :param log: If True, prints log messages during processing
+    :param inplace: If True, modifies the given CSP, otherwise returns a new CSP
+    :return: The modified CSP if inplace is False, True if inplace is True and successful
+    """
+    if not inplace: csp = deepcopy(csp)  # work on a copy if not inplace
+
+    engine = BitsetCSP(csp, log=log)
+    if not engine.ac3():
+        return False if inplace else None  # no possible solution
+    engine.apply()
+    return True if inplace else csp
+
+
+def make_node_consistent(csp:CSP, inplace:bool=True) -> CSP | None:
+    """ Makes the CSP node consistent by enforcing unary constraints, using bitset domains.
+
+    Drop-in replacement for `util.make_node_consistent`.
+
+    :param csp: The constraint satisfaction problem to make node consistent
+    :param inplace: If True, modifies the given CSP, otherwise returns a new CSP
+    :return: The modified CSP if inplace is False, otherwise None
+    """
+    if not inplace: csp = deepcopy(csp)
+
+    engine = BitsetCSP(csp)
+    engine.make_node_consistent()
+    engine.apply()
+    if not inplace: return csp
@@ -0,0 +1,269 @@
+from collections import deque
+from collections.abc import Iterable
+
+from . import Variable, Factor
+from .bitset import BitsetCSP, Propagator, bits
+from .util import alldiff
+
+from typing import Literal, override
+
+Comparison = Literal["==", "<=", ">="]
+
+
+def _components(n:int, successors:list[list[int]]) -> list[int]:
+    """ Strongly connected components of a directed graph (iterative Tarjan).
+
+    :param n: Number of nodes
+    :param successors: Successors of each node
+    :return: Component id of each node
+    """
+    index, low, component = [-1]*n, [0]*n, [-1]*n
+    stack, on_stack = [], [False]*n
+    counter = count = 0
+    for root in range(n):
+        if index[root] >= 0: continue
+        index[root] = low[root] = counter; counter += 1
+        stack.append(root); on_stack[root] = True
+        work = [(root, iter(successors[root]))]
+        while work:
+            node, edges = work[-1]
+            for other in edges:
+                if index[other] < 0:  # descend
+                    index[other] = low[other] = counter; counter += 1
+                    stack.append(other); on_stack[other] = True
+                    work.append((other, iter(successors[other])))
+                    break
+                elif on_stack[other]:
+                    low[node] = min(low[node], index[other])
+            else:  # all edges done
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:  # root of a component
+                    while True:
+                        other = stack.pop()
+                        on_stack[other] = False
+                        component[other] = count
+                        if other == node: break
+                    count += 1
+    return component
+
+
+class AllDifferentPropagator(Propagator):
+    """ Generalised arc consistency for all-different (Régin's algorithm).
+
+    Finds a maximum matching of variables to values, warm started from the
+    previous call, and fails if it does not cover every variable. A value
+    is then kept only if its edge is in the matching, lies on an even
+    alternating cycle (same strongly connected component), or lies on an
+    alternating path from a free value.
+    """
+    def __init__(self, engine:BitsetCSP, scope:list[int]) -> None:
+        """ Constructor for AllDifferentPropagator
+
+        :param engine: Propagation engine holding the domains
+        :param scope: Indices of the constrained variables
+        """
+        super().__init__(engine, scope)
+        ids = {}  # shared id for each distinct value across the scope
+        self.ids:list[list[int]] = [
+            [ids.setdefault(value, len(ids)) for value in engine.values[i]]
+                for i in scope]
+        self.n_values = len(ids)
+        self.match:list[int] = [-1] * len(scope)  # value id matched to each variable
+
+    def _augment(self, v:int, adjacent:list[list[int]], owner:list[int]) -> bool:
+        """ Match variable v along an augmenting path found by breadth first search.
+
+        :param v: Position of unmatched variable in scope
+        :param adjacent: Value ids in the domain of each variable
+        :param owner: Variable matched to each value id, or -1
+        :return: True if the matching was extended
+        """
+        parent = {}  # value id -> variable it was reached from
+        frontier = deque([v])
+        while frontier:
+            u = frontier.popleft()
+            for g in adjacent[u]:
+                if g in parent: continue
+                parent[g] = u
+                if owner[g] < 0:  # free value, flip the path
+                    while g >= 0:
+                        u = parent[g]
+                        g, self.match[u] = self.match[u], g
+                        owner[self.match[u]] = u
+                    return True
+                frontier.append(owner[g])
+        return False
+
+    @override
+    def propagate(self) -> bool:
+        engine, k = self.engine, len(self.scope)
+        domains = [engine.domains[i] for i in self.scope]
+        adjacent = [[ids[j] for j in bits(domain)]
+                        for ids, domain in zip(self.ids, domains)]
+
+        owner = [-1] * self.n_values
+        for v, g in enumerate(self.match):  # keep still valid pairs
+            if g >= 0 and g in adjacent[v] and owner[g] < 0:
+                owner[g] = v
+            else:
+                self.match[v] = -1
+        for v in range(k):
+            if self.match[v] < 0 and not self._augment(v, adjacent, owner):
+                return False  # more variables than available values
+
+        # variables 0..k-1, values k..k+n_values-1; matched edges run
+        #  variable -> value, others value -> variable
+        successors = [[k + g] for g in self.match] \
+                   + [[] for _ in range(self.n_values)]
+        for v, values in enumerate(adjacent):
+            for g in values:
+                if g != self.match[v]: successors[k + g].append(v)
+
+        reached = [False] * (k + self.n_values)  # alternating paths from free values
+        frontier = deque(k + g for g in range(self.n_values) if owner[g] < 0)
+        for node in frontier: reached[node] = True
+        while frontier:
+            for other in successors[frontier.popleft()]:
+                if not reached[other]:
+                    reached[other] = True
+                    frontier.append(other)
+        component = _components(k + self.n_values, successors)
+
+        for v, (i, ids, domain) in enumerate(zip(self.scope, self.ids, domains)):
+            keep = domain
+            for j in bits(domain):
+                g = ids[j]
+                if g != self.match[v] and not reached[k + g] \
+                        and component[v] != component[k + g]:
+                    keep &= ~(1 << j)
+            engine.set_domain(i, keep)
+        return True
+
+
+class LinearSumPropagator(Propagator):
+    """ Bounds consistency for sum(coefficient * variable) compared to a total.
+
+    Each term is bounded using the smallest and largest values left in the
+    other domains, repeated until no domain changes. Values must be numbers.
+    """
+    def __init__(self,
+                 engine:BitsetCSP,
+                 scope:list[int],
+                 coefficients:list[float],
+                 total:float,
+                 comparison:Comparison) -> None:
+        """ Constructor for LinearSumPropagator
+
+        :param engine: Propagation engine holding the domains
+        :param scope: Indices of the constrained variables
+        :param coefficients: Coefficient of each variable
+        :param total: Right hand side of the constraint
+        :param comparison: "==", "<=" or ">="
+        """
+        super().__init__(engine, scope)
+        self.coefficients = coefficients
+        self.total = total
+        self.comparison = comparison
+
+    def bounds(self, v:int) -> tuple[float, float]:
+        """ Smallest and largest value of the v-th term, given its domain """
+        i, c = self.scope[v], self.coefficients[v]
+        domain, values = self.engine.domains[i], self.engine.values[i]
+        low = c * values[(domain & -domain).bit_length() - 1]
+        high = c * values[domain.bit_length() - 1]
+        return (low, high) if low <= high else (high, low)
+
+    @override
+    def propagate(self) -> bool:
+        engine = self.engine
+        upper = self.comparison in ("==", "<=")
+        lower = self.comparison in ("==", ">=")
+        changed = True
+        while changed:
+            changed = False
+            terms = [self.bounds(v) for v in range(len(self.scope))]
+            smallest = sum(low for low, _ in terms)
+            largest = sum(high for _, high in terms)
+            if (upper and smallest > self.total) or (lower and largest < self.total):
+                return False
+            for v, (i, c) in enumerate(zip(self.scope, self.coefficients)):
+                low, high = terms[v]
+                most = self.total - (smallest - low) if upper else high
+                least = self.total - (largest - high) if lower else low
+                domain = keep = engine.domains[i]
+                for j in bits(domain):
+                    if not least <= c * engine.values[i][j] <= most:
+                        keep &= ~(1 << j)
+                if keep == domain: continue
+                if not keep: return False
+                engine.set_domain(i, keep)
+                changed = True
+        return True
+
+
+class AllDifferent(Factor):
+    """ All different global constraint, with a matching based propagator.
+
+    Equivalent to `Factor(alldiff, variables)`, but BitsetCSP propagates it
+    directly instead of relying on pairwise inequalities.
+    """
+    def __init__(self, variables:Iterable[Variable]) -> None:
+        """ Constructor for AllDifferent
+
+        :param variables: The variables that must all take different values
+        """
+        super().__init__(alldiff, variables)
+
+    def propagator(self, engine:BitsetCSP, scope:list[int]) -> Propagator:
+        """ Propagator for this constraint bound to an engine """
+        return AllDifferentPropagator(engine, scope)
+
+
+class LinearSum(Factor):
+    """ Linear constraint sum(coefficient * variable) compared to a total.
+
+    While some variables are unassigned the constraint is satisfied if the
+    total can still be reached from their domains.
+    """
+    def __init__(self,
+                 variables:Iterable[Variable],
+                 total:float,
+                 coefficients:Iterable[float] | None = None,
+                 comparison:Comparison = "==") -> None:
+        """ Constructor for LinearSum
+
+        :param variables: The variables in the sum
+        :param total: Right hand side of the constraint
+        :param coefficients: Coefficient of each variable, defaults to all 1
+        :param comparison: "==", "<=" or ">="
+        """
+        if comparison not in ("==", "<=", ">="):
+            raise ValueError(f"{self.__class__.__name__}: unknown comparison {comparison}")
+        super().__init__(self.check, variables)
+        self.total = total
+        self.coefficients = [1] * len(self.variables) \
+            if coefficients is None else list(coefficients)
+        if len(self.coefficients) != len(self.variables):
+            raise ValueError(f"{self}: need one coefficient per variable")
+        self.comparison = comparison
+
+    def check(self, *variables:Variable) -> bool:
+        """ Whether the total is (still) reachable """
+        smallest = largest = 0
+        for c, variable in zip(self.coefficients, variables):
+            values = [variable.value] if variable.is_assigned else variable.domain
+            if not values: return False
+            terms = [c * value for value in values]
+            smallest += min(terms)
+            largest += max(terms)
+        if self.comparison in ("==", "<=") and smallest > self.total: return False
+        if self.comparison in ("==", ">=") and largest < self.total: return False
+        return True
+
+    def propagator(self, engine:BitsetCSP, scope:list[int]) -> Propagator:
+        """ Propagator for this constraint bound to an engine """
+        return LinearSumPropagator(
+            engine, scope, self.coefficients, self.total, self.comparison)
@@ -0,0 +1,159 @@
+from . import CSPAgent, ConstraintSatisfactionProblem as CSP
+from .bitset import BitsetCSP, bits
+
+from typing import Literal, override
+
+Inference = Literal["forward", "mac"]
+
+
+class BacktrackingSolver:
+    """ Backtracking search over a BitsetCSP.
+
+    - variable ordering: minimum remaining values (MRV), ties broken by degree
+      (number of constraints with unassigned variables)
+    - value ordering: least constraining value (LCV)
+    - inference: forward checking, or maintaining arc consistency (MAC)
+    - backtracking restores domains from the engine's trail, not by copying
+
+    Global (n-ary) constraints with a propagator are propagated by the
+    engine, others are checked with `is_satisfied` as their variables are
+    assigned.
+    """
+    def __init__(self, inference:Inference = "mac", log:bool = False) -> None:
+        """ Constructor for BacktrackingSolver.
+
+        :param inference: "forward" for forward checking or "mac" to maintain arc consistency
+        :param log: If True, prints each assignment and backtrack
+        """
+        if inference not in ("forward", "mac"):
+            raise ValueError(f"{self}: unknown inference {inference}")
+        self.inference = inference
+        self.log = log
+        self.nodes = 0  # assignments tried in the last solve
+        self.backtracks = 0
+
+
+    def __repr__(self) -> str:
+        """ String representation of the solver. """
+        return self.__class__.__name__
+
+
+    def select_variable(self, engine:BitsetCSP, unassigned:set[int]) -> int:
+        """ Unassigned variable with fewest remaining values, then highest degree.
+
+        :param engine: Propagation engine holding current domains
+        :param unassigned: Indices of unassigned variables
+        :return: Index of chosen variable
+        """
+        def degree(i:int) -> int:
+            return sum(engine.arc_y[arc] in unassigned for arc in engine.outgoing[i]) \
+                 + len(engine.nary[i]) + len(engine.triggers[i])
+        return min(unassigned,
+                   key=lambda i: (engine.domains[i].bit_count(), -degree(i)))
+
+
+    def order_values(self,
+                     engine:BitsetCSP,
+                     i:int,
+                     unassigned:set[int]) -> list[int]:
+        """ Values of variable i, least constraining first.
+
+        A value constrains more the more values it removes from the domains
+        of unassigned neighbours, read directly from the support tables.
+
+        :param engine: Propagation engine holding current domains
+        :param i: Index of variable
+        :param unassigned: Indices of unassigned variables
+        :return: Value indices of variable i in order to try
+        """
+        arcs = [arc for arc in engine.outgoing[i] if engine.arc_y[arc] in unassigned]
+        def eliminated(j:int) -> int:
+            return sum((engine.domains[engine.arc_y[arc]]
+                            & ~engine.support[arc][j]).bit_count() for arc in arcs)
+        return sorted(bits(engine.domains[i]), key=eliminated)
+
+
+    def infer(self, engine:BitsetCSP, i:int, unassigned:set[int]) -> bool:
+        """ Propagate the assignment of variable i.
+
+        :param engine: Propagation engine holding current domains
+        :param i: Index of newly assigned variable
+        :param unassigned: Indices of unassigned variables
+        :return: False if a domain is wiped out or a constraint is violated
+        """
+        if not all(factor.is_satisfied for factor in engine.nary[i]):
+            return False
+        if self.inference == "mac":
+            return engine.ac3(engine.watchers[i], engine.triggers[i])
+        for arc in engine.watchers[i]:  # forward checking: neighbours only
+            if engine.arc_x[arc] in unassigned:
+                engine.revise(arc)
+                if not engine.domains[engine.arc_x[arc]]: return False
+        return all(engine.propagate(p) for p in engine.triggers[i])
+
+
+    def backtrack(self, engine:BitsetCSP, unassigned:set[int]) -> bool:
+        """ Recursive backtracking search.
+
+        :param engine: Propagation engine holding current domains
+        :param unassigned: Indices of unassigned variables
+        :return: True if a complete consistent assignment was found
+        """
+        if not unassigned: return True
+        i = self.select_variable(engine, unassigned)
+        variable = engine.variables[i]
+        unassigned.remove(i)
+        for j in self.order_values(engine, i, unassigned):
+            self.nodes += 1
+            mark = engine.mark()
+            engine.set_domain(i, 1 << j)
+            variable.value = engine.values[i][j]
+            if self.log: print(f"{self}: trying {variable.name} = {variable.value}")
+            if self.infer(engine, i, unassigned) \
+                    and self.backtrack(engine, unassigned):
+                return True
+            variable.value = None
+            engine.undo(mark)  # restore domains from trail
+            self.backtracks += 1
+        unassigned.add(i)
+        return False
+
+
+    def solve(self, csp:CSP) -> CSP | None:
+        """ Solve a CSP, assigning values to its variables.
+
+        :param csp: The constraint satisfaction problem to solve
+        :return: The solved CSP, or None if there is no solution
+        """
+        self.nodes = self.backtracks = 0
+        engine = BitsetCSP(csp)
+        assigned = [i for i, variable in enumerate(engine.variables)
+                        if variable.is_assigned]
+        unassigned = set(range(len(engine.variables))) - set(assigned)
+
+        if engine.make_node_consistent() and engine.ac3() \
+                and all(factor.is_satisfied for factor in csp.constraints) \
+                and self.backtrack(engine, unassigned):
+            if self.log: print(f"{self}: solved after {self.nodes} assignments")
+            return csp
+
+        for i in unassigned:  # leave CSP as it was
+            engine.variables[i].value = None
+        return None
+
+
+class BacktrackingAgent(CSPAgent):
+    """ CSP agent solving with backtracking search. """
+    def __init__(self, inference:Inference = "mac", log:bool = False) -> None:
+        """ Constructor for BacktrackingAgent.
+
+        :param inference: "forward" for forward checking or "mac" to maintain arc consistency
+        :param log: If True, prints each assignment and backtrack
+        """
+        super().__init__()
+        self.solver = BacktrackingSolver(inference, log)
+
+    @override
+    def solve(self, csp:CSP) -> CSP | None:
+        """ Actuator for solving CSP problems """
+        return self.solver.solve(csp)
@@ -0,0 +1,244 @@
+import numpy as np
+
+from .distances import Location
+
+from typing import Literal, TYPE_CHECKING
+
+if TYPE_CHECKING:  # planning loads the graphical environment stack
+    from .planning import HospitalPlacement
+
+Objective = Literal["sum", "max"]
+MOVES = np.array([(-1, 0), (1, 0), (0, -1), (0, 1)])  # one cell in each direction
+
+
+class BatchHospitalPlacement:
+    """ Batch of Hospital Placement instances stepped in lockstep
+
+    Holds B instances as stacked arrays rather than environments of Things:
+    - hospitals: (B, H, 2) hospital locations
+    - houses: (B, N, 2) house locations, padded where instances differ
+    - house_mask: (B, N) True for real (unpadded) houses
+    - occupied: (B, W, H) True for cells holding a house or hospital, and
+      for cells outside an instance's own bounds
+
+    Each step performs one steepest-ascent hill-climbing move per instance,
+    generating and scoring every single-cell hospital move for every
+    instance at once. Instances with no improving move are marked done.
+    """
+    def __init__(self,
+                 hospitals:np.ndarray,
+                 houses:np.ndarray,
+                 sizes:np.ndarray,
+                 house_mask:np.ndarray | None = None,
+                 objective:Objective = "sum") -> None:
+        """ Constructor for BatchHospitalPlacement
+
+        :param hospitals: (B, H, 2) array of hospital locations
+        :param houses: (B, N, 2) array of house locations
+        :param sizes: (B, 2) array of (width, height) for each instance
+        :param house_mask: optional (B, N) boolean array, False for padding houses
+        :param objective: "sum" to minimise total distance, "max" for worst-case distance
+        """
+        if objective not in ("sum", "max"):
+            raise ValueError(f"{self}: unknown objective {objective}")
+        self.hospitals = np.array(hospitals, dtype=int)
+        self.houses = np.array(houses, dtype=int)
+        self.sizes = np.array(sizes, dtype=int).reshape(-1, 2)
+        self.house_mask = np.ones(self.houses.shape[:2], dtype=bool) \
+            if house_mask is None else np.array(house_mask, dtype=bool)
+        self.objective = objective
+        self.done = np.zeros(len(self), dtype=bool)
+        self.counter = 0
+
+        # cells outside each instance's own bounds count as occupied
+        width, height = self.sizes.max(axis=0)
+        xs, ys = np.arange(width), np.arange(height)
+        self.occupied = (xs[None, :, None] >= self.sizes[:, 0, None, None]) \
+                      | (ys[None, None, :] >= self.sizes[:, 1, None, None])
+        b = np.arange(len(self))
+        for locations, mask in ((self.houses, self.house_mask),
+                                (self.hospitals, None)):
+            for i in range(locations.shape[1]):
+                keep = b if mask is None else b[mask[:, i]]
+                self.occupied[keep, locations[keep, i, 0], locations[keep, i, 1]] = True
+
+    def __len__(self) -> int:
+        """ Number of instances in the batch """
+        return len(self.hospitals)
+
+    def __repr__(self) -> str:
+        """ String representation of the batch """
+        return f"{self.__class__.__name__}[{len(self)}]"
+
+    @classmethod
+    def from_states(cls,
+                    states:list[dict[str, list[Location] | int]],
+                    **kwargs) -> "BatchHospitalPlacement":
+        """ Create a batch from state dictionaries, as in PRESET_STATES
+
+        Every state needs the same number of hospitals; house counts may differ.
+
+        :param states: list of dictionaries with hospitals, houses, height and width
+        :param kwargs: additional kwargs for the constructor
+        """
+        if len({len(state["hospitals"]) for state in states}) > 1:
+            raise ValueError(
+                f"{cls.__name__}: every state needs the same number of hospitals")
+        n = max(len(state["houses"]) for state in states)
+        houses = np.zeros((len(states), n, 2), dtype=int)
+        house_mask = np.zeros((len(states), n), dtype=bool)
+        for b, state in enumerate(states):
+            houses[b, :len(state["houses"])] = state["houses"]
+            house_mask[b, :len(state["houses"])] = True
+        return cls(
+            hospitals=[state["hospitals"] for state in states],
+            houses=houses,
+            sizes=[(state["width"], state["height"]) for state in states],
+            house_mask=house_mask,
+            **kwargs)
+
+    @classmethod
+    def from_environments(cls,
+                          environments:list["HospitalPlacement"],
+                          **kwargs) -> "BatchHospitalPlacement":
+        """ Create a batch from existing HospitalPlacement environments
+
+        :param environments: list of environments, each with the same number of hospitals
+        :param kwargs: additional kwargs for the constructor
+        """
+        return cls.from_states([{
+                "hospitals": list(env.state["hospitals"].values()),
+                "houses": list(env.state["houses"].values()),
+                "width": env.width,
+                "height": env.height} for env in environments], **kwargs)
+
+    @classmethod
+    def random(cls,
+               batch:int,
+               width:int,
+               height:int,
+               houses:int,
+               hospitals:int,
+               seed:int | None = None,
+               **kwargs) -> "BatchHospitalPlacement":
+        """ Create a batch of random instances on grids of the same size
+
+        :param batch: number of instances
+        :param width: width of each grid
+        :param height: height of each grid
+        :param houses: number of houses in each instance
+        :param hospitals: number of hospitals in each instance
+        :param seed: optional seed for the random number generator
+        :param kwargs: additional kwargs for the constructor
+        """
+        if houses + hospitals > width * height:
+            raise ValueError(f"{cls.__name__}: too many things for grid")
+        rng = np.random.default_rng(seed)
+        cells = rng.random((batch, width*height)).argsort(axis=1)[:, :houses+hospitals]
+        locations = np.stack([cells // height, cells % height], axis=-1)
+        return cls(
+            hospitals=locations[:, houses:],
+            houses=locations[:, :houses],
+            sizes=np.tile((width, height), (batch, 1)),
+            **kwargs)
+
+    def to_states(self) -> list[dict[str, list[Location] | int]]:
+        """ State dictionaries for each instance, as accepted by HospitalPlacement """
+        return [{
+            "hospitals": [tuple(loc) for loc in self.hospitals[b].tolist()],
+            "houses": [tuple(loc) for loc in self.houses[b, self.house_mask[b]].tolist()],
+            "width": int(self.sizes[b, 0]),
+            "height": int(self.sizes[b, 1])} for b in range(len(self))]
+
+    def _reduce(self, dist:np.ndarray) -> np.ndarray:
+        """ Reduce nearest distances over houses (last axis) to the objective """
+        dist = np.where(self.house_mask.reshape(
+            (len(self),) + (1,)*(dist.ndim-2) + (-1,)), dist, 0)
+        return dist.sum(axis=-1) if self.objective == "sum" else dist.max(axis=-1)
+
+    def distances(self) -> np.ndarray:
+        """ (B, N, H) Manhattan distances from each house to each hospital """
+        return np.abs(
+            self.houses[:, :, None, :] - self.hospitals[:, None, :, :]).sum(axis=-1)
+
+    @property
+    def objectives(self) -> np.ndarray:
+        """ (B,) objective of each instance, total or worst-case distance to be minimised """
+        return self._reduce(self.distances().min(axis=-1))
+
+    def neighbours(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ Every single-cell hospital move for every instance
+
+        :return: (index, locations, valid) where index is (C,) hospital moved by each candidate, locations is (B, C, 2) proposed locations, and valid is (B, C) True where the proposed cell is free
+        """
+        n_hospitals = self.hospitals.shape[1]
+        index = np.repeat(np.arange(n_hospitals), len(MOVES))
+        locations = (self.hospitals[:, :, None, :] + MOVES[None, None]).reshape(
+            len(self), -1, 2)
+        width, height = self.occupied.shape[1:]
+        valid = (locations[..., 0] >= 0) & (locations[..., 0] < width) \
+              & (locations[..., 1] >= 0) & (locations[..., 1] < height)
+        x = np.clip(locations[..., 0], 0, width-1)
+        y = np.clip(locations[..., 1], 0, height-1)
+        valid &= ~self.occupied[np.arange(len(self))[:, None], x, y]
+        return index, locations, valid
+
+    def score(self,
+              index:np.ndarray,
+              locations:np.ndarray) -> np.ndarray:
+        """ Objective of every candidate move, evaluated together
+
+        Uses the nearest and second nearest hospital of each house, so a
+        candidate moving one hospital costs O(N) rather than O(N * H).
+
+        :param index: (C,) hospital moved by each candidate
+        :param locations: (B, C, 2) proposed locations
+        :return: (B, C) objective after each move
+        """
+        dist = self.distances()
+        padded = np.concatenate(  # pad so a single hospital has a runner up
+            [dist, np.full(dist.shape[:2] + (1,), np.iinfo(int).max)], axis=-1)
+        order = np.argsort(padded, axis=-1)[..., :2]
+        nearest = np.take_along_axis(padded, order[..., :1], axis=-1)[..., 0]
+        second = np.take_along_axis(padded, order[..., 1:], axis=-1)[..., 0]
+
+        moved = np.abs(  # (B, C, N) distance to each proposed location
+            self.houses[:, None, :, :] - locations[:, :, None, :]).sum(axis=-1)
+        others = np.where(
+            order[:, None, :, 0] == index[None, :, None],
+            second[:, None, :], nearest[:, None, :])
+        return self._reduce(np.minimum(others, moved))
+
+    @property
+    def is_done(self) -> bool:
+        """ Whether every instance has converged """
+        return bool(self.done.all())
+
+    def step(self) -> None:
+        """ One steepest-ascent move for every instance not yet done """
+        if self.is_done: return
+        index, locations, valid = self.neighbours()
+        scores = np.where(valid, self.score(index, locations), np.iinfo(int).max)
+        choice = scores.argmin(axis=1)
+        b = np.arange(len(self))
+        improved = ~self.done & (scores[b, choice] < self.objectives)
+        self.done |= ~improved
+
+        b = b[improved]  # apply moves for improved instances only
+        h = index[choice[b]]
+        old, new = self.hospitals[b, h], locations[b, choice[b]]
+        self.occupied[b, old[:, 0], old[:, 1]] = False
+        self.occupied[b, new[:, 0], new[:, 1]] = True
+        self.hospitals[b, h] = new
+        self.counter += 1
+
+    def run(self, steps:int = 100) -> np.ndarray:
+        """ Step every instance until all are done, or steps are exhausted
+
+        :param steps: max. # of iterations
+        :return: (B,) final objective of each instance
+        """
+        for _ in range(steps):
+            if self.is_done: break
+            self.step()
+        return self.objectives
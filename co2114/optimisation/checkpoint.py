@@ -0,0 +1,229 @@
+import os
+import pickle
+import random
+import time
+import zlib
+from io import BytesIO
+
+import numpy as np
+
+from .planning import HospitalPlacement, HospitalOptimiser
+
+VERSION = 1
+
+
+class _Pickler(pickle.Pickler):
+    """ Pickler storing the environment, its things and the agent by reference """
+    def __init__(self,
+                 file,
+                 environment:HospitalPlacement,
+                 agent:HospitalOptimiser) -> None:
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.references = {id(environment): ("environment",), id(agent): ("agent",)}
+        for kind in ("hospitals", "houses"):
+            for i, thing in enumerate(getattr(environment, kind)):
+                self.references[id(thing)] = (kind, i)
+        if environment.travel_distances is not None:  # held by states, with its cache
+            self.references[id(environment.travel_distances)] = ("travel",)
+
+    def persistent_id(self, obj):
+        return self.references.get(id(obj))
+
+
+class _Unpickler(pickle.Unpickler):
+    """ Unpickler resolving references to the environment, its things and the agent """
+    def __init__(self,
+                 file,
+                 environment:HospitalPlacement,
+                 agent:HospitalOptimiser) -> None:
+        super().__init__(file)
+        self.environment = environment
+        self.agent = agent
+
+    def persistent_load(self, reference):
+        if reference == ("environment",): return self.environment
+        if reference == ("agent",): return self.agent
+        if reference == ("travel",): return self.environment.travel_distances
+        kind, i = reference
+        return getattr(self.environment, kind)[i]
+
+
+def save_checkpoint(path:str | os.PathLike,
+                    environment:HospitalPlacement,
+                    agent:HospitalOptimiser,
+                    step:int = 0,
+                    stats:dict | None = None) -> None:
+    """ Save a run of an optimiser to a compressed checkpoint file
+
+    Stores hospital and house locations, whether the environment is done,
+    every attribute of the agent (temperature, step, best so far, its own
+    generators, ...), the state of `random` and NumPy's global generator,
+    and any stats. Hospitals, houses, the environment and the agent itself
+    are stored as references, so states and bound methods held by the
+    agent resolve to the live objects on resume. The file is replaced
+    atomically, so an interrupted save leaves the previous checkpoint intact.
+
+    :param path: file path of the checkpoint
+    :param environment: environment being optimised
+    :param agent: optimiser being run
+    :param step: # of steps run so far
+    :param stats: optional dictionary of run statistics
+    """
+    buffer = BytesIO()
+    pickle.dump({  # layout first, so it can be read without restoring
+        "version": VERSION,
+        "step": step,
+        "width": environment.width,
+        "height": environment.height,
+        "hospitals": [hospital.location for hospital in environment.hospitals],
+        "houses": [house.location for house in environment.houses],
+        "obstacles": [obstacle.location for obstacle in environment.obstacles],
+        "stats": stats or {}}, buffer, protocol=pickle.HIGHEST_PROTOCOL)
+    _Pickler(buffer, environment, agent).dump({
+        "success": getattr(environment, "success", None),
+        "agent": agent.__dict__,
+        "random": random.getstate(),
+        "numpy": np.random.get_state()})
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(zlib.compress(buffer.getvalue()))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+def read_checkpoint(path:str | os.PathLike) -> dict:
+    """ Environment layout and progress stored in a checkpoint, without restoring it
+
+    :param path: file path of the checkpoint
+    :return: dictionary with version, step, width, height, hospitals, houses, obstacles and stats
+    """
+    with open(path, "rb") as file:
+        data = pickle.load(BytesIO(zlib.decompress(file.read())))
+    if data["version"] != VERSION:
+        raise ValueError(f"{path}: unsupported checkpoint version {data['version']}")
+    return data
+
+
+def load_checkpoint(path:str | os.PathLike,
+                    environment:HospitalPlacement,
+                    agent:HospitalOptimiser) -> dict:
+    """ Restore a run of an optimiser from a checkpoint file
+
+    The environment must have the same size, houses, obstacles and number
+    of hospitals as when the checkpoint was saved, see `environment_from_checkpoint`.
+
+    :param path: file path of the checkpoint
+    :param environment: environment to restore hospital locations into
+    :param agent: optimiser to restore attributes into
+    :return: dictionary with step and stats of the run
+    """
+    with open(path, "rb") as file:
+        buffer = BytesIO(zlib.decompress(file.read()))
+    data = pickle.load(buffer)
+    if data["version"] != VERSION:
+        raise ValueError(f"{path}: unsupported checkpoint version {data['version']}")
+    if (data["width"], data["height"]) != (environment.width, environment.height) \
+            or data["houses"] != [house.location for house in environment.houses] \
+            or data["obstacles"] != [obstacle.location for obstacle in environment.obstacles] \
+            or len(data["hospitals"]) != len(environment.hospitals):
+        raise ValueError(f"{path}: checkpoint is for a different environment")
+    data |= _Unpickler(buffer, environment, agent).load()
+
+    for hospital, location in zip(environment.hospitals, data["hospitals"]):
+        hospital.location = location
+    if data["success"] is not None:
+        environment.success = data["success"]
+    agent.__dict__.update(data["agent"])
+    random.setstate(data["random"])
+    np.random.set_state(data["numpy"])
+    return {"step": data["step"], "stats": data["stats"]}
+
+
+def environment_from_checkpoint(path:str | os.PathLike,
+                                cls:type[HospitalPlacement] = HospitalPlacement,
+                                **kwargs) -> HospitalPlacement:
+    """ Create an environment with the layout stored in a checkpoint
+
+    :param path: file path of the checkpoint
+    :param cls: environment class to create
+    :param kwargs: additional kwargs for the environment
+    """
+    data = read_checkpoint(path)
+    return cls({"hospitals": data["hospitals"], "houses": data["houses"],
+                "obstacles": data["obstacles"],
+                "width": data["width"], "height": data["height"]}, **kwargs)
+
+
+class CheckpointRunner:
+    """ Runs an optimiser in an environment, checkpointing periodically
+
+    If the checkpoint file exists when run, the run resumes from it and
+    continues exactly as the uninterrupted run would have. Tracks the best
+    utility and layout seen, the number of steps and the time spent.
+    """
+    def __init__(self,
+                 environment:HospitalPlacement,
+                 agent:HospitalOptimiser,
+                 path:str | os.PathLike,
+                 every:int = 100) -> None:
+        """ Constructor for CheckpointRunner
+
+        :param environment: environment being optimised, with agent added
+        :param agent: optimiser being run
+        :param path: file path of the checkpoint
+        :param every: # of steps between checkpoints
+        """
+        self.environment = environment
+        self.agent = agent
+        self.path = path
+        self.every = every
+        self.step = 0
+        self.stats:dict = {"best_utility": None, "best": None, "seconds": 0.}
+
+    def __repr__(self) -> str:
+        """ String representation of the runner """
+        return self.__class__.__name__
+
+    def resume(self) -> bool:
+        """ Restore from the checkpoint file, if there is one
+
+        :return: True if a checkpoint was restored
+        """
+        if not os.path.exists(self.path): return False
+        restored = load_checkpoint(self.path, self.environment, self.agent)
+        self.step, self.stats = restored["step"], restored["stats"]
+        return True
+
+    def save(self) -> None:
+        """ Write a checkpoint of the run so far """
+        save_checkpoint(self.path, self.environment, self.agent,
+                        self.step, self.stats)
+
+    def track(self) -> None:
+        """ Update the best utility and layout seen """
+        utility = self.agent.utility(self.environment.state)
+        if self.stats["best_utility"] is None or utility > self.stats["best_utility"]:
+            self.stats["best_utility"] = utility
+            self.stats["best"] = [h.location for h in self.environment.hospitals]
+
+    def run(self, steps:int = 100) -> dict:
+        """ Run until the environment is done or `steps` steps in total have run
+
+        :param steps: max. # of steps, counting any run before resuming
+        :return: stats of the run
+        """
+        self.resume()
+        start = time.perf_counter() - self.stats["seconds"]
+        if self.step == 0: self.track()
+        while self.step < steps and not self.environment.is_done:
+            self.environment.step()
+            self.step += 1
+            self.track()
+            if self.step % self.every == 0:
+                self.stats["seconds"] = time.perf_counter() - start
+                self.save()
+        self.stats["seconds"] = time.perf_counter() - start
+        self.save()
+        return self.stats
@@ -0,0 +1,416 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from .things import House, Hospital
+
+Location = tuple[int, int]
+Numeric = int | float
+
+OBJECTIVES = ("sum", "max", "mean", "coverage")  # order of objective vectors
+
+
+def as_array(locations:dict[House | Hospital, Location]) -> np.ndarray:
+    """ Convert a mapping of things to locations into an (n, 2) array
+
+    :param locations: dictionary of things to (x, y) locations
+    :return: integer array of locations, in iteration order of the dictionary
+    """
+    return np.array(list(locations.values()), dtype=int).reshape(-1, 2)
+
+
+def distance_matrix(a:np.ndarray, b:np.ndarray) -> np.ndarray:
+    """ Manhattan distances between every pair of points in a and b
+
+    :param a: (n, 2) array of locations, e.g. houses
+    :param b: (m, 2) array of locations, e.g. hospitals
+    :return: (n, m) array of distances
+    """
+    return np.abs(a[:, None, :] - b[None, :, :]).sum(axis=-1)
+
+
+def grid_cells(houses:np.ndarray,
+               bounds:dict[str, int],
+               obstacles:np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """ All cells of the grid, and which of them are free of houses and obstacles
+
+    :param houses: (n, 2) array of house locations
+    :param bounds: bounds of the environment, as in state["bounds"]
+    :param obstacles: optional (m, 2) array of obstacle locations
+    :return: (cells, free) where cells is a (w*h, 2) array of locations and free is a boolean mask over cells
+    """
+    xs = np.arange(bounds["xmin"], bounds["xmax"]+1)
+    ys = np.arange(bounds["ymin"], bounds["ymax"]+1)
+    cells = np.stack(np.meshgrid(xs, ys, indexing="ij"), axis=-1).reshape(-1, 2)
+
+    free = np.ones(len(cells), dtype=bool)
+    for blocked in (houses, obstacles):
+        if blocked is None or len(blocked) == 0: continue
+        blocked = np.asarray(blocked, dtype=int).reshape(-1, 2)
+        free[(blocked[:, 0]-xs[0])*len(ys) + (blocked[:, 1]-ys[0])] = False
+    return cells, free
+
+
+def max_distance(houses:np.ndarray, hospitals:np.ndarray) -> Numeric:
+    """ Worst-case distance from any house to its nearest hospital
+
+    :param houses: (n, 2) array of house locations
+    :param hospitals: (k, 2) array of hospital locations
+    :return: maximum over houses of the distance to the nearest hospital
+    """
+    if len(houses) == 0: return 0
+    return distance_matrix(houses, hospitals).min(axis=1).max()
+
+
+def objective_vectors(nearest:np.ndarray, radius:Numeric) -> np.ndarray:
+    """ Every objective of one or more layouts, from distances to the nearest hospital
+
+    :param nearest: (..., n) array of distance from each house to its nearest hospital
+    :param radius: distance within which a house counts as covered
+    :return: (..., 4) array of total, worst-case and mean distance, and
+             fraction of houses covered, in the order of OBJECTIVES
+    """
+    nearest = np.asarray(nearest, dtype=float)
+    if nearest.shape[-1] == 0:
+        return np.tile([0., 0., 0., 1.], nearest.shape[:-1] + (1,))
+    total = nearest.sum(axis=-1)
+    return np.stack([total, nearest.max(axis=-1), total / nearest.shape[-1],
+                     (nearest <= radius).mean(axis=-1)], axis=-1)
+
+
+class BottleneckTracker:
+    """ Incremental evaluation of the max-distance objective
+
+    Keeps the distance of every house to every hospital, along with the
+    nearest and second nearest distance for each house, so that the effect of
+    moving a single hospital can be evaluated in O(houses) rather than
+    O(houses * hospitals). Houses attaining the maximum are the bottleneck.
+    """
+    def __init__(self, houses:np.ndarray, hospitals:np.ndarray) -> None:
+        """ Constructor for BottleneckTracker
+
+        :param houses: (n, 2) array of house locations
+        :param hospitals: (k, 2) array of hospital locations
+        """
+        self.houses = np.array(houses, dtype=int).reshape(-1, 2)
+        self.hospitals = np.array(hospitals, dtype=int).reshape(-1, 2)
+        self.dist = distance_matrix(self.houses, self.hospitals)
+        self._update_nearest()
+
+    def _update_nearest(self) -> None:
+        """ Recompute nearest and second nearest distances for each house """
+        padded = np.column_stack(  # pad so a single hospital has a runner up
+            [self.dist, np.full(len(self.houses), np.iinfo(int).max)])
+        order = np.argsort(padded, axis=1)[:, :2]
+        rows = np.arange(len(self.houses))
+        self.nearest_index = order[:, 0]
+        self.nearest = padded[rows, order[:, 0]]
+        self.second = padded[rows, order[:, 1]]
+
+    @property
+    def value(self) -> Numeric:
+        """ Current worst-case distance to the nearest hospital """
+        if len(self.houses) == 0: return 0
+        return self.nearest.max()
+
+    @property
+    def bottleneck(self) -> np.ndarray:
+        """ Indices of houses attaining the worst-case distance """
+        return np.flatnonzero(self.nearest == self.value)
+
+    def nearest_after(self, i:int, location:Location) -> np.ndarray:
+        """ Distance from each house to its nearest hospital if hospital i were moved
+
+        :param i: index of hospital to move
+        :param location: proposed (x, y) location
+        :return: (n,) array of distances after the move, leaving tracker unchanged
+        """
+        moved = np.abs(self.houses - np.asarray(location)).sum(axis=1)
+        others = np.where(self.nearest_index == i, self.second, self.nearest)
+        return np.minimum(others, moved)
+
+    def evaluate(self, i:int, location:Location) -> Numeric:
+        """ Worst-case distance if hospital i were moved to location
+
+        :param i: index of hospital to move
+        :param location: proposed (x, y) location
+        :return: worst-case distance after the move, leaving tracker unchanged
+        """
+        if len(self.houses) == 0: return 0
+        return self.nearest_after(i, location).max()
+
+    def move(self, i:int, location:Location) -> None:
+        """ Commit a move of hospital i to location
+
+        :param i: index of hospital to move
+        :param location: new (x, y) location
+        """
+        self.hospitals[i] = location
+        self.dist[:, i] = np.abs(self.houses - self.hospitals[i]).sum(axis=1)
+        self._update_nearest()
+
+
+def distance_field(blocked:np.ndarray, sources:np.ndarray) -> np.ndarray:
+    """ Travel distance from every cell to its nearest source, around blocked cells
+
+    Multi-source breadth first search over the grid, moving one cell up,
+    down, left or right at a time, so on an open grid it equals the
+    Manhattan distance. Each layer of the search is a single array of cell
+    indices, expanded with NumPy, so the cost is linear in the grid size.
+
+    :param blocked: (width, height) boolean array, True where impassable
+    :param sources: (k, 2) array of source locations, e.g. hospitals
+    :return: (width, height) float array of distances, inf where unreachable or blocked
+    """
+    width, height = blocked.shape
+    stride = height + 2  # padded with a blocked border, so no bounds checks
+    open_ = np.pad(~np.asarray(blocked, dtype=bool), 1).ravel()
+    dist = np.full(open_.shape, np.inf)
+    steps = np.array([stride, -stride, 1, -1])
+
+    sources = np.asarray(sources, dtype=int).reshape(-1, 2)
+    frontier = np.unique((sources[:, 0]+1)*stride + sources[:, 1]+1)
+    frontier = frontier[open_[frontier]]
+    d = 0
+    while len(frontier):
+        dist[frontier] = d
+        open_[frontier] = False  # visited
+        d += 1
+        frontier = np.unique((frontier[:, None] + steps).ravel())
+        frontier = frontier[open_[frontier]]
+    return dist.reshape(width+2, height+2)[1:-1, 1:-1]
+
+
+class TravelDistances:
+    """ Travel distances between houses and hospitals on a grid with obstacles
+
+    The distance field from each hospital cell is found by breadth first
+    search and the distances at the houses are cached, least recently used
+    first out. Evaluating a layout where one hospital has moved therefore
+    costs one search, linear in the grid size, for the moved hospital only,
+    and a lookup for the others.
+    """
+    def __init__(self,
+                 blocked:np.ndarray,
+                 houses:np.ndarray,
+                 maxsize:int = 4096) -> None:
+        """ Constructor for TravelDistances
+
+        :param blocked: (width, height) boolean array, True where impassable
+        :param houses: (n, 2) array of house locations
+        :param maxsize: max. # of hospital cells to keep distances for
+        """
+        self.blocked = np.asarray(blocked, dtype=bool)
+        self.houses = np.array(houses, dtype=int).reshape(-1, 2)
+        self.maxsize = maxsize
+        self._from: OrderedDict[Location, np.ndarray] = OrderedDict()
+
+    def from_cell(self, location:Location) -> np.ndarray:
+        """ Travel distance from a cell to each house
+
+        :param location: (x, y) cell, e.g. of a hospital
+        :return: (n,) array of distances, inf for unreachable houses
+        """
+        location = tuple(int(x) for x in location)
+        if location in self._from:
+            self._from.move_to_end(location)
+            return self._from[location]
+        field = distance_field(self.blocked, np.array([location]))
+        dist = field[self.houses[:, 0], self.houses[:, 1]]
+        self._from[location] = dist
+        if len(self._from) > self.maxsize: self._from.popitem(last=False)
+        return dist
+
+    def nearest(self, hospitals:np.ndarray) -> np.ndarray:
+        """ Travel distance from each house to its nearest hospital
+
+        :param hospitals: (k, 2) array of hospital locations
+        :return: (n,) array of distances
+        """
+        if len(hospitals) == 0: return np.full(len(self.houses), np.inf)
+        return np.min([self.from_cell(location) for location in hospitals], axis=0)
+
+    def total(self, hospitals:np.ndarray) -> Numeric:
+        """ Total travel distance from houses to their nearest hospitals
+
+        :param hospitals: (k, 2) array of hospital locations
+        :return: total distance, inf if any house cannot reach a hospital
+        """
+        total = self.nearest(hospitals).sum()
+        return int(total) if np.isfinite(total) else np.inf
+
+    def field(self, hospitals:np.ndarray) -> np.ndarray:
+        """ Travel distance from every cell to its nearest hospital, see distance_field """
+        return distance_field(self.blocked, hospitals)
+
+
+def _bellman_ford(weights:np.ndarray,
+                  dist:np.ndarray) -> tuple[np.ndarray, np.ndarray, list[int] | None]:
+    """ Shortest distances over a dense weight matrix, from initial distances
+
+    Each round relaxes every edge at once with NumPy. If distances are still
+    falling after as many rounds as nodes, a negative cycle is found by
+    following predecessors.
+
+    :param weights: (m, m) array, weights[a, b] the weight of edge a -> b, inf if none
+    :param dist: (m,) array of initial distances, inf for nodes not yet reached
+    :return: (distances, predecessors, negative cycle as a list of nodes or None)
+    """
+    m = len(weights)
+    pred = np.full(m, -1)
+    columns = np.arange(m)
+    rounds = 0
+    while True:
+        through = dist[:, None] + weights
+        best = through.argmin(axis=0)
+        shorter = through[best, columns] < dist
+        if not shorter.any(): return dist, pred, None
+        dist = np.where(shorter, through[best, columns], dist)
+        pred = np.where(shorter, best, pred)
+        rounds += 1
+        if rounds < m: continue
+        for v in np.flatnonzero(shorter):
+            seen:dict[int, int] = {}
+            walk = []
+            while v >= 0 and v not in seen:
+                seen[v] = len(walk)
+                walk.append(v)
+                v = pred[v]
+            if v < 0: continue
+            cycle = walk[seen[v]:][::-1]  # walk follows edges backwards
+            if sum(weights[a, b] for a, b in zip(cycle, cycle[1:] + cycle[:1])) < 0:
+                return dist, pred, [int(node) for node in cycle]
+
+
+class CapacitatedAssignment:
+    """ Min-cost assignment of houses to hospitals with limited capacity
+
+    Every house is served by one hospital, hospital j serves at most
+    capacity[j] houses, and the total distance is minimised: a
+    transportation problem, solved as a min-cost flow. The residual graph
+    is contracted to the k hospitals and a slack node: the edge from
+    hospital j to hospital l costs the least extra distance of moving one
+    of j's houses to l, hospitals with room lead to the slack node, and the
+    slack node leads to hospitals serving anyone. Its edges are found with
+    NumPy in O(houses * hospitals), and paths and cycles in it by
+    Bellman-Ford over k+1 nodes.
+
+    `solve` adds houses one at a time along shortest paths, so the
+    assignment stays optimal (successive shortest paths). Given a `start`
+    assignment, e.g. the optimum before one hospital moved one cell, it
+    instead cancels negative cycles until there are none, which takes a
+    handful of cycles rather than a path per house.
+    """
+    def __init__(self, capacity:np.ndarray) -> None:
+        """ Constructor for CapacitatedAssignment
+
+        :param capacity: (k,) array, max. # of houses each hospital serves
+        """
+        self.capacity = np.array(capacity, dtype=int).reshape(-1)
+        self.paths = self.cycles = 0  # augmenting paths and cycles of the last solve
+
+    def __repr__(self) -> str:
+        """ String representation of the solver """
+        return f"{self.__class__.__name__}[{len(self.capacity)}]"
+
+    def solve(self, cost:np.ndarray, start:np.ndarray | None = None) -> np.ndarray:
+        """ Assignment of houses to hospitals with least total cost
+
+        :param cost: (n, k) array of distances from each house to each hospital, inf if unreachable
+        :param start: optional (n,) assignment to warm start from, must respect capacities
+        :return: (n,) array of the index of the hospital serving each house
+        """
+        cost = np.asarray(cost, dtype=float)
+        n, k = cost.shape
+        if k != len(self.capacity):
+            raise ValueError(f"{self}: {k} hospitals, but {len(self.capacity)} capacities")
+        if self.capacity.sum() < n:
+            raise ValueError(f"{self}: capacity {self.capacity.sum()} is less than {n} houses")
+        finite = np.isfinite(cost)
+        if not finite.all():  # unreachable costs more than any assignment without
+            cost = np.where(finite, cost, (cost[finite].max(initial=0) + 1) * (n + 1))
+
+        self.paths = self.cycles = 0
+        if start is not None:
+            assignment = np.array(start, dtype=int)
+            if assignment.shape == (n,) and ((0 <= assignment) & (assignment < k)).all():
+                load = np.bincount(assignment, minlength=k)
+                if (load <= self.capacity).all():
+                    return self._cancel(cost, assignment, load)
+        return self._augment(cost)
+
+    def _residual(self,
+                  cost:np.ndarray,
+                  assignment:np.ndarray,
+                  load:np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """ Contracted residual graph of an assignment
+
+        :return: ((k+1, k+1) edge weights, slack node last,
+                  (k, k) house moved by each edge between hospitals)
+        """
+        k = cost.shape[1]
+        weights = np.full((k+1, k+1), np.inf)
+        movers = np.full((k, k), -1)
+        assigned = np.flatnonzero(assignment >= 0)
+        extra = cost[assigned] - cost[assigned, assignment[assigned]][:, None]
+        for j in range(k):
+            members = assignment[assigned] == j
+            if not members.any(): continue
+            options = extra[members]
+            best = options.argmin(axis=0)
+            weights[j, :k] = options[best, np.arange(k)]
+            movers[j] = assigned[members][best]
+        np.fill_diagonal(weights, np.inf)
+        weights[:k, k] = np.where(load < self.capacity, 0, np.inf)
+        weights[k, :k] = np.where(load > 0, 0, np.inf)
+        return weights, movers
+
+    @staticmethod
+    def _shift(assignment:np.ndarray,
+               load:np.ndarray,
+               movers:np.ndarray,
+               nodes:list[int]) -> None:
+        """ Move a house along each edge between hospitals of a path """
+        k = len(load)
+        for a, b in zip(nodes, nodes[1:]):
+            if a < k and b < k:
+                assignment[movers[a, b]] = b
+                load[a] -= 1
+                load[b] += 1
+
+    def _augment(self, cost:np.ndarray) -> np.ndarray:
+        """ Successive shortest paths, adding one house at a time """
+        n, k = cost.shape
+        assignment = np.full(n, -1)
+        load = np.zeros(k, dtype=int)
+        nearest = cost.argmin(axis=1)
+        for house in range(n):
+            j = nearest[house]
+            if load[j] < self.capacity[j]:  # no path can beat the nearest with room
+                assignment[house] = j
+                load[j] += 1
+                continue
+            weights, movers = self._residual(cost, assignment, load)
+            _, pred, _ = _bellman_ford(weights, np.append(cost[house], np.inf))
+            nodes = [k]  # back from the slack node to the first hospital
+            while pred[nodes[-1]] >= 0:
+                nodes.append(pred[nodes[-1]])
+            nodes.reverse()
+            self._shift(assignment, load, movers, nodes)
+            assignment[house] = nodes[0]
+            load[nodes[0]] += 1
+            self.paths += 1
+        return assignment
+
+    def _cancel(self,
+                cost:np.ndarray,
+                assignment:np.ndarray,
+                load:np.ndarray) -> np.ndarray:
+        """ Cancel negative cycles until the assignment is optimal """
+        k = cost.shape[1]
+        while True:
+            weights, movers = self._residual(cost, assignment, load)
+            _, _, cycle = _bellman_ford(weights, np.zeros(k+1))
+            if cycle is None: return assignment
+            self._shift(assignment, load, movers, cycle + cycle[:1])
+            self.cycles += 1
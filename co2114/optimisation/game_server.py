@@ -0,0 +1,347 @@
+import asyncio
+import json
+import random
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import redirect_stdout
+from io import StringIO
+from itertools import count
+from statistics import mean, median
+
+from .minimax import Tile, TicTacToeAgent
+from .tictactoe import TicTacToeGame
+
+Board = list[list[Tile]]
+Request = dict[str, str | int]
+Response = dict[str, object]
+
+LINES = [[(i, j) for j in range(3)] for i in range(3)] \
+      + [[(i, j) for i in range(3)] for j in range(3)] \
+      + [[(i, i) for i in range(3)], [(i, 2-i) for i in range(3)]]
+
+
+def winner(board:Board) -> str | None:
+    """ Player with three in a row, if any """
+    for line in LINES:
+        players = {board[i][j].player for i, j in line}
+        if len(players) == 1 and None not in players:
+            return players.pop()
+    return None
+
+
+def encode(board:Board) -> list[list[str]]:
+    """ Board as rows of "X", "O" or "" for sending to clients """
+    return [[tile.player or "" for tile in row] for row in board]
+
+
+def search(agent_class:type[TicTacToeAgent],
+           player:str,
+           board:Board) -> tuple[str, Board]:
+    """ Run an agent's program on a board, in a worker process
+
+    :param agent_class: class of agent to construct, must be picklable
+    :param player: "X" or "O", the player the agent moves for
+    :param board: the board to move on
+    :return: action of the agent, ("move", board) or ("done", board)
+    """
+    agent = agent_class()
+    agent.player = player
+    with redirect_stdout(StringIO()):  # agents print while thinking
+        return agent.program(board)
+
+
+class GameSession:
+    """ One game of TicTacToe hosted by a GameServer """
+    def __init__(self, session:int, game:TicTacToeGame) -> None:
+        """ Constructor for GameSession
+
+        :param session: id of the session
+        :param game: the game being played
+        """
+        self.id = session
+        self.game = game
+        self.lock = asyncio.Lock()  # one move at a time per game
+        self.latencies:list[float] = []  # seconds from request to reply, per move
+
+    @property
+    def winner(self) -> str | None:
+        """ Player who has won, if any """
+        return winner(self.game.board)
+
+    @property
+    def is_over(self) -> bool:
+        """ Whether the game has finished """
+        return self.game.is_done or self.winner is not None \
+            or all(tile.player for row in self.game.board for tile in row)
+
+    def response(self) -> Response:
+        """ State of the game to send to the client """
+        return {"session": self.id,
+                "board": encode(self.game.board),
+                "player": self.game.opponent,
+                "over": self.is_over,
+                "winner": self.winner}
+
+
+class GameServer:
+    """ Hosts many concurrent TicTacToe games on one asyncio event loop
+
+    Clients send moves for the opponent side of each game, either over a
+    local socket (one JSON request per line) or through an in-process
+    queue. Agent search runs in a worker pool, so the event loop keeps
+    serving other sessions while agents think.
+
+    Requests are dictionaries with an "op" of
+    - "new": start a game, replying with its session id
+    - "move": play "row", "col" (0 to 2) in "session", then the agent replies
+    - "close": end "session", replying with its latency statistics
+    - "stats": latency statistics over every move served
+    """
+    def __init__(self,
+                 agent_class:type[TicTacToeAgent] = TicTacToeAgent,
+                 executor:Executor | None = None,
+                 workers:int | None = None) -> None:
+        """ Constructor for GameServer
+
+        :param agent_class: class of agent playing every game, must be picklable
+        :param executor: pool to run agent search in, default is a process pool
+        :param workers: # of worker processes, if no executor is given
+        """
+        self.agent_class = agent_class
+        self.executor = ProcessPoolExecutor(workers) if executor is None else executor
+        self.sessions:dict[int, GameSession] = {}
+        self.latencies:list[float] = []  # every move served, including closed sessions
+        self._ids = count()
+
+    def __repr__(self) -> str:
+        """ String representation of the server """
+        return f"{self.__class__.__name__}[{len(self.sessions)}]"
+
+    def new_game(self) -> Response:
+        """ Start a new game, the client moves first """
+        game = TicTacToeGame()
+        game.add_agent(self.agent_class())
+        session = GameSession(next(self._ids), game)
+        self.sessions[session.id] = session
+        return session.response()
+
+    def session(self, session:int) -> GameSession:
+        """ Open session with the given id """
+        if session not in self.sessions:
+            raise KeyError(f"{self}: no session {session}")
+        return self.sessions[session]
+
+    async def move(self, session:int, row:int, col:int) -> Response:
+        """ Play the client's move, then the agent's reply
+
+        :param session: id of the session
+        :param row: row to play in, 0 to 2
+        :param col: column to play in, 0 to 2
+        :return: state of the game after the agent has moved
+        """
+        session = self.session(session)
+        async with session.lock:
+            if session.is_over:
+                raise ValueError(f"{self}: session {session.id} is over")
+            game = session.game
+            game.play(row, col)
+            if not session.is_over:
+                action = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, search,
+                    self.agent_class, game.agent.player, game.board)
+                game.apply(game.agent, action)
+            return session.response()
+
+    def close(self, session:int) -> Response:
+        """ End a session, returning its latency statistics """
+        session = self.sessions.pop(self.session(session).id)
+        return {"session": session.id} | self.statistics(session.latencies)
+
+    def statistics(self, latencies:list[float] | None = None) -> Response:
+        """ Latency statistics in seconds, by default over every move served """
+        latencies = self.latencies if latencies is None else latencies
+        if not latencies: return {"moves": 0}
+        return {"moves": len(latencies),
+                "mean": mean(latencies),
+                "median": median(latencies),
+                "max": max(latencies)}
+
+    async def handle(self, request:Request) -> Response:
+        """ Respond to a single request, errors are reported in the response """
+        start = time.perf_counter()
+        if not isinstance(request, dict):
+            return {"error": f"{self}: request must be an object, not {type(request).__name__}"}
+        try:
+            match request.get("op"):
+                case "new":
+                    return self.new_game()
+                case "move":
+                    response = await self.move(
+                        int(request["session"]), int(request["row"]), int(request["col"]))
+                    latency = time.perf_counter() - start
+                    self.session(response["session"]).latencies.append(latency)
+                    self.latencies.append(latency)
+                    return response | {"latency": latency}
+                case "close":
+                    return self.close(int(request["session"]))
+                case "stats":
+                    return self.statistics()
+                case op:
+                    raise ValueError(f"{self}: unknown op {op}")
+        except (KeyError, ValueError, TypeError) as error:
+            return {"error": " ".join(str(arg) for arg in error.args)}
+
+    async def serve_queue(self, requests:asyncio.Queue) -> None:
+        """ Serve (request, future) pairs from an in-process queue, until cancelled """
+        async def reply(request:Request, future:asyncio.Future) -> None:
+            try:
+                response = await self.handle(request)
+            except Exception as error:  # e.g. a broken worker pool, the client still gets a reply
+                response = {"error": f"{self}: {type(error).__name__} {error}"}
+            if not future.cancelled(): future.set_result(response)
+
+        tasks = set()
+        while True:
+            request, future = await requests.get()
+            task = asyncio.create_task(reply(request, future))
+            tasks.add(task)  # keep a reference until done
+            task.add_done_callback(tasks.discard)
+
+    async def serve(self, host:str = "127.0.0.1", port:int = 0) -> asyncio.Server:
+        """ Serve JSON lines over a local TCP socket
+
+        :param host: address to listen on
+        :param port: port to listen on, 0 for any free port
+        :return: the started server, see its sockets for the port
+        """
+        async def connection(reader:asyncio.StreamReader,
+                             writer:asyncio.StreamWriter) -> None:
+            lock = asyncio.Lock()  # replies may finish out of order
+            async def reply(line:bytes) -> None:
+                try:
+                    response = await self.handle(json.loads(line))
+                except json.JSONDecodeError as error:
+                    response = {"error": str(error)}
+                except Exception as error:  # e.g. a broken worker pool
+                    response = {"error": f"{self}: {type(error).__name__} {error}"}
+                async with lock:
+                    writer.write(json.dumps(response).encode() + b"\n")
+                    await writer.drain()
+
+            tasks = set()
+            while line := await reader.readline():
+                task = asyncio.create_task(reply(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks: await asyncio.wait(tasks)
+            writer.close()
+
+        return await asyncio.start_server(connection, host, port)
+
+    def shutdown(self) -> None:
+        """ Stop the worker pool """
+        self.executor.shutdown(cancel_futures=True)
+
+
+class QueueClient:
+    """ Client talking to a GameServer through an in-process queue """
+    def __init__(self, requests:asyncio.Queue) -> None:
+        """ Constructor for QueueClient
+
+        :param requests: queue served by GameServer.serve_queue
+        """
+        self.requests = requests
+
+    async def request(self, request:Request) -> Response:
+        """ Send a request and wait for the response """
+        future = asyncio.get_running_loop().create_future()
+        await self.requests.put((request, future))
+        return await future
+
+
+class SocketClient:
+    """ Client talking to a GameServer over a local socket, one request at a time """
+    def __init__(self,
+                 reader:asyncio.StreamReader,
+                 writer:asyncio.StreamWriter) -> None:
+        """ Constructor for SocketClient, see `connect` """
+        self.reader, self.writer = reader, writer
+
+    @classmethod
+    async def connect(cls, host:str, port:int) -> "SocketClient":
+        """ Open a connection to a server """
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def request(self, request:Request) -> Response:
+        """ Send a request and wait for the response """
+        self.writer.write(json.dumps(request).encode() + b"\n")
+        await self.writer.drain()
+        return json.loads(await self.reader.readline())
+
+    async def close(self) -> None:
+        """ Close the connection """
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def play_random(client:QueueClient | SocketClient,
+                      seed:int | None = None) -> Response:
+    """ Stand-in client, plays random free cells until the game is over
+
+    :param client: connection to a server
+    :param seed: optional seed for choosing moves
+    :return: final response from the server
+    """
+    rng = random.Random(seed)
+    response = await client.request({"op": "new"})
+    session = response["session"]
+    while not response["over"]:
+        free = [(i, j) for i, row in enumerate(response["board"])
+                    for j, player in enumerate(row) if not player]
+        row, col = rng.choice(free)
+        response = await client.request(
+            {"op": "move", "session": session, "row": row, "col": col})
+        if "error" in response: return response
+    await client.request({"op": "close", "session": session})
+    return response
+
+
+if __name__ == "__main__":
+
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--games", type=int, default=100,
+        help="Number of concurrent games played by stand-in clients.")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+        help="Number of worker processes for agent search.")
+    parser.add_argument("--socket", action="store_true",
+        help="Connect clients over a local socket instead of a queue.")
+    args = parser.parse_args()
+
+    async def main() -> None:
+        server = GameServer(workers=args.workers)
+        start = time.perf_counter()
+        if args.socket:
+            listener = await server.serve()
+            port = listener.sockets[0].getsockname()[1]
+            clients = [await SocketClient.connect("127.0.0.1", port)
+                           for _ in range(args.games)]
+        else:
+            requests = asyncio.Queue()
+            serving = asyncio.create_task(server.serve_queue(requests))
+            clients = [QueueClient(requests) for _ in range(args.games)]
+        results = await asyncio.gather(
+            *(play_random(client, seed) for seed, client in enumerate(clients)))
+        winners = [result.get("winner") or "draw" for result in results]
+        print(f"{args.games} games in {time.perf_counter()-start:.2f}s:",
+              {outcome: winners.count(outcome) for outcome in sorted(set(winners))})
+        print("latency (s):", server.statistics())
+        if args.socket:
+            for client in clients: await client.close()
+            listener.close()
+        else:
+            serving.cancel()
+        server.shutdown()
+
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+""" Import time benchmark for headless use of co2114.optimisation
+
+Imports each module in a fresh interpreter, reporting the best of several
+runs and whether any GUI modules were loaded along the way.
+
+Run with `python -m co2114.optimisation.import_benchmark`. Exits with
+status 1 if a headless module loads pygame or is slower than the limit,
+or if a module listed in NUMPY_FREE loads NumPy.
+"""
+import json
+import subprocess
+import sys
+
+HEADLESS = [
+    "co2114.optimisation.things",
+    "co2114.optimisation.distances",
+    "co2114.optimisation.minimax",
+    "co2114.optimisation.minimax_agents",
+    "co2114.optimisation.optimisers",
+    "co2114.optimisation.batch",
+    "co2114.optimisation.tracing",
+    "co2114.optimisation.transposition",
+    "co2114.optimisation.memo",
+    "co2114.optimisation.pareto",
+]  # modules used by agents and batch workers without a display
+GRAPHICAL = [
+    "co2114.optimisation.tictactoe",
+    "co2114.optimisation.planning",
+    "co2114.optimisation.rendering",
+]  # modules expected to load pygame, for reference
+NUMPY_FREE = [
+    "co2114.optimisation.things",
+    "co2114.optimisation.minimax",
+]  # headless modules that should not load NumPy either
+GUI_MODULES = ["pygame", "co2114.agent.environment", "co2114.engine"]
+
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, [name for name in {watch} if name in sys.modules]]))
+"""
+
+
+def measure(module:str, repeats:int = 5) -> tuple[float, list[str]]:
+    """ Time importing a module in a fresh interpreter
+
+    :param module: dotted name of module to import
+    :param repeats: # of interpreters to start, the fastest is reported
+    :return: (seconds, GUI modules and NumPy if loaded by the import)
+    """
+    best, loaded = float("inf"), []
+    for _ in range(repeats):
+        process = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, watch=GUI_MODULES + ["numpy"])],
+            capture_output=True, text=True, check=True)
+        elapsed, loaded = json.loads(process.stdout.strip().splitlines()[-1])
+        best = min(best, elapsed)
+    return best, loaded
+
+
+def main(limit:float = 0.25, repeats:int = 5) -> bool:
+    """ Benchmark imports, checking headless modules stay headless and fast
+
+    :param limit: max. seconds to import any headless module
+    :param repeats: # of fresh interpreters per module
+    :return: True if every headless module passes
+    """
+    passed = True
+    for module in HEADLESS + GRAPHICAL:
+        elapsed, loaded = measure(module, repeats)
+        status = ""
+        if module in HEADLESS:
+            unwanted = [name for name in loaded
+                            if name in GUI_MODULES or module in NUMPY_FREE]
+            ok = not unwanted and elapsed <= limit
+            passed &= ok
+            status = "ok" if ok else "FAIL"
+        print(f"{module:<32} {1000*elapsed:8.1f} ms  {status:<4}  {', '.join(loaded)}")
+    return passed
+
+
+if __name__ == "__main__":
+
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=float, default=0.25,
+        help="Max. seconds to import a headless module.")
+    parser.add_argument("--repeats", type=int, default=5,
+        help="Number of fresh interpreters per module.")
+    args = parser.parse_args()
+
+    sys.exit(0 if main(args.limit, args.repeats) else 1)
@@ -0,0 +1,227 @@
+import hashlib
+import inspect
+import os
+import pickle
+import sqlite3
+
+VERSION = 1  # layout of the cache file, older files are emptied on open
+
+Key = int | str | bytes  # ints must fit in 64 bits
+_MISSING = object()  # default of lookups, as None may be a stored value
+
+
+def code_version(*objects) -> str:
+    """ Short digest of the source code of functions or classes
+
+    Falls back to the compiled code, or the name, where the source cannot
+    be found, e.g. for classes defined interactively.
+    """
+    digest = hashlib.sha256()
+    for obj in objects:
+        try:
+            digest.update(inspect.getsource(obj).encode())
+        except (OSError, TypeError):
+            code = getattr(obj, "__code__", None)
+            digest.update(code.co_code if code is not None
+                          else getattr(obj, "__qualname__", repr(obj)).encode())
+    return digest.hexdigest()[:16]
+
+
+def code_namespace(agent:object, *settings:object) -> str:
+    """ Namespace for the values computed by an agent's code
+
+    Combines the agent's class name, a digest of the code of that class and
+    every class it inherits from, and any settings that change its values,
+    such as an objective. Editing the code of the agent, or of a class it
+    inherits from, gives a new namespace, so stale values are never read.
+
+    :param    agent: agent, or class of agent
+    :param settings: values the agent's results depend on
+    :return: namespace string
+    """
+    cls = agent if isinstance(agent, type) else type(agent)
+    classes = [base for base in cls.__mro__ if base.__module__ != "builtins"]
+    return ":".join([cls.__qualname__, code_version(*classes), *map(str, settings)])
+
+
+class PersistentCache:
+    """ Memo of computed values kept in a file, surviving restarts
+
+    Maps keys, such as canonical state hashes, to picklable values, within
+    a namespace identifying the code that computed them (see
+    `code_namespace`). Supports `get`, `in`, `[]` and `[] =` like the
+    dictionary it replaces, so it can serve as an agent's cache.
+
+    Entries are stored in SQLite, which several processes may share. Writes
+    and least recently used times are buffered and written `batch` at a
+    time, or on `flush` or `close`. When the file holds more than
+    `max_entries` entries, of any namespace, the least recently used are
+    evicted, so values from old versions of code age out.
+
+    A cache pickles as its path and namespace, reopening the file on unpickling.
+    """
+    def __init__(self,
+                 path:str | os.PathLike,
+                 namespace:str = "",
+                 max_entries:int = 1_000_000,
+                 batch:int = 1024) -> None:
+        """ Constructor for PersistentCache
+
+        :param        path: file path of the cache, created if missing
+        :param   namespace: namespace of the entries read and written
+        :param max_entries: max. # of entries kept in the file
+        :param       batch: # of buffered writes before writing to the file
+        """
+        if max_entries < 1:
+            raise ValueError(f"{self.__class__.__name__}: max_entries must be positive")
+        self.path, self.namespace = path, namespace
+        self.max_entries, self.batch = max_entries, batch
+        self.hits = self.misses = 0
+        self._pending:dict[Key, tuple[object, int]] = {}  # key: (value, last used), not yet written
+        self._touched:dict[Key, int] = {}  # key: last used, of entries read from the file
+
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            version, = self.connection.execute("PRAGMA user_version").fetchone()
+            if version != VERSION:
+                self.connection.execute("DROP TABLE IF EXISTS entries")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries (namespace TEXT, key, value BLOB,"
+                " used INTEGER, PRIMARY KEY (namespace, key)) WITHOUT ROWID")
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS entries_used ON entries (used)")
+            self.connection.execute(f"PRAGMA user_version={VERSION}")
+        self.clock, = self.connection.execute(
+            "SELECT COALESCE(MAX(used), 0) FROM entries").fetchone()
+
+    def __repr__(self) -> str:
+        """ String representation of the cache """
+        return f"{self.__class__.__name__}[{os.fspath(self.path)}]"
+
+    def __reduce__(self):
+        """ Pickle as the file path and settings, reopening on unpickling """
+        return (self.__class__, (self.path, self.namespace, self.max_entries, self.batch))
+
+    def __enter__(self) -> "PersistentCache":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _tick(self) -> int:
+        """ Next time of use """
+        self.clock += 1
+        return self.clock
+
+    def get(self, key:Key, default:object = None) -> object:
+        """ Value stored for a key, or default if not found
+
+        :param     key: key of the value
+        :param default: returned if the key is not found
+        """
+        if key in self._pending:
+            value, _ = self._pending[key]
+            self._pending[key] = (value, self._tick())
+            self.hits += 1
+            return value
+        row = self.connection.execute(
+            "SELECT value FROM entries WHERE namespace = ? AND key = ?",
+            (self.namespace, key)).fetchone()
+        if row is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._touched[key] = self._tick()
+        if len(self._touched) >= self.batch: self.flush()
+        return pickle.loads(row[0])
+
+    def put(self, key:Key, value:object) -> None:
+        """ Store a value for a key, replacing any value stored for it
+
+        :param   key: key of the value
+        :param value: picklable value
+        """
+        self._touched.pop(key, None)
+        self._pending[key] = (value, self._tick())
+        if len(self._pending) >= self.batch: self.flush()
+
+    def __contains__(self, key:Key) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __getitem__(self, key:Key) -> object:
+        value = self.get(key, _MISSING)
+        if value is _MISSING: raise KeyError(key)
+        return value
+
+    def __setitem__(self, key:Key, value:object) -> None:
+        self.put(key, value)
+
+    def __len__(self) -> int:
+        """ Number of entries in the namespace """
+        self.flush()
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM entries WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+
+    def flush(self) -> None:
+        """ Write buffered entries and times of use, then evict if over size """
+        if not (self._pending or self._touched): return
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO entries VALUES (?, ?, ?, ?) ON CONFLICT (namespace, key)"
+                " DO UPDATE SET value = excluded.value, used = excluded.used",
+                [(self.namespace, key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), used)
+                     for key, (value, used) in self._pending.items()])
+            self.connection.executemany(
+                "UPDATE entries SET used = MAX(used, ?) WHERE namespace = ? AND key = ?",
+                [(used, self.namespace, key) for key, used in self._touched.items()])
+            self._pending.clear()
+            self._touched.clear()
+            self.evict()
+
+    def evict(self) -> int:
+        """ Remove least recently used entries while over max_entries
+
+        Evicts down to 90% of max_entries, so eviction is not needed again
+        for a while.
+
+        :return: # of entries removed
+        """
+        count, = self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()
+        if count <= self.max_entries: return 0
+        excess = count - int(0.9 * self.max_entries)
+        self.connection.execute(
+            "DELETE FROM entries WHERE (namespace, key) IN"
+            " (SELECT namespace, key FROM entries ORDER BY used LIMIT ?)", (excess,))
+        return excess
+
+    def clear(self) -> None:
+        """ Remove every entry in the namespace """
+        self._pending.clear()
+        self._touched.clear()
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM entries WHERE namespace = ?", (self.namespace,))
+
+    def prune(self, prefix:str = "") -> int:
+        """ Remove entries of other namespaces, e.g. from old versions of code
+
+        :param prefix: only remove namespaces starting with prefix, e.g. a class name
+        :return: # of entries removed
+        """
+        with self.connection:
+            return self.connection.execute(
+                "DELETE FROM entries WHERE namespace != ? AND substr(namespace, 1, ?) = ?",
+                (self.namespace, len(prefix), prefix)).rowcount
+
+    @property
+    def hit_rate(self) -> float:
+        """ Fraction of lookups in this process that found an entry """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.
+
+    def close(self) -> None:
+        """ Write buffered entries and close the file """
+        self.flush()
+        self.connection.close()
@@ -0,0 +1,109 @@
+from ..search.things import UtilityBasedAgent
+from .minimax import Tile
+from math import inf
+
+from copy import deepcopy
+
+
+class MinimaxAgent(UtilityBasedAgent):
+
+    def to_move(self, state):
+        NotImplemented
+
+    def moves(self, state):
+        NotImplemented
+
+    def score(self, state):
+        NotImplemented
+    
+    def minimax_utility(self, state):
+        match self.to_move(state):
+            case "min":
+                return min(
+                    [self.minimax_utility(move) for move in self.moves(state)])
+            case "max":
+                return max(
+                    [self.minimax_utility(move) for move in self.moves(state)])
+            case "terminal":
+                return self.score(state)
+
+    def utility(self, action):
+        _, state = action
+        return self.minimax_utility(state)
+    
+    def program(self,percepts):
+        print(f"{self}: thinking ...")
+        state = percepts
+        if self.to_move(state) == "terminal":
+            return ("done", state)
+        
+        max_objective = -inf
+        action = self.maximise_utility(
+            [("move", move) for move in self.moves(state)])
+        
+        return action
+    
+
+class TicTacToeAgent(MinimaxAgent):
+    def __repr__(self):
+        if hasattr(self, "player"):
+            return self.player
+        return super().__repr__()
+        
+    def score(self, state):
+        draw = True  # check
+        index = lambda x,i,j: x[i][j]
+        def is_win(check):
+            if all(index(state, *idx).player == tile.player for idx in check):
+                return True
+            return False
+        
+        for i in range(3):
+            for j in range(3):
+                tile = index(state,i,j)
+                if not tile.player:  # is empty
+                    draw = False
+                    continue
+                check = [
+                    [((i_+1)%3, j) for i_ in range(i, i+2)],
+                    [(i,(j_+1)%3) for j_ in range(j, j+2)]]
+                if i==j:
+                    check.append([((i_+1)%3, (i_+1)%3) for i_ in range(i, i+2)])
+                if i+j == 2:
+                    check.append([((i_+1)%3, (2-(i_+1)%3)%3) for i_ in range(i, i+2)])
+                if any(is_win(idxs) for idxs in check):
+                    return 1 if tile.player == self.player else -1
+        
+        return 0 if draw else None
+
+    def move(self, state):
+        return state
+    
+    def moves(self, state):
+        to_move = self.to_move(state)
+        if self.player == "X":
+            player = "X" if to_move == "max" else "O"
+        else:
+            player = "O" if to_move == "max" else "X"
+        possible_moves = []
+        for i in range(3):
+            for j in range(3):
+                if not state[i][j].player:
+                    move = deepcopy(state)#.copy()
+                    move[i][j] = Tile(player)
+                    possible_moves.append(move)
+        return possible_moves
+
+    def to_move(self, state):
+        if self.score(state) is not None:
+            return "terminal"
+        moves_made = {"X":0, "O":0}
+        for i in range(3):
+            for j in range(3):
+                if state[i][j].player:
+                    moves_made[state[i][j].player] += 1
+        match self.player:
+            case "X":
+                return "max" if moves_made["X"] < moves_made["O"] else "min"
+            case "O":
+                return "max" if moves_made["O"] < moves_made["X"] else "min"
@@ -0,0 +1,751 @@
+import numpy as np
+from numpy import inf as infinity
+from ..optimisation.things import *
+from ..search.things import UtilityBasedAgent
+from ..search.util import manhattan
+from .distances import (
+    Location, Numeric,
+    as_array, distance_matrix, grid_cells, max_distance, BottleneckTracker,
+    TravelDistances, CapacitatedAssignment, OBJECTIVES, objective_vectors)
+from .pareto import ParetoArchive
+import hashlib
+
+from collections import OrderedDict
+
+from collections.abc import MutableMapping
+from typing import override
+
+State = None | dict[str, dict[House | Hospital, Location] | dict[str, int]]
+
+
+class HospitalOptimiser(Optimiser, UtilityBasedAgent):
+    """ Hospital Optimiser Agent"""
+    def explore(self, state:State) -> None:
+        """ Move hospitals to new locations in state
+        
+        :param state: new state with hospital locations
+        """
+        if not state: return
+        print(f"{self}: exploring state\n    {state['hospitals']}")
+        for hospital, loc in state["hospitals"].items():
+            hospital.location = loc
+
+    @override
+    def utility(self, state:State) -> Numeric:
+        """ Calculate utility of possible state by calculating distance
+            of each hospital to houses
+        
+        Returns negative total distance to be minimised. If the state has
+        travel distances, i.e. the environment has obstacles, distances are
+        shortest routes around them rather than Manhattan distances.
+
+        :param state: current state with hospital and house locations
+        :return: negative total distance
+        """
+        travel: TravelDistances | None = state.get("travel")
+        if travel is not None:
+            return -travel.total(as_array(state["hospitals"]))
+
+        obj = 0
+        houses: dict[House, Location] = state["houses"]  # type: ignore
+        hospitals: dict[Hospital, Location] = state["hospitals"]  # type: ignore
+
+        for house in houses: # iterate over houses
+            dist_to_nearest_hospital = infinity   # very big
+
+            for hospital in hospitals:  # iterate over hospitals
+                house_loc    = houses[house]
+                hospital_loc = hospitals[hospital]
+
+                dist = manhattan(house_loc, hospital_loc)
+
+                # calculate closest distance
+                if dist < dist_to_nearest_hospital:
+                    dist_to_nearest_hospital = dist
+
+            obj += dist_to_nearest_hospital # add distance for this house
+        return -obj
+
+
+class KMediansOptimiser(HospitalOptimiser):
+    """ Hospital Optimiser using alternating assignment and median updates
+
+    Minimising the total Manhattan distance from each house to its nearest
+    hospital is the discrete k-medians problem. Each step assigns every house
+    to its nearest hospital, then moves each hospital to the coordinate-wise
+    median of its houses (optimal under Manhattan distance), snapped to the
+    nearest free cell. Stops once a step no longer improves the objective.
+    With seeding, the seeded layout is tried before the first step, and only
+    explored if it improves on the current one.
+    """
+    def __init__(self, seeding:bool = True, seed:int | None = None) -> None:
+        """ Constructor for KMediansOptimiser
+
+        :param seeding: if True, the first step proposes hospitals placed by k-medians++ seeding, otherwise starts from the current layout
+        :param seed: optional seed for the random number generator
+        """
+        super().__init__()
+        self.seeding = seeding
+        self.seeded = False
+        self.rng = np.random.default_rng(seed)
+
+    def seed(self, houses:np.ndarray, k:int) -> np.ndarray:
+        """ k-medians++ seeding of k centres from house locations
+
+        The first centre is a house chosen uniformly, each subsequent centre
+        is a house chosen with probability proportional to its distance to
+        the nearest centre chosen so far.
+
+        :param houses: (n, 2) array of house locations
+        :param k: number of centres
+        :return: (k, 2) array of centres
+        """
+        centres = [houses[self.rng.integers(len(houses))]]
+        for _ in range(1, k):
+            dist = distance_matrix(houses, np.array(centres)).min(axis=1)
+            total = dist.sum()
+            if total == 0:  # every house already has a centre on it
+                i = self.rng.integers(len(houses))
+            else:
+                i = self.rng.choice(len(houses), p=dist/total)
+            centres.append(houses[i])
+        return np.array(centres)
+
+    def update(self, houses:np.ndarray, centres:np.ndarray) -> np.ndarray:
+        """ Move each centre to the median of the houses assigned to it
+
+        :param houses: (n, 2) array of house locations
+        :param centres: (k, 2) array of current centres
+        :return: (k, 2) array of updated centres
+        """
+        nearest = distance_matrix(houses, centres).argmin(axis=1)
+        medians = centres.copy()
+        for i in range(len(centres)):
+            members = houses[nearest == i]
+            if len(members) > 0:  # centres with no houses stay put
+                medians[i] = np.floor(np.median(members, axis=0))
+        return medians
+
+    def snap(self,
+             centres:np.ndarray,
+             houses:np.ndarray,
+             bounds:dict[str, int],
+             obstacles:np.ndarray | None = None) -> np.ndarray:
+        """ Move each centre to the nearest free cell, in turn
+
+        Cells holding a house or obstacle, or already claimed by an earlier
+        centre, are not free.
+
+        :param centres: (k, 2) array of centres
+        :param houses: (n, 2) array of house locations
+        :param bounds: bounds of the environment, as in state["bounds"]
+        :param obstacles: optional (m, 2) array of obstacle locations
+        :return: (k, 2) array of snapped centres
+        """
+        cells, free = grid_cells(houses, bounds, obstacles)
+
+        snapped = np.empty_like(centres)
+        for i, centre in enumerate(centres):
+            dist = np.abs(cells - centre).sum(axis=1)
+            j = np.argmin(np.where(free, dist, infinity))
+            snapped[i] = cells[j]
+            free[j] = False  # one hospital per cell
+        return snapped
+
+    @override
+    def program(self,
+                percepts:tuple[State, list[State]]) -> tuple[str, State | None]:
+        """ One assignment/median-update iteration
+
+        :param percepts: current state and neighbouring states
+        :return: ("explore", state) with updated hospital locations, or ("done", None) on convergence
+        """
+        state, _ = percepts
+        hospitals = list(state["hospitals"])
+        if len(hospitals) == 0 or len(state["houses"]) == 0:
+            return ("done", None)
+
+        houses = as_array(state["houses"])
+        centres = as_array(state["hospitals"])
+        obstacles = state.get("obstacles")
+
+        proposals = []
+        if self.seeding and not self.seeded:  # tried first, kept only if better
+            self.seeded = True
+            proposals.append(self.snap(
+                self.seed(houses, len(hospitals)), houses, state["bounds"], obstacles))
+        proposals.append(self.snap(
+            self.update(houses, centres), houses, state["bounds"], obstacles))
+
+        current = self.utility(state)
+        for proposal in proposals:
+            candidate = state.copy()
+            candidate["hospitals"] = {
+                hospital: tuple(loc.tolist())
+                    for hospital, loc in zip(hospitals, proposal)}
+            new = self.utility(candidate)
+            print(f"{self}: current distance {-current}, proposed {-new}")
+            if new > current:
+                return ("explore", candidate)
+        return ("done", None)  # converged
+
+
+class MaxDistanceOptimiser(HospitalOptimiser):
+    """ Hospital Optimiser for the worst-case (max-distance) objective
+
+    Utility is the negative distance from the worst-served house to its
+    nearest hospital. Ties are broken by the number of houses at that
+    distance, so local search can still make progress across plateaus.
+
+    Without obstacles, the layout last explored is kept in a
+    `BottleneckTracker`, so a neighbour moving one hospital is evaluated in
+    O(houses) from the nearest and second nearest hospital of each house.
+    """
+    def __init__(self) -> None:
+        """ Constructor for MaxDistanceOptimiser """
+        super().__init__()
+        self.tracker: BottleneckTracker | None = None
+
+    def track(self, state:State) -> tuple[BottleneckTracker, np.ndarray]:
+        """ Tracker for the houses of a state, and hospitals it places differently
+
+        The tracker is rebuilt from the state when the houses or the number
+        of hospitals differ from those tracked.
+
+        :param state: state with hospital and house locations
+        :return: (tracker, indices of hospitals at other locations in the state)
+        """
+        houses, hospitals = as_array(state["houses"]), as_array(state["hospitals"])
+        if self.tracker is None or not np.array_equal(houses, self.tracker.houses) \
+                or len(hospitals) != len(self.tracker.hospitals):
+            self.tracker = BottleneckTracker(houses, hospitals)
+        moved = np.flatnonzero((hospitals != self.tracker.hospitals).any(axis=1))
+        return self.tracker, moved
+
+    @override
+    def explore(self, state:State) -> None:
+        """ Move hospitals to new locations in state, and in the tracker
+
+        :param state: new state with hospital locations
+        """
+        super().explore(state)
+        if not state or state.get("travel") is not None: return
+        tracker, moved = self.track(state)
+        hospitals = as_array(state["hospitals"])
+        for i in moved:
+            tracker.move(i, hospitals[i])
+
+    @override
+    def utility(self, state:State) -> Numeric:
+        """ Negative worst-case distance, less a fraction for each bottleneck house
+
+        :param state: current state with hospital and house locations
+        :return: negative worst-case distance
+        """
+        houses = as_array(state["houses"])
+        if len(houses) == 0: return 0
+        travel: TravelDistances | None = state.get("travel")
+        hospitals = as_array(state["hospitals"])
+        if travel is not None:
+            nearest = travel.nearest(hospitals)
+        else:
+            tracker, moved = self.track(state)
+            if len(moved) == 0:
+                nearest = tracker.nearest
+            elif len(moved) == 1:  # a neighbour, evaluated incrementally
+                nearest = tracker.nearest_after(moved[0], hospitals[moved[0]])
+            else:
+                nearest = distance_matrix(houses, hospitals).min(axis=1)
+        worst = nearest.max()
+        return -worst - (nearest == worst).sum()/(len(houses)+1)
+
+
+class KCenterOptimiser(MaxDistanceOptimiser):
+    """ Hospital Optimiser solving the max-distance (k-center) problem directly
+
+    Tries candidate radii, the distinct distances from cells to houses, from
+    smallest to largest, stopping at the first at which every house can be
+    covered by one hospital or another, choosing hospital cells greedily by
+    how many uncovered houses they reach. The greedy cover may fail at a
+    radius larger than one where it succeeds, so radii are checked in turn
+    rather than binary searched. Hospitals left over once every house is
+    covered stay where they are, if free.
+    """
+    def cover(self, reach:np.ndarray, k:int) -> list[int] | None:
+        """ Greedily choose at most k cells covering every house
+
+        :param reach: (cells, houses) boolean array, True where a cell is within radius of a house
+        :param k: maximum number of cells to choose
+        :return: indices of chosen cells, or None if k cells do not suffice
+        """
+        uncovered = np.ones(reach.shape[1], dtype=bool)
+        chosen = []
+        for _ in range(k):
+            if not uncovered.any(): break
+            counts = reach[:, uncovered].sum(axis=1)
+            j = int(np.argmax(counts))
+            chosen.append(j)
+            uncovered &= ~reach[j]
+        return None if uncovered.any() else chosen
+
+    def solve(self, state:State) -> dict[Hospital, Location]:
+        """ Hospital locations minimising the worst-case distance
+
+        :param state: current state with hospital and house locations
+        :return: dictionary of hospitals to new locations
+        """
+        hospitals = list(state["hospitals"])
+        houses = as_array(state["houses"])
+        cells, free = grid_cells(houses, state["bounds"], state.get("obstacles"))
+        cells = cells[free]
+        dist = distance_matrix(cells, houses)
+
+        for radius in np.unique(dist):  # smallest radius with a greedy cover
+            best = self.cover(dist <= radius, len(hospitals))
+            if best is not None: break
+
+        locations = [tuple(cells[j].tolist()) for j in best]
+        for hospital in hospitals[len(best):]:  # spare hospitals stay if free
+            loc = state["hospitals"][hospital]
+            if loc in locations:
+                loc = next(tuple(cell.tolist()) for cell in cells
+                                if tuple(cell.tolist()) not in locations)
+            locations.append(loc)
+        return dict(zip(hospitals, locations))
+
+    @override
+    def program(self,
+                percepts:tuple[State, list[State]]) -> tuple[str, State | None]:
+        """ Solve once, then finish
+
+        :param percepts: current state and neighbouring states
+        :return: ("done", state) with the solved layout if it improves on the current one, else ("done", None)
+        """
+        state, _ = percepts
+        if len(state["hospitals"]) == 0 or len(state["houses"]) == 0:
+            return ("done", None)
+
+        candidate = state.copy()
+        candidate["hospitals"] = self.solve(state)
+        houses = as_array(state["houses"])
+        print(f"{self}: current distance "
+              f"{max_distance(houses, as_array(state['hospitals']))}, "
+              f"proposed {max_distance(houses, as_array(candidate['hospitals']))}")
+        if self.utility(candidate) > self.utility(state):
+            return ("done", candidate)
+        return ("done", None)
+
+
+class CapacitatedOptimiser(HospitalOptimiser):
+    """ Hospital Optimiser for total distance when hospitals have limited capacity
+
+    Utility is the negative total distance when each house is served by a
+    hospital with room for it, rather than by its nearest, as assigned by
+    `CapacitatedAssignment`. Assignments of the last `keep` layouts
+    evaluated are kept, and a layout differing from one of them in a single
+    hospital warm starts from its assignment, so evaluating the neighbours
+    of a state, each moving one hospital one cell, needs only a few cycles
+    each. Mix in before an optimiser for its program, e.g.
+    `class Agent(CapacitatedOptimiser, HillClimbOptimiser)`.
+    """
+    def __init__(self, capacity:int | list[int], keep:int = 64) -> None:
+        """ Constructor for CapacitatedOptimiser
+
+        :param capacity: max. # of houses served by each hospital, or by every hospital
+        :param keep: # of recent layouts to keep assignments for
+        """
+        super().__init__()
+        self.capacity = capacity
+        self.keep = keep
+        self.solver: CapacitatedAssignment | None = None
+        self.houses: np.ndarray | None = None
+        self.assignments: OrderedDict[tuple[Location, ...], np.ndarray] = OrderedDict()
+
+    def costs(self, state:State) -> np.ndarray:
+        """ Distance from each house to each hospital, travel distance if the state has it
+
+        :param state: state with hospital and house locations
+        :return: (n, k) array of distances
+        """
+        hospitals = as_array(state["hospitals"])
+        travel: TravelDistances | None = state.get("travel")
+        if travel is not None:
+            return np.column_stack([travel.from_cell(loc) for loc in hospitals]) \
+                if len(hospitals) else np.zeros((len(travel.houses), 0))
+        return distance_matrix(as_array(state["houses"]), hospitals)
+
+    def assign(self, state:State, cost:np.ndarray | None = None) -> np.ndarray:
+        """ Optimal capacitated assignment of houses to hospitals in a state
+
+        :param state: state with hospital and house locations
+        :param cost: optional distances of the state, from `costs`
+        :return: (n,) array of the index of the hospital, in state order, serving each house
+        """
+        houses = as_array(state["houses"])
+        k = len(state["hospitals"])
+        if self.houses is None or not np.array_equal(houses, self.houses) \
+                or len(self.solver.capacity) != k:  # new problem, start afresh
+            capacity = [self.capacity] * k if np.isscalar(self.capacity) else self.capacity
+            self.solver = CapacitatedAssignment(capacity)
+            self.houses = houses
+            self.assignments.clear()
+
+        layout = tuple(tuple(map(int, loc)) for loc in state["hospitals"].values())
+        if layout in self.assignments:
+            self.assignments.move_to_end(layout)
+            return self.assignments[layout]
+        start = next((assignment for other, assignment in reversed(self.assignments.items())
+                          if sum(a != b for a, b in zip(layout, other)) <= 1), None)
+        cost = self.costs(state) if cost is None else cost
+        assignment = self.solver.solve(cost, start)
+        self.assignments[layout] = assignment
+        if len(self.assignments) > self.keep: self.assignments.popitem(last=False)
+        return assignment
+
+    @override
+    def utility(self, state:State) -> Numeric:
+        """ Negative total distance from houses to the hospitals assigned to them
+
+        :param state: state with hospital and house locations
+        :return: negative total distance, -inf if some house cannot be reached
+        """
+        if len(state["houses"]) == 0: return 0
+        cost = self.costs(state)
+        total = cost[np.arange(len(cost)), self.assign(state, cost)].sum()
+        return -total if np.isfinite(total) else -infinity
+
+
+class GeneticOptimiser(HospitalOptimiser):
+    """ Hospital Optimiser evolving a population of layouts
+
+    A layout is a row of k indices into the free cells of the grid, so the
+    population is a (P, k) integer array. Fitness of every layout is the
+    same objective as `utility`, evaluated for the whole population in one
+    vectorised pass. Each step is one generation: tournament selection,
+    uniform crossover, mutation by a short move or a jump to any free cell,
+    then repair of layouts placing two hospitals on the same cell. The
+    best layouts are carried over unchanged.
+
+    Explores the best layout whenever it improves, and finishes after
+    `generations` generations, or `patience` generations without improvement.
+    """
+    def __init__(self,
+                 population:int = 100,
+                 generations:int = 200,
+                 mutation:float = 0.1,
+                 elite:int = 2,
+                 patience:int = 30,
+                 objective:str = "sum",
+                 seed:int | None = None) -> None:
+        """ Constructor for GeneticOptimiser
+
+        :param population: # of layouts in the population
+        :param generations: max. # of generations
+        :param mutation: probability of mutating each hospital of a child
+        :param elite: # of best layouts carried over to the next generation
+        :param patience: # of generations without improvement before finishing
+        :param objective: "sum" to minimise total distance, "max" for worst-case distance
+        :param seed: optional seed for the random number generator
+        """
+        super().__init__()
+        if objective not in ("sum", "max"):
+            raise ValueError(f"{self}: unknown objective {objective}")
+        self.size = population
+        self.generations = generations
+        self.mutation = mutation
+        self.elite = elite
+        self.patience = patience
+        self.objective = objective
+        self.rng = np.random.default_rng(seed)
+        self.population: np.ndarray | None = None  # (P, k) indices into cells
+        self.scores: np.ndarray | None = None  # fitness of population
+        self.generation = self.since_best = 0
+        self.best, self.best_fitness = None, infinity
+
+    def setup(self, state:State) -> None:
+        """ Find the free cells and seed the population around the current layout
+
+        :param state: current state with hospital and house locations
+        """
+        houses = as_array(state["houses"])
+        cells, free = grid_cells(houses, state["bounds"], state.get("obstacles"))
+        self.cells = cells[free]
+        self.houses = houses
+        self.travel: TravelDistances | None = state.get("travel")
+        xmax, ymax = state["bounds"]["xmax"], state["bounds"]["ymax"]
+        self.lookup = np.full((xmax+1, ymax+1), -1)  # cell -> index into cells, -1 if not free
+        self.lookup[self.cells[:, 0], self.cells[:, 1]] = np.arange(len(self.cells))
+
+        k = len(state["hospitals"])
+        if len(self.cells) < k:
+            raise ValueError(f"{self}: fewer free cells than hospitals")
+        current = self.lookup[tuple(as_array(state["hospitals"]).T)]
+        population = self.rng.integers(len(self.cells), size=(self.size, k))
+        population[0] = np.where(current >= 0, current, population[0])
+        self.population = self.repair(population)
+
+    def fitness(self, population:np.ndarray) -> np.ndarray:
+        """ Objective of every layout in a population, to be minimised
+
+        :param population: (P, k) array of indices into cells
+        :return: (P,) total or worst-case distance from houses to their nearest hospital
+        """
+        if self.travel is not None:  # distances around obstacles, per distinct cell
+            unique, inverse = np.unique(population, return_inverse=True)
+            table = np.stack([self.travel.from_cell(self.cells[i]) for i in unique])
+            dist = table[inverse.reshape(population.shape)]  # (P, k, N)
+        else:
+            locations = self.cells[population]  # (P, k, 2)
+            dist = np.abs(
+                locations[:, :, None, :] - self.houses[None, None, :, :]).sum(axis=-1)
+        nearest = dist.min(axis=1)  # (P, N)
+        return nearest.sum(axis=1) if self.objective == "sum" else nearest.max(axis=1)
+
+    def repair(self, population:np.ndarray) -> np.ndarray:
+        """ Move hospitals sharing a cell with another to random free cells
+
+        :param population: (P, k) array of indices into cells, modified in place
+        :return: the population with k distinct cells per layout, sorted
+        """
+        while True:
+            population.sort(axis=1)
+            clash = np.zeros(population.shape, dtype=bool)
+            clash[:, 1:] = population[:, 1:] == population[:, :-1]
+            if not clash.any(): return population
+            population[clash] = self.rng.integers(len(self.cells), size=clash.sum())
+
+    def select(self, fitness:np.ndarray, n:int) -> np.ndarray:
+        """ Pick n parents by tournaments between two random layouts
+
+        :return: (n,) indices into the population
+        """
+        a, b = self.rng.integers(len(fitness), size=(2, n))
+        return np.where(fitness[a] <= fitness[b], a, b)
+
+    def mutate(self, population:np.ndarray) -> np.ndarray:
+        """ Move each hospital with probability `mutation`, half by one cell, half anywhere
+
+        :param population: (P, k) array of indices into cells, modified in place
+        :return: the mutated population
+        """
+        mutate = self.rng.random(population.shape) < self.mutation
+        local = mutate & (self.rng.random(population.shape) < 0.5)
+
+        moves = np.array([(-1, 0), (1, 0), (0, -1), (0, 1)])
+        moved = self.cells[population[local]] \
+            + moves[self.rng.integers(len(moves), size=local.sum())]
+        inside = (moved >= 0).all(axis=1) & (moved < self.lookup.shape).all(axis=1)
+        target = np.full(len(moved), -1)
+        target[inside] = self.lookup[moved[inside, 0], moved[inside, 1]]
+        population[local] = np.where(target >= 0, target, population[local])
+
+        jump = mutate & ~local
+        population[jump] = self.rng.integers(len(self.cells), size=jump.sum())
+        return population
+
+    def evolve(self) -> np.ndarray:
+        """ Replace the population with the next generation
+
+        :return: (P,) fitness of the new population
+        """
+        fitness = self.fitness(self.population) if self.scores is None else self.scores
+        order = np.argsort(fitness)
+        elite = self.population[order[:self.elite]]
+
+        n = self.size - len(elite)
+        mothers = self.population[self.select(fitness, n)]
+        fathers = self.population[self.select(fitness, n)]
+        children = np.where(self.rng.random(mothers.shape) < 0.5, mothers, fathers)
+        children = self.repair(self.mutate(children))
+
+        self.population = np.concatenate([elite, children])
+        self.scores = self.fitness(self.population)
+        self.generation += 1
+        return self.scores
+
+    @override
+    def program(self,
+                percepts:tuple[State, list[State]]) -> tuple[str, State | None]:
+        """ One generation, exploring the best layout found if it improved
+
+        :param percepts: current state and neighbouring states
+        :return: ("explore", state) with the best layout, or ("done", state) when finished
+        """
+        state, _ = percepts
+        if len(state["hospitals"]) == 0 or len(state["houses"]) == 0:
+            return ("done", None)
+        if self.population is None: self.setup(state)
+
+        fitness = self.evolve()
+        i = int(np.argmin(fitness))
+        if fitness[i] < self.best_fitness:
+            self.best_fitness, self.since_best = fitness[i], 0
+            self.best = state.copy()
+            self.best["hospitals"] = {
+                hospital: tuple(loc.tolist())
+                    for hospital, loc in zip(state["hospitals"], self.cells[self.population[i]])}
+        else:
+            self.since_best += 1
+        print(f"{self}: generation {self.generation}, best distance {self.best_fitness}")
+
+        if self.generation >= self.generations or self.since_best >= self.patience:
+            return ("done", self.best)
+        if self.since_best == 0:
+            return ("explore", self.best)
+        return ("explore", None)
+
+
+def placement_key(state:State) -> str:
+    """ Canonical hash of the layout of a state
+
+    The same for any order of hospitals, houses or obstacles, so equal
+    layouts share a key across runs.
+
+    :param state: state with hospital, house and obstacle locations and bounds
+    :return: hex digest of the layout
+    """
+    locations = lambda locs: sorted(tuple(map(int, loc)) for loc in locs)
+    layout = (locations(state["hospitals"].values()),
+              locations(state["houses"].values()),
+              locations(state.get("obstacles") or []),
+              sorted(state["bounds"].items()))
+    return hashlib.blake2b(repr(layout).encode(), digest_size=16).hexdigest()
+
+
+class MemoisedOptimiser(HospitalOptimiser):
+    """ Hospital Optimiser looking up utilities in a cache before computing them
+
+    Mixed in before an optimiser, e.g.
+    `class Agent(MemoisedOptimiser, HillClimbOptimiser)`, with `memo` set to
+    a `PersistentCache` namespaced by `code_namespace(agent)`, utilities
+    computed by earlier runs of the same code are read rather than computed.
+    Utilities are keyed by `placement_key`.
+    """
+    memo: MutableMapping | None = None  # placement key -> utility, None to always compute
+
+    @override
+    def utility(self, state:State) -> Numeric:
+        """ Utility of a state, from memo if computed before
+
+        :param state: state with hospital and house locations
+        :return: utility of the optimiser mixed with
+        """
+        if self.memo is None: return super().utility(state)
+        key = placement_key(state)
+        value = self.memo.get(key)
+        if value is None:
+            value = super().utility(state)
+            self.memo[key] = value
+        return value
+
+
+def evaluate_all(states:list[State], radius:Numeric = 5) -> np.ndarray:
+    """ Every objective of each state, from one distance computation
+
+    States must have the same houses and number of hospitals, as the
+    neighbours of a state do. Distances are travel distances if the states
+    have them, Manhattan distances otherwise.
+
+    :param states: states with hospital and house locations
+    :param radius: distance within which a house counts as covered
+    :return: (p, 4) array of total, worst-case and mean distance, and
+             fraction of houses covered, in the order of OBJECTIVES
+    """
+    if len(states) == 0: return np.empty((0, len(OBJECTIVES)))
+    houses = as_array(states[0]["houses"])
+    layouts = np.stack([as_array(state["hospitals"]).reshape(-1, 2) for state in states])
+    travel: TravelDistances | None = states[0].get("travel")
+    if layouts.shape[1] == 0:
+        nearest = np.full((len(states), len(houses)), np.inf)
+    elif travel is not None:
+        nearest = np.stack([travel.nearest(layout) for layout in layouts])
+    else:  # (p, k, n) distances, nearest over hospitals
+        nearest = np.abs(layouts[:, :, None, :] - houses[None, None, :, :]).sum(axis=-1).min(axis=1)
+    return objective_vectors(nearest, radius)
+
+
+def evaluate(state:State, radius:Numeric = 5) -> dict[str, Numeric]:
+    """ Every objective of a state, from one distance computation
+
+    :param state: state with hospital and house locations
+    :param radius: distance within which a house counts as covered
+    :return: dictionary of total, worst-case and mean distance, and fraction of houses covered
+    """
+    return dict(zip(OBJECTIVES, evaluate_all([state], radius)[0].tolist()))
+
+
+class ParetoOptimiser(HospitalOptimiser):
+    """ Hospital Optimiser finding the trade-off between several objectives
+
+    Pareto local search: keeps an archive of layouts not dominated in the
+    chosen `objectives`, any of "sum", "max", "mean" and "coverage" (the
+    fraction of houses within `radius`, maximised, the rest minimised).
+    Each step evaluates every neighbour of the current layout in one pass,
+    adds them to the archive, and explores a layout in the archive whose
+    neighbours have not been evaluated yet. Finishes when every layout in
+    the archive has been explored, leaving the best layout by the first
+    objective. `trade_offs` gives the front found so far.
+    """
+    def __init__(self,
+                 objectives:tuple[str, ...] = ("sum", "max"),
+                 radius:Numeric = 5,
+                 size:int = 100) -> None:
+        """ Constructor for ParetoOptimiser
+
+        :param objectives: names of objectives to trade off, from OBJECTIVES
+        :param radius: distance within which a house counts as covered
+        :param size: max. # of layouts in the archive
+        """
+        super().__init__()
+        for objective in objectives:
+            if objective not in OBJECTIVES:
+                raise ValueError(f"{self}: unknown objective {objective}")
+        self.objectives = tuple(objectives)
+        self.radius = radius
+        self.columns = [OBJECTIVES.index(objective) for objective in objectives]
+        self.signs = np.array([-1 if objective == "coverage" else 1
+                                   for objective in objectives])  # all minimised
+        self.archive = ParetoArchive(size)
+        self.explored: set[tuple[Location, ...]] = set()
+
+    @staticmethod
+    def layout(state:State) -> tuple[Location, ...]:
+        """ Hospital locations of a state, in any order of hospitals """
+        return tuple(sorted(tuple(map(int, loc)) for loc in state["hospitals"].values()))
+
+    def vectors(self, states:list[State]) -> np.ndarray:
+        """ Objective vectors of states, all objectives minimised
+
+        :return: (p, # objectives) array
+        """
+        return evaluate_all(states, self.radius)[:, self.columns] * self.signs
+
+    def trade_offs(self) -> list[dict[str, object]]:
+        """ Objectives and hospital locations of each layout on the front
+
+        :return: list of dictionaries, sorted by the first objective
+        """
+        return [dict(zip(self.objectives, (point * self.signs).tolist()),
+                     hospitals=list(state["hospitals"].values()))
+                    for point, state in self.archive.front()]
+
+    @override
+    def program(self,
+                percepts:tuple[State, list[State]]) -> tuple[str, State | None]:
+        """ Add the neighbours of the current layout to the archive, then explore an unexplored layout
+
+        :param percepts: current state and neighbouring states
+        :return: ("explore", state) of an unexplored layout, or ("done", state) when none are left
+        """
+        state, neighbours = percepts
+        if len(state["hospitals"]) == 0 or len(state["houses"]) == 0:
+            return ("done", None)
+        self.explored.add(self.layout(state))
+        candidates = [state] + neighbours
+        self.archive.update(self.vectors(candidates), candidates)
+        print(f"{self}: {len(self.archive)} layouts on the front, {len(self.explored)} explored")
+
+        for _, candidate in self.archive:
+            if self.layout(candidate) not in self.explored:
+                return ("explore", candidate)
+        return ("done", self.archive.front()[0][1])
@@ -0,0 +1,139 @@
+from collections.abc import Iterator
+
+import numpy as np
+
+
+def dominates(a:np.ndarray, b:np.ndarray) -> bool:
+    """ Whether point a dominates point b, all objectives minimised
+
+    a dominates b if it is no worse in every objective and better in at least one.
+    """
+    a, b = np.asarray(a), np.asarray(b)
+    return bool((a <= b).all() and (a < b).any())
+
+
+def non_dominated(points:np.ndarray) -> np.ndarray:
+    """ Points not dominated by any other, all objectives minimised
+
+    Compares every pair at once, so suits batches of up to a few thousand
+    points. Of points with equal objectives, only the first is kept.
+
+    :param points: (p, d) array of objective vectors
+    :return: (p,) boolean array, True for non-dominated points
+    """
+    points = np.asarray(points, dtype=float)
+    no_worse = (points[:, None, :] <= points[None, :, :]).all(axis=-1)  # [i, j]: i no worse than j
+    better = (points[:, None, :] < points[None, :, :]).any(axis=-1)
+    dominated = (no_worse & better).any(axis=0)
+    equal = no_worse & no_worse.T
+    duplicate = np.triu(equal, 1).any(axis=0)  # equal to an earlier point
+    return ~(dominated | duplicate)
+
+
+class ParetoArchive:
+    """ Archive of mutually non-dominated points, all objectives minimised
+
+    Holds each point's objective vector, as a row of one array, and an item,
+    such as the layout it came from. A point is only added if no point in
+    the archive is as good in every objective, and points it dominates are
+    removed, each check a single NumPy comparison with the whole archive.
+    Beyond `size` points, the most crowded are dropped, keeping the best
+    point in each objective and an even spread along the front.
+    """
+    def __init__(self, size:int = 100) -> None:
+        """ Constructor for ParetoArchive
+
+        :param size: max. # of points kept
+        """
+        if size < 2:
+            raise ValueError(f"{self.__class__.__name__}: size must be at least 2")
+        self.size = size
+        self.points:np.ndarray | None = None  # (m, d) objective vectors
+        self.items:list[object] = []
+
+    def __len__(self) -> int:
+        """ Number of points in the archive """
+        return len(self.items)
+
+    def __repr__(self) -> str:
+        """ String representation of the archive """
+        return f"{self.__class__.__name__}[{len(self)}]"
+
+    def __iter__(self) -> Iterator[tuple[np.ndarray, object]]:
+        """ (objective vector, item) of each point, oldest first """
+        if self.points is None: return iter(())
+        return zip(self.points, self.items)
+
+    def is_dominated(self, point:np.ndarray) -> bool:
+        """ Whether a point in the archive is as good in every objective """
+        if not self.items: return False
+        return bool((self.points <= np.asarray(point)).all(axis=1).any())
+
+    def add(self, point:np.ndarray, item:object = None) -> bool:
+        """ Add a point, unless dominated, removing the points it dominates
+
+        :param point: (d,) objective vector
+        :param item: item to keep with the point
+        :return: True if the point was added
+        """
+        point = np.asarray(point, dtype=float)
+        if self.points is None:
+            self.points = np.empty((0, len(point)))
+        elif self.is_dominated(point):
+            return False
+        keep = ~(point <= self.points).all(axis=1)
+        self.points = np.vstack([self.points[keep], point])
+        self.items = [item for item, kept in zip(self.items, keep) if kept] + [item]
+        if len(self.items) > self.size: self.prune()
+        return True
+
+    def update(self, points:np.ndarray, items:list[object] | None = None) -> int:
+        """ Add a batch of points, e.g. a neighbourhood or population
+
+        The batch is first reduced to its own non-dominated points, so only
+        those are checked against the archive.
+
+        :param points: (p, d) array of objective vectors
+        :param items: optional items, one for each point
+        :return: # of points added
+        """
+        points = np.asarray(points, dtype=float).reshape(len(points), -1)
+        items = [None] * len(points) if items is None else items
+        return sum(self.add(points[i], items[i])
+                       for i in np.flatnonzero(non_dominated(points)))
+
+    def prune(self) -> None:
+        """ Keep `size` points spread evenly along the front
+
+        Starts from the best point in each objective, then repeatedly keeps
+        the point farthest from the points kept so far, ties going to the
+        point farthest from its second nearest, with objectives scaled to
+        their range. Dropping the most crowded point one at a time instead
+        leaves gaps, as each drop makes its neighbours less crowded.
+        """
+        if len(self.items) <= self.size: return
+        span = np.ptp(self.points, axis=0)
+        scaled = (self.points - self.points.min(axis=0)) / np.where(span > 0, span, 1)
+        keep = list(dict.fromkeys(np.argmin(self.points, axis=0).tolist()))[:self.size]
+        nearest = np.full(len(scaled), np.inf)  # distances to the nearest two kept points
+        second = np.full(len(scaled), np.inf)
+        def kept(i:int) -> None:
+            nonlocal nearest, second
+            distance = np.linalg.norm(scaled - scaled[i], axis=1)
+            second = np.minimum(second, np.maximum(nearest, distance))
+            nearest = np.minimum(nearest, distance)
+        for i in keep: kept(i)
+        while len(keep) < self.size:
+            farthest = np.flatnonzero(nearest >= nearest.max() - 1e-9)  # ties, up to rounding
+            i = int(farthest[np.argmax(second[farthest])])
+            keep.append(i)
+            kept(i)
+        keep.sort()  # oldest first, as before
+        self.points = self.points[keep]
+        self.items = [self.items[i] for i in keep]
+
+    def front(self) -> list[tuple[np.ndarray, object]]:
+        """ (objective vector, item) of each point, sorted by objectives in order """
+        if self.points is None: return []
+        order = np.lexsort(self.points.T[::-1])
+        return [(self.points[i], self.items[i]) for i in order]
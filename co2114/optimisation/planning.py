@@ -1,14 +1,13 @@
-from numpy import inf as infinity
+import numpy as np
 from ..optimisation.things import *
 from ..agent.environment import GraphicEnvironment
-from ..search.util import manhattan
+from .distances import Location, as_array, TravelDistances
+from .optimisers import *  # agents need no display, so live apart from the environment
 import random
 
+from collections.abc import Callable
 from typing import override
 
-Location = tuple[int, int]
-State = None | dict[str, dict[House | Hospital, Location] | dict[str, int]]
-Numeric = int | float
 PRESET_STATES: dict[str, dict[str, list[Location] | int]] = {
     "empty": None,
     '0': {
@@ -44,68 +43,39 @@ PRESET_STATES: dict[str, dict[str, list[Location] | int]] = {
 }
 
 
-
-class HospitalOptimiser(Optimiser, UtilityBasedAgent):
-    """ Hospital Optimiser Agent"""
-    def explore(self, state:State) -> None:
-        """ Move hospitals to new locations in state
-        
-        :param state: new state with hospital locations
-        """
-        if not state: return
-        print(f"{self}: exploring state\n    {state['hospitals']}")
-        for hospital, loc in state["hospitals"].items():
-            hospital.location = loc
-
-    @override
-    def utility(self, state:State) -> Numeric:
-        """ Calculate utility of possible state by calculating distance
-            of each hospital to houses
-        
-        Returns negative total distance to be minimised.
-
-        :param state: current state with hospital and house locations
-        :return: negative total distance
-        """
-        obj = 0
-        houses: dict[House, Location] = state["houses"]  # type: ignore
-        hospitals: dict[Hospital, Location] = state["hospitals"]  # type: ignore
-
-        for house in houses: # iterate over houses
-            dist_to_nearest_hospital = infinity   # very big
-
-            for hospital in hospitals:  # iterate over hospitals
-                house_loc    = houses[house]
-                hospital_loc = hospitals[hospital]
-
-                dist = manhattan(house_loc, hospital_loc)
-
-                # calculate closest distance
-                if dist < dist_to_nearest_hospital:
-                    dist_to_nearest_hospital = dist
-
-            obj += dist_to_nearest_hospital # add distance for this house
-        return -obj
-
-
 class HospitalPlacement(GraphicEnvironment):
     """ Hospital Placement Environment
      
-    Allows placement of hospitals and houses on a grid
+    Allows placement of hospitals and houses on a grid, optionally with
+    impassable obstacles (e.g. rivers or blocks) that travel must go around
     
     Has a state consisting of hospital and house locations and bounds of the environment
     """
     def __init__(self,
                  init:dict[str, list[Location] | int] | None = None,
                  *args,
+                 jump:int = 1,
+                 swaps:bool = False,
                  **kwargs) -> None:
         """ Constroctor for HospitalPlacement environment
         
-        :param init: initial state dictionary with hospital and house locations and height/width of environment
+        :param init: initial state dictionary with hospital, house and optional obstacle locations and height/width of environment
         :param args: additional args for GraphicEnvironment
+        :param jump: largest number of cells a hospital may move in one direction per neighbour
+        :param swaps: if True, neighbours also include relocating any hospital to any free cell
         :param kwargs: additional kwargs for GraphicEnvironment
         """
         super().__init__(*args, **kwargs)
+        self.jump = jump
+        self.swaps = swaps
+        self.hospitals: list[Hospital] = []  # things partitioned by type
+        self.houses: list[House] = []
+        self.obstacles: list[things.Obstacle] = []
+        self.version = 0  # bumped whenever things are added, removed or moved
+        self._locations: tuple[Location, ...] = ()  # hospital locations at last check
+        self._cache: dict[str, tuple[int, object]] = {}  # name: (version, value)
+        self._house_locations: dict[House, Location] | None = None
+        self._travel: TravelDistances | None = None  # rebuilt when houses or obstacles change
         self.initialise_state(init)
  
 
@@ -113,7 +83,7 @@ class HospitalPlacement(GraphicEnvironment):
                          state_dict: dict[str, list[Location] | int]) -> None:
         """ Initialise environment state from state dictionary 
         
-        :param state_dict: state dictionary with hospital and house locations and height/width of environment
+        :param state_dict: state dictionary with hospital, house and optional obstacle locations and height/width of environment
         """
         if state_dict is None: return  # empty state
 
@@ -132,41 +102,124 @@ class HospitalPlacement(GraphicEnvironment):
         for loc in state_dict["houses"]:
             self.add_thing(House(), location=loc)
 
+        for loc in state_dict.get("obstacles", []):
+            self.add_thing(things.Obstacle(), location=loc)
+
+
+    def refresh(self) -> int:
+        """ Check whether any hospital has moved since the last check
+
+        Hospitals are moved by setting their location directly, so moves are
+        detected by comparing hospital locations, which is O(hospitals)
+        rather than O(things). Houses never move.
+
+        :return: current version of the environment
+        """
+        locations = tuple(hospital.location for hospital in self.hospitals)
+        if locations != self._locations:
+            self._locations = locations
+            self.version += 1
+        return self.version
+
+    def cached(self, name:str, build:Callable[[], object]) -> object:
+        """ Return value cached under name, rebuilding it if the environment has changed
+
+        :param name: name of cached value
+        :param build: function to build value
+        :return: cached or rebuilt value
+        """
+        version = self.refresh()
+        if name not in self._cache or self._cache[name][0] != version:
+            self._cache[name] = (version, build())
+        return self._cache[name][1]
 
     @property
     def state(self) -> State:
         """ Attribute returning current environment state 
+
+        The state is a snapshot cached until a thing is added, removed or
+        moved, so it is shared between callers and must not be modified in
+        place. Copy it (and any inner dictionary) before changing it.
         
         :return: current state with hospital and house locations and bounds of environment
         """
-        return {
+        return self.cached("state", lambda: {
             "hospitals": {
-                thing: thing.location
-                    for thing in self.things
-                        if isinstance(thing, Hospital)},
-            "houses": {
-                thing: thing.location
-                    for thing in self.things
-                        if isinstance(thing, House)},
+                hospital: hospital.location for hospital in self.hospitals},
+            "houses": self.house_locations,
+            "obstacles": [obstacle.location for obstacle in self.obstacles],
+            "travel": self.travel_distances,
             "bounds": {
                 "xmin": 0, "xmax": self.width-1,
                 "ymin": 0, "ymax": self.height-1}
-        }
+        })
+
+    @property
+    def house_locations(self) -> dict[House, Location]:
+        """ Mapping of houses to locations, rebuilt only when houses are added or removed """
+        if self._house_locations is None:
+            self._house_locations = {
+                house: house.location for house in self.houses}
+        return self._house_locations
+
+    @property
+    def blocked(self) -> np.ndarray:
+        """ (width, height) boolean array, True where an obstacle blocks travel """
+        blocked = np.zeros((self.width, self.height), dtype=bool)
+        for obstacle in self.obstacles:
+            blocked[obstacle.location] = True
+        return blocked
+
+    @property
+    def travel_distances(self) -> TravelDistances | None:
+        """ Travel distances around obstacles, None if there are no obstacles
+
+        Kept until houses or obstacles are added or removed, so distances
+        from hospital cells already searched are reused as hospitals move.
+        """
+        if not self.obstacles: return None
+        if self._travel is None:
+            self._travel = TravelDistances(
+                self.blocked, as_array(self.house_locations))
+        return self._travel
+
+    @property
+    def occupied(self) -> set[Location]:
+        """ Set of locations holding a hospital, house or obstacle, cached as for state """
+        return self.cached("occupied", lambda: {
+            thing.location for thing in self.hospitals + self.houses + self.obstacles})
 
     @property
     def neighbours(self) -> list[State]:
         """ Generate neighbouring states by moving each hospital
-            in each direction by one unit if possible.
+            in each direction by between one and `jump` units if possible.
+
+        If `swaps` is set, also includes moving each hospital to any other
+        free cell of the grid.
 
         :return: list of neighbouring states
         """
+        state = self.state
+        occupied = self.occupied
+        free = [(x, y)
+            for x in range(self.x_start, self.x_end)
+                for y in range(self.y_start, self.y_end)
+                    if (x, y) not in occupied] if self.swaps else []
         neighbours = []
-        for i, hospital in enumerate(self.state["hospitals"]):
-            location = hospital.location
+        for hospital, location in state["hospitals"].items():
+            proposals = []
             for x,y in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                proposal = location[0] + x, location[1] + y
-                if self.is_inbounds(proposal):
-                    candidate = self.state.copy()
+                for step in range(1, self.jump+1):
+                    proposals.append(
+                        (location[0] + x*step, location[1] + y*step))
+            if self.swaps:
+                seen = set(proposals)
+                proposals += [cell for cell in free if cell not in seen]
+            for proposal in proposals:
+                if proposal not in occupied \
+                        and super().is_inbounds(proposal):
+                    candidate = state.copy()
+                    candidate["hospitals"] = state["hospitals"].copy()
                     candidate["hospitals"][hospital] = proposal
                     neighbours.append(candidate)
         return neighbours
@@ -178,7 +231,42 @@ class HospitalPlacement(GraphicEnvironment):
         """
         if not super().is_inbounds(location):
             return False
-        return len(self.things_at(location)) == 0
+        return tuple(location) not in self.occupied
+
+    @override
+    def add_thing(self, thing:things.Thing, location:Location | None = None) -> None:
+        """ Add thing to environment, keeping track of hospitals and houses
+
+        :param thing: thing to add
+        :param location: location to add thing at
+        """
+        super().add_thing(thing, location)
+        if thing not in self.things: return  # failed to add
+        if isinstance(thing, Hospital) and thing not in self.hospitals:
+            self.hospitals.append(thing)
+        elif isinstance(thing, House) and thing not in self.houses:
+            self.houses.append(thing)
+            self._house_locations = self._travel = None
+        elif isinstance(thing, things.Obstacle) and thing not in self.obstacles:
+            self.obstacles.append(thing)
+            self._travel = None
+        self.version += 1
+
+    @override
+    def delete_thing(self, thing:things.Thing) -> None:
+        """ Remove thing from environment, keeping track of hospitals and houses
+
+        :param thing: thing to remove
+        """
+        super().delete_thing(thing)
+        if thing in self.hospitals: self.hospitals.remove(thing)
+        if thing in self.houses:
+            self.houses.remove(thing)
+            self._house_locations = self._travel = None
+        if thing in self.obstacles:
+            self.obstacles.remove(thing)
+            self._travel = None
+        self.version += 1
 
     @override
     def add_agent(self, agent:Agent) -> None:
@@ -237,4 +325,4 @@ class HospitalPlacement(GraphicEnvironment):
                     agent.explore(state)
                 self.success = True
             case "explore":
-                agent.explore(state)
\ No newline at end of file
+                agent.explore(state)
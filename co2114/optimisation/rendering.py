@@ -0,0 +1,162 @@
+import time
+import warnings
+from typing import override
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore")
+    import pygame
+
+from ..agent.environment import EnvironmentApp, XYEnvironment
+from ..util.colours import COLOR_WHITE
+
+Location = tuple[int, int]
+
+
+class FastEnvironmentApp(EnvironmentApp):
+    """ Graphical app that simulates at full speed and draws only what changed
+
+    The environment is stepped as fast as it runs, with a frame drawn at
+    most `fps` times a second, and, if `every` is given, at most once every
+    `every` steps. Each frame redraws only the tiles whose things changed,
+    from glyph surfaces rendered once per symbol, and updates just those
+    regions of the window. The window caption shows steps per second.
+
+    This replaces the loop timing of Engine: `run` drives the event loop
+    with `simulate` and `redraw` instead of `_update` and `_render`, so
+    Engine's frame limiter and `lps` loop rate are not used, and `update`
+    and `render` are never called. `fps` instead bounds the time spent
+    simulating between frames.
+    """
+    def __init__(self,
+                 environment:XYEnvironment | None = None,
+                 steps:int = 100,
+                 every:int | None = None,
+                 fps:int = 30,
+                 close_when_done:bool = False,
+                 **kwargs) -> None:
+        """ Initialises fast graphical environment app
+
+        :param     environment: the XYEnvironment to visualise
+        :param           steps: max. # of iterations in simulation, default 100
+        :param           every: min. # of steps between frames, default no minimum
+        :param             fps: max. frames per second
+        :param close_when_done: close the window once the simulation completes
+        :param        **kwargs: additional arguments for App base class
+        """
+        super().__init__(environment, steps=steps, fps=fps, **kwargs)
+        self.every = every
+        self.close_when_done = close_when_done
+        self.glyphs:dict[str, pygame.Surface] = {}  # symbol -> rendered surface
+        self.cells:dict[Location, str] | None = None  # symbol drawn in each tile
+        self.frames = 0  # # of frames drawn
+        self._started = self._reported = time.perf_counter()
+        self._reported_counter = 0
+
+    def glyph(self, symbol:str) -> pygame.Surface:
+        """ Surface of a thing's symbol, rendered on first use """
+        if symbol not in self.glyphs:
+            self.glyphs[symbol] = self.thing_font.render(symbol, True, COLOR_WHITE)
+        return self.glyphs[symbol]
+
+    def snapshot(self) -> dict[Location, str]:
+        """ Symbol to draw in each occupied tile
+
+        Where things share a tile, the same one is always drawn, so tiles
+        only need redrawing when their things change.
+        """
+        cells:dict[Location, str] = {}
+        for thing in self.environment.things:
+            location = getattr(thing, "location", None)
+            if location is None: continue
+            location, symbol = tuple(location), str(thing)
+            if location not in cells or symbol < cells[location]:
+                cells[location] = symbol
+        return cells
+
+    def dirty(self, cells:dict[Location, str]) -> list[Location]:
+        """ Tiles to redraw for a new snapshot, all of them on the first frame
+
+        :param cells: snapshot of the tiles, as given by `snapshot`
+        :return: locations whose symbol differs from the last frame drawn
+        """
+        if self.cells is None: return list(cells)
+        return [location for location in cells.keys() | self.cells.keys()
+                    if cells.get(location) != self.cells.get(location)]
+
+    @override
+    def run(self) -> None:
+        """ Run the app, with this class's timing in place of Engine's """
+        self._run(self.simulate, self.redraw)
+
+    def simulate(self) -> None:
+        """ Step the environment until a frame is due """
+        if self.counter < 0:  # initial render only
+            self.counter += 1
+            return
+        start = time.perf_counter()
+        budget = 1 / self._framerate
+        taken = 0
+        while self.counter < self.steps and not self.environment.is_done:
+            self.environment.step()
+            self.counter += 1
+            taken += 1
+            if time.perf_counter() - start >= budget:
+                if self.every is None or taken >= self.every: break
+                pygame.event.pump()  # keep the window responsive
+                start = time.perf_counter()
+
+        if taken == 0:  # nothing left to simulate
+            if self._flag:
+                print(f"{self.environment}: Simulation complete after {self.counter} of {self.steps} iterations.")
+                self._flag = False
+                if self.close_when_done: self._running = False
+            time.sleep(budget)
+
+    def redraw(self) -> None:
+        """ Redraw tiles that changed since the last frame """
+        cells = self.snapshot()
+        if self.cells is None:  # first frame, draw everything
+            self.screen.fill(self.environment.color)
+            self.render_grid()
+            for location in self.dirty(cells):
+                self.draw_tile(location, cells[location])
+            pygame.display.flip()
+        else:
+            rects = [self.draw_tile(location, cells.get(location))
+                         for location in self.dirty(cells)]
+            if rects: pygame.display.update([rect for rect in rects if rect])
+        self.cells = cells
+        self.frames += 1
+        self.report()
+
+    def draw_tile(self, location:Location, symbol:str | None) -> pygame.Rect | None:
+        """ Redraw one tile with a symbol, or empty
+
+        :param location: (x, y) of the tile
+        :param   symbol: symbol to draw, or None to clear the tile
+        :return: the tile's rectangle, None if outside the grid
+        """
+        x, y = location
+        if not (0 <= x < self.environment.width and 0 <= y < self.environment.height):
+            return None
+        rect = self.tiles[y][x]
+        self.screen.fill(self.environment.color, rect)
+        pygame.draw.rect(self.screen, COLOR_WHITE, rect, 1)
+        if symbol is not None:
+            glyph = self.glyph(symbol)
+            self.screen.blit(glyph, glyph.get_rect(center=rect.center))
+        return rect
+
+    def report(self) -> None:
+        """ Show steps per second in the window caption, once a second """
+        now = time.perf_counter()
+        if now - self._reported < 1: return
+        rate = (self.counter - self._reported_counter) / (now - self._reported)
+        self._reported, self._reported_counter = now, self.counter
+        pygame.display.set_caption(
+            f"{self.name} (co2114): step {self.counter}, {rate:.0f} steps/s")
+
+    @property
+    def rate(self) -> float:
+        """ Average steps per second since the app started """
+        return max(self.counter, 0) / (time.perf_counter() - self._started)
@@ -1,12 +1,21 @@
-from ..search import things
+from ..agent import things
 
-from ..util.fonts import platform
+from sys import platform  # as re-exported by util.fonts
 
 from typing import override
 
+__all__ = ["things", "platform", "override", "Agent", "UtilityBasedAgent",
+           "Hospital", "House", "Optimiser"]
+
 # Re-export relevant classes from things module
 Agent = things.Agent
-UtilityBasedAgent = things.UtilityBasedAgent
+
+def __getattr__(name:str) -> type:
+    """ Resolve UtilityBasedAgent on first use, as co2114.search loads NumPy """
+    if name == "UtilityBasedAgent":
+        from ..search.things import UtilityBasedAgent
+        return UtilityBasedAgent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class Hospital(things.Thing):
     @override
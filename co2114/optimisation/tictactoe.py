@@ -0,0 +1,73 @@
+from ..agent.environment import XYEnvironment
+from ..agent.things import Agent
+from .minimax import Tile
+
+
+class TicTacToeGame(XYEnvironment):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, width=3, height=3, **kwargs)
+        self.board = [[Tile() for j in range(3)] for i in range(3)]
+        self.in_play = True
+
+    @property
+    def is_done(self):
+        if len(self.agents) == 0: return True
+        return not self.in_play
+
+    @property
+    def opponent(self):
+        # player for the human (or other non-agent) side of the board
+        return "X" if self.agent.player == "O" else "O"
+
+    def play(self, i, j):
+        # place the opponent's tile at row i, column j
+        if not (0 <= i <= 2 and 0 <= j <= 2) or self.board[i][j].player:
+            raise ValueError(f"{self.__class__.__name__}: invalid move ({i}, {j})")
+        self.board[i][j].player = self.opponent
+
+    def step(self):
+        if self.is_done: return
+        def get_position():
+            print(self)
+            i = int(input("choose move row [1-3]"))-1
+            j = int(input("choose move column [1-3]"))-1
+            return i,j
+        while True:
+            try:
+                self.play(*get_position())
+                break
+            except ValueError:
+                print("not a valid move !")
+        print(self)
+        super().step()
+    
+    def __repr__(self):
+        board = ""
+        for i in (0,1):
+            board += f"_{self.board[i][0]}_|_{self.board[i][1]}_|_{self.board[i][2]}_"
+            board += "\n"
+        board += f" {self.board[2][0]} | {self.board[2][1]} | {self.board[2][2]} "
+        return board[:-1]
+    
+    def add_agent(self, agent, player="X"):
+        if not isinstance(agent, Agent):
+            raise TypeError(f"{self}: {agent} is not an Agent")
+        self.agents.add(agent)
+        self.agent = agent
+        self.agent.player = "X"
+
+    def percept(self, agent):
+        return self.board
+
+    def execute_action(self, agent, action):
+        print(action)
+        self.apply(agent, action)
+
+    def apply(self, agent, action):
+        # update the game with an agent's action, without logging
+        command, state = action
+        match command:
+            case "move":
+                self.board = agent.move(state)
+            case "done":
+                self.in_play = False
@@ -0,0 +1,236 @@
+import json
+import os
+import random
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from functools import wraps
+
+Event = dict[str, object]
+
+PHASES = ("percept", "execute_action")  # environment methods traced within a step
+AGENT_PHASES = ("program", "utility")  # agent methods traced within a step
+
+
+class Tracer:
+    """ Opt-in tracer recording timed spans of agent/environment loops
+
+    Attached to an environment, records a span for every step, with the
+    percepts, programs, utilities and actions inside it nested beneath.
+    Further methods or properties, such as `HospitalPlacement.neighbours` or
+    `TicTacToeAgent.moves`, can be traced with `wrap`. Spans are exported as
+    Chrome trace-event JSON, viewable in chrome://tracing or Perfetto.
+
+    Only a fraction `sample` of steps is traced, and recording stops after
+    `max_events` spans, so overhead stays bounded on long runs. Untraced
+    steps cost a random draw and one check per wrapped call.
+    """
+    def __init__(self,
+                 sample:float = 1.,
+                 max_events:int = 1_000_000,
+                 seed:int | None = None) -> None:
+        """ Constructor for Tracer
+
+        :param     sample: fraction of steps to trace, between 0 and 1
+        :param max_events: max. # of spans to record, later spans are dropped
+        :param       seed: optional seed for choosing which steps to trace
+        """
+        if not 0 <= sample <= 1:
+            raise ValueError(f"{self.__class__.__name__}: sample must be between 0 and 1")
+        self.sample = sample
+        self.max_events = max_events
+        self.rng = random.Random(seed)
+        self.events:list[Event] = []
+        self.dropped = 0  # spans not recorded once max_events was reached
+        self.steps = 0  # # of steps seen, traced or not
+        self.in_step = self.sampled = False
+        self._origin = time.perf_counter_ns()
+        self._patched:list[tuple[object, str, bool, object]] = []  # owner, name, own attribute, original
+
+    def __repr__(self) -> str:
+        """ String representation of the tracer """
+        return f"{self.__class__.__name__}[{len(self.events)}]"
+
+    def __enter__(self) -> "Tracer":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.detach()
+
+    def start(self) -> int | None:
+        """ Start time of a span starting now, None if it is not recorded
+
+        Spans of traced steps past `max_events` are counted as dropped.
+        """
+        if self.in_step and not self.sampled: return None
+        if len(self.events) >= self.max_events:
+            self.dropped += 1
+            return None
+        return time.perf_counter_ns()
+
+    def record(self,
+               name:str,
+               start:int,
+               end:int,
+               category:str = "",
+               args:dict | None = None) -> None:
+        """ Record a completed span
+
+        :param     name: name of the span
+        :param    start: start time, from time.perf_counter_ns
+        :param      end: end time, from time.perf_counter_ns
+        :param category: category of the span, e.g. "environment" or "agent"
+        :param     args: optional values shown with the span
+        """
+        if len(self.events) >= self.max_events:
+            self.dropped += 1
+            return
+        event = {"name": name, "cat": category, "ph": "X",
+                 "ts": (start - self._origin) / 1000, "dur": (end - start) / 1000,
+                 "pid": os.getpid(), "tid": threading.get_ident()}
+        if args: event["args"] = args
+        self.events.append(event)
+
+    @contextmanager
+    def span(self, name:str, category:str = "", **args) -> Iterator[None]:
+        """ Record the block as a span, if the current step is traced
+
+        :param     name: name of the span
+        :param category: category of the span
+        :param   **args: optional values shown with the span
+        """
+        start = self.start()
+        if start is None:
+            yield
+            return
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter_ns(), category, args)
+
+    def traced(self, function:Callable, name:str, category:str = "") -> Callable:
+        """ Function recording a span for each call of function, when tracing """
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start = self.start()
+            if start is None: return function(*args, **kwargs)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(name, start, time.perf_counter_ns(), category)
+        return wrapper
+
+    def wrap(self, owner:object, attribute:str, name:str | None = None, category:str = "") -> None:
+        """ Trace calls of a method, or reads of a property, until detached
+
+        Wrapping a class traces every instance, e.g.
+        `tracer.wrap(HospitalPlacement, "neighbours")`. Wrapping an instance
+        traces only that instance, and only methods can be wrapped this way.
+
+        :param     owner: class or instance with the attribute
+        :param attribute: name of the method or property
+        :param      name: name of the spans, default Class.attribute
+        :param  category: category of the spans
+        """
+        cls = owner if isinstance(owner, type) else type(owner)
+        name = name or f"{cls.__name__}.{attribute}"
+        own = attribute in vars(owner)
+        original = vars(owner)[attribute] if own else getattr(owner, attribute)
+        if isinstance(owner, type):
+            descriptor = original if own else next(
+                vars(base)[attribute] for base in owner.__mro__ if attribute in vars(base))
+            if isinstance(descriptor, property):
+                wrapped = property(self.traced(descriptor.fget, name, category),
+                                   descriptor.fset, descriptor.fdel, descriptor.__doc__)
+            else:
+                wrapped = self.traced(descriptor, name, category)
+        else:
+            wrapped = self.traced(original, name, category)
+        setattr(owner, attribute, wrapped)
+        self._patched.append((owner, attribute, own, original))
+
+    def attach(self, environment, extra:Iterable[tuple[object, str]] = ()) -> None:
+        """ Trace each step of an environment and the phases within it
+
+        Wraps the environment's `step`, `percept` and `execute_action`, and
+        each agent's `program` and `utility`, on these instances only.
+        Agents must be added before attaching.
+
+        :param environment: environment to trace
+        :param       extra: further (class or instance, attribute) pairs to trace
+        """
+        step = environment.step
+
+        @wraps(step)
+        def traced_step(*args, **kwargs):
+            self.steps += 1
+            self.sampled = self.sample >= 1 or self.rng.random() < self.sample
+            self.in_step = True
+            try:
+                start = self.start()
+                if start is None: return step(*args, **kwargs)
+                try:
+                    return step(*args, **kwargs)
+                finally:
+                    self.record("step", start, time.perf_counter_ns(),
+                                "environment", {"step": self.steps})
+            finally:
+                self.in_step = False
+
+        self._patched.append((environment, "step", "step" in vars(environment), step))
+        environment.step = traced_step
+        for phase in PHASES:
+            self.wrap(environment, phase, phase, "environment")
+        for agent in environment.agents:
+            for phase in AGENT_PHASES:
+                if hasattr(agent, phase):
+                    self.wrap(agent, phase, f"{type(agent).__name__}.{phase}", "agent")
+        for owner, attribute in extra:
+            self.wrap(owner, attribute)
+
+    def detach(self) -> None:
+        """ Restore every wrapped method and property """
+        while self._patched:
+            owner, attribute, own, original = self._patched.pop()
+            if own:
+                setattr(owner, attribute, original)
+            else:
+                delattr(owner, attribute)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """ Count, total and self time in ms of the recorded spans, by name
+
+        Self time excludes time in spans nested within, so the names with
+        the most self time are the hot paths.
+        """
+        totals:dict[str, dict[str, float]] = {}
+        by_thread:dict[object, list[Event]] = {}
+        for event in self.events:
+            by_thread.setdefault(event["tid"], []).append(event)
+        for events in by_thread.values():
+            events.sort(key=lambda event: (event["ts"], -event["dur"]))
+            stack:list[tuple[float, dict]] = []  # end time, totals of open spans
+            for event in events:
+                while stack and stack[-1][0] <= event["ts"]: stack.pop()
+                entry = totals.setdefault(
+                    event["name"], {"count": 0, "total": 0., "self": 0.})
+                entry["count"] += 1
+                entry["total"] += event["dur"] / 1000
+                entry["self"] += event["dur"] / 1000
+                if stack: stack[-1][1]["self"] -= event["dur"] / 1000
+                stack.append((event["ts"] + event["dur"], entry))
+        return dict(sorted(totals.items(), key=lambda item: -item[1]["self"]))
+
+    def export(self, path:str | os.PathLike) -> None:
+        """ Write recorded spans as Chrome trace-event JSON
+
+        :param path: file path of the trace
+        """
+        metadata = [{"name": "process_name", "ph": "M", "pid": os.getpid(),
+                     "args": {"name": "co2114"}}]
+        with open(path, "w") as file:
+            json.dump({"traceEvents": metadata + self.events,
+                       "displayTimeUnit": "ms",
+                       "otherData": {"steps": self.steps, "sample": self.sample,
+                                     "dropped": self.dropped}}, file)
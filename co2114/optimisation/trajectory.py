@@ -0,0 +1,332 @@
+import os
+import random
+import struct
+from typing import NamedTuple
+
+import numpy as np
+
+# record layout: step, agent, command, seed, then the codec's payload
+FIELDS = 4
+MAGIC = b"CO2114TR"
+VERSION = 1
+HEADER = struct.Struct("<8sHHH")  # magic, version, record width, codec name length
+HEADER_SIZE = 64  # header is padded so records are aligned
+DTYPE = np.dtype("<i4")
+
+
+class Record(NamedTuple):
+    """ One recorded action """
+    step: int
+    agent: int
+    command: str
+    seed: int
+    payload: np.ndarray
+
+
+class Codec:
+    """ Encodes the state an action leaves an environment in as integers
+
+    Subclasses set `name` and `commands`, and implement `accepts`, `width`,
+    `encode` and `decode`. Decoding only sets state, it never calls agents.
+    """
+    name:str = ""
+    commands:tuple[str, ...] = ()
+
+    @classmethod
+    def accepts(cls, environment) -> bool:
+        """ Whether the codec can record the environment """
+        raise NotImplementedError
+
+    def width(self, environment) -> int:
+        """ # of integers in the payload of each record """
+        raise NotImplementedError
+
+    def encode(self, environment, agent, action:tuple) -> list[int]:
+        """ Payload for an action, called after the action is executed """
+        raise NotImplementedError
+
+    def decode(self,
+               environment,
+               trajectory:"Trajectory",
+               t:int,
+               agents:list | None = None) -> None:
+        """ Set the environment to its state after record t
+
+        :param environment: environment to restore, set up as when recorded
+        :param trajectory: the recorded trajectory
+        :param t: index of record
+        :param agents: agents in the order they were recorded, if several
+        """
+        raise NotImplementedError
+
+
+class HospitalPlacementCodec(Codec):
+    """ Hospital locations, in the environment's hospital order """
+    name = "hospital_placement"
+    commands = ("explore", "done")
+
+    @classmethod
+    def accepts(cls, environment) -> bool:
+        from .planning import HospitalPlacement
+        return isinstance(environment, HospitalPlacement)
+
+    def width(self, environment) -> int:
+        return 2 * len(environment.hospitals)
+
+    def encode(self, environment, agent, action:tuple) -> list[int]:
+        return [int(x) for hospital in environment.hospitals for x in hospital.location]
+
+    def decode(self, environment, trajectory, t, agents=None) -> None:
+        locations = trajectory[t].payload.reshape(-1, 2).tolist()
+        for hospital, location in zip(environment.hospitals, locations):
+            hospital.location = tuple(location)
+
+
+class TicTacToeCodec(Codec):
+    """ Board cells row by row, 0 for empty, 1 for X and 2 for O """
+    name = "tictactoe"
+    commands = ("move", "done")
+    players = (None, "X", "O")
+
+    @classmethod
+    def accepts(cls, environment) -> bool:
+        from .tictactoe import TicTacToeGame
+        return isinstance(environment, TicTacToeGame)
+
+    def width(self, environment) -> int:
+        return 9
+
+    def encode(self, environment, agent, action:tuple) -> list[int]:
+        return [self.players.index(tile.player)
+                    for row in environment.board for tile in row]
+
+    def decode(self, environment, trajectory, t, agents=None) -> None:
+        from .minimax import Tile
+        record = trajectory[t]
+        cells = [Tile(self.players[cell]) for cell in record.payload.tolist()]
+        environment.board = [cells[i:i+3] for i in (0, 3, 6)]
+        environment.in_play = record.command != "done"
+
+
+class ShortestPathCodec(Codec):
+    """ Node explored or delivered, as an index into nodes sorted by label """
+    name = "shortest_path"
+    commands = ("explore", "deliver")
+
+    @classmethod
+    def accepts(cls, environment) -> bool:
+        from ..search.graph import ShortestPathEnvironment
+        return isinstance(environment, ShortestPathEnvironment)
+
+    def __init__(self) -> None:
+        """ Constructor for ShortestPathCodec """
+        self._order:tuple[object, int, list, dict] | None = None  # graph, # of nodes, nodes, indices
+
+    def order(self, environment) -> tuple[list, dict]:
+        """ Nodes of the graph in a fixed order, and the index of each node
+
+        Sorted once per graph, and again only if nodes are added, rather
+        than for every record.
+        """
+        graph = environment.graph
+        if self._order is None or self._order[0] is not graph \
+                or self._order[1] != len(graph.nodes):
+            nodes = sorted(graph, key=lambda node: str(node.label))
+            self._order = (graph, len(nodes), nodes,
+                           {node: i for i, node in enumerate(nodes)})
+        return self._order[2], self._order[3]
+
+    def nodes(self, environment) -> list:
+        """ Nodes of the graph in a fixed order """
+        return self.order(environment)[0]
+
+    def width(self, environment) -> int:
+        return 1
+
+    def encode(self, environment, agent, action:tuple) -> list[int]:
+        _, node = action
+        return [self.order(environment)[1][node]]
+
+    def decode(self, environment, trajectory, t, agents=None) -> None:
+        nodes = self.nodes(environment)
+        agents = list(environment.agents) if agents is None else agents
+        record = trajectory[t]
+        agent = agents[record.agent]
+        explored = trajectory.records[:t+1]
+        explored = explored[(explored[:, 1] == record.agent)
+                          & (explored[:, 2] == self.commands.index("explore"))]
+        agent.visited = {nodes[i] for i in explored[:, FIELDS].tolist()}
+        if record.command == "explore":
+            agent.location = nodes[int(record.payload[0])]
+
+
+CODECS:dict[str, type[Codec]] = {
+    codec.name: codec
+        for codec in (HospitalPlacementCodec, TicTacToeCodec, ShortestPathCodec)}
+
+
+def codec_for(environment) -> Codec:
+    """ Codec able to record an environment """
+    for codec in CODECS.values():
+        try:
+            if codec.accepts(environment): return codec()
+        except ImportError:  # environment's module unavailable
+            continue
+    raise TypeError(f"no trajectory codec for {environment}")
+
+
+class TrajectoryRecorder:
+    """ Records each action taken in an environment to an append-only binary log
+
+    Each record is a row of int32: step, agent, command, seed, and then the
+    state the action left the environment in, as encoded by a Codec. Every
+    step is run after seeding `random` and NumPy's global generator with a
+    seed drawn from the recorder, and that seed is stored with the step.
+
+    The log begins with a fixed size header, so records can be memory
+    mapped, see Trajectory. Recording to an existing log appends to it.
+    """
+    def __init__(self,
+                 environment,
+                 path:str | os.PathLike,
+                 seed:int | None = None,
+                 codec:Codec | None = None) -> None:
+        """ Constructor for TrajectoryRecorder
+
+        :param environment: environment to record, its execute_action is wrapped
+        :param path: file path of the log
+        :param seed: optional seed for drawing each step's seed
+        :param codec: codec for the environment, found automatically if None
+        """
+        self.environment = environment
+        self.codec = codec_for(environment) if codec is None else codec
+        self.width = FIELDS + self.codec.width(environment)
+        self.rng = np.random.default_rng(seed)
+        self.agents:list = []  # agents in the order they first acted
+        self.seed = 0
+
+        self.step_index = 0
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            existing = Trajectory(path)
+            if existing.codec.name != self.codec.name or existing.width != self.width:
+                raise ValueError(f"{self}: {path} holds a different kind of trajectory")
+            if len(existing): self.step_index = int(existing.records[-1, 0]) + 1
+            self.file = open(path, "ab")
+        else:
+            self.file = open(path, "wb")
+            name = self.codec.name.encode()
+            header = HEADER.pack(MAGIC, VERSION, self.width, len(name)) + name
+            self.file.write(header.ljust(HEADER_SIZE, b"\0"))
+
+        self._execute_action = environment.execute_action
+        environment.execute_action = self.execute_action
+
+    def __repr__(self) -> str:
+        """ String representation of the recorder """
+        return self.__class__.__name__
+
+    def __enter__(self) -> "TrajectoryRecorder":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def execute_action(self, agent, action:tuple) -> None:
+        """ Execute an action in the environment, then record it """
+        self._execute_action(agent, action)
+        if agent not in self.agents: self.agents.append(agent)
+        command, _ = action
+        record = [self.step_index, self.agents.index(agent),
+                  self.codec.commands.index(command), self.seed] \
+               + self.codec.encode(self.environment, agent, action)
+        self.file.write(np.asarray(record, dtype=DTYPE).tobytes())
+
+    def step(self) -> None:
+        """ Seed the random number generators and step the environment """
+        self.seed = int(self.rng.integers(2**31 - 1))
+        random.seed(self.seed)
+        np.random.seed(self.seed)
+        self.environment.step()
+        self.step_index += 1
+        self.file.flush()
+
+    def run(self, steps:int = 100) -> None:
+        """ Step the environment until it is done, or steps are exhausted
+
+        :param steps: max. # of iterations
+        """
+        for _ in range(steps):
+            if self.environment.is_done: break
+            self.step()
+
+    def close(self) -> None:
+        """ Stop recording, restoring the environment's execute_action """
+        if self.file.closed: return
+        self.file.close()
+        self.environment.execute_action = self._execute_action
+
+
+class Trajectory:
+    """ Read only view of a recorded trajectory, memory mapped from its log
+
+    Any record can be read or restored into an environment directly,
+    without re-running the agents. A partly written last record is ignored.
+    """
+    def __init__(self, path:str | os.PathLike) -> None:
+        """ Constructor for Trajectory
+
+        :param path: file path of the log
+        """
+        self.path = path
+        with open(path, "rb") as file:
+            header = file.read(HEADER_SIZE)
+        magic, version, self.width, length = HEADER.unpack_from(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a trajectory log")
+        name = header[HEADER.size:HEADER.size + length].decode()
+        if name not in CODECS:
+            raise ValueError(f"{path}: unknown trajectory codec {name}")
+        self.codec = CODECS[name]()
+
+        n = (os.path.getsize(path) - HEADER_SIZE) // (DTYPE.itemsize * self.width)
+        self.records = np.memmap(
+            path, dtype=DTYPE, mode="r", offset=HEADER_SIZE, shape=(n, self.width)) \
+            if n else np.empty((0, self.width), dtype=DTYPE)
+
+    def __repr__(self) -> str:
+        """ String representation of the trajectory """
+        return f"{self.__class__.__name__}[{self.codec.name}, {len(self)}]"
+
+    def __len__(self) -> int:
+        """ Number of records """
+        return len(self.records)
+
+    def __getitem__(self, t:int) -> Record:
+        """ Record t, as a Record """
+        step, agent, command, seed = self.records[t, :FIELDS].tolist()
+        return Record(step, agent, self.codec.commands[command], seed,
+                      np.array(self.records[t, FIELDS:]))
+
+    def __iter__(self):
+        """ Iterate over records in order """
+        return (self[t] for t in range(len(self)))
+
+    @property
+    def steps(self) -> np.ndarray:
+        """ Step of each record """
+        return np.array(self.records[:, 0])
+
+    def seed(self, step:int) -> int:
+        """ Seed used for a step """
+        t = np.flatnonzero(self.records[:, 0] == step)
+        if len(t) == 0: raise KeyError(f"{self}: no record of step {step}")
+        return int(self.records[t[0], 3])
+
+    def restore(self, environment, t:int, agents:list | None = None) -> None:
+        """ Set an environment to its state after record t
+
+        :param environment: environment to restore, set up as when recorded
+        :param t: index of record, negative indices count from the end
+        :param agents: agents in the order they were recorded, if several
+        """
+        self.codec.decode(environment, self, range(len(self))[t], agents)
@@ -0,0 +1,170 @@
+import struct
+from multiprocessing import shared_memory
+
+EXACT, LOWER, UPPER = 0, 1, 2  # kinds of stored value, exact or a bound on the true value
+Entry = tuple[float, int]  # (value, kind)
+
+MAGIC = 0xC02114  # marks shared memory laid out as a table
+MASK = (1 << 64) - 1
+MULTIPLIER = 0x9E3779B97F4A7C15  # spreads nearby keys across the table
+
+
+def _attach(name:str) -> shared_memory.SharedMemory:
+    """ Open existing shared memory, leaving its cleanup to the creator """
+    try:  # Python 3.13+, otherwise a worker exiting may unlink the memory
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name)
+
+
+class TranspositionTable:
+    """ Fixed-size hash table of search results, shared between processes
+
+    Maps integer position keys (below 2**64) to a value, stored as a 32-bit
+    float, and whether it is exact or a lower or upper bound from an
+    alpha-beta window. Lives in `multiprocessing.shared_memory`, so parallel
+    workers and successive agents reuse each other's results instead of
+    repeating the same searches. Supports `get`, `in`, `[]` and `[] =` like
+    the dictionary it replaces.
+
+    Each slot is two 64-bit words, (key ^ data, data), written without
+    locks: a read mixing words from two writes fails the check and counts
+    as a miss, so a torn entry is never returned. A key may sit in any of
+    `probes` consecutive slots; when all hold other keys, the first is
+    overwritten.
+
+    A table pickles as the name of its memory, so it can be sent to worker
+    processes, which attach to the same table. The process that created it
+    should `unlink` it once every worker is done.
+    """
+    def __init__(self,
+                 size:int = 1 << 20,
+                 name:str | None = None,
+                 probes:int = 4) -> None:
+        """ Constructor for TranspositionTable
+
+        :param   size: # of slots, rounded up to a power of 2, ignored when attaching
+        :param   name: name of an existing table to attach to, default create a new one
+        :param probes: # of slots a key may occupy
+        """
+        if probes < 1:
+            raise ValueError(f"{self.__class__.__name__}: probes must be positive")
+        self.probes = probes
+        self.hits = self.misses = self.stores = 0  # counts for this process only
+        if name is None:
+            slots = 1 << max(size - 1, 1).bit_length()
+            self.memory = shared_memory.SharedMemory(create=True, size=16 * (slots + 1))
+            self.owner = True
+        else:
+            self.memory = _attach(name)
+            self.owner = False
+        self.words = self.memory.buf.cast("Q")  # header, then (key ^ data, data) per slot
+        if name is None:
+            self.words[0], self.words[1] = MAGIC, slots
+        elif self.words[0] != MAGIC:
+            self.close()
+            raise ValueError(f"{self.__class__.__name__}: {name} is not a transposition table")
+        self.slots = self.words[1]
+
+    def __repr__(self) -> str:
+        """ String representation of the table """
+        return f"{self.__class__.__name__}[{self.name}]"
+
+    def __reduce__(self):
+        """ Pickle as the name of the shared memory, attaching on unpickling """
+        return (self.__class__, (self.slots, self.name, self.probes))
+
+    def __enter__(self) -> "TranspositionTable":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+        if self.owner: self.unlink()
+
+    @property
+    def name(self) -> str:
+        """ Name of the shared memory, to attach to from other processes """
+        return self.memory.name
+
+    def _indices(self, key:int) -> list[int]:
+        """ Word indices of the slots a key may occupy """
+        start = ((key * MULTIPLIER) & MASK) >> 32
+        return [2 * (1 + (start + p) % self.slots) for p in range(self.probes)]
+
+    @staticmethod
+    def _pack(value:float, kind:int) -> int:
+        """ Data word of an entry, never 0 so empty slots are told apart """
+        bits, = struct.unpack("<I", struct.pack("<f", value))
+        return bits << 32 | kind << 1 | 1
+
+    @staticmethod
+    def _unpack(data:int) -> Entry:
+        """ Entry stored in a data word """
+        value, = struct.unpack("<f", struct.pack("<I", data >> 32))
+        return value, data >> 1 & 3
+
+    def get(self, key:int, default:Entry | None = None) -> Entry | None:
+        """ (value, kind) stored for a key, or default if not found
+
+        :param     key: position key, below 2**64
+        :param default: returned if the key is not found
+        """
+        words = self.words
+        for i in self._indices(key):
+            data = words[i + 1]
+            if data and words[i] ^ data == key:
+                self.hits += 1
+                return self._unpack(data)
+        self.misses += 1
+        return default
+
+    def put(self, key:int, value:float, kind:int = EXACT) -> None:
+        """ Store a value for a key, replacing any entry already stored for it
+
+        :param   key: position key, below 2**64
+        :param value: value of the position
+        :param  kind: EXACT, or LOWER or UPPER if the value is a bound
+        """
+        words = self.words
+        indices = self._indices(key)
+        target = indices[0]
+        for i in indices:
+            data = words[i + 1]
+            if not data or words[i] ^ data == key:
+                target = i
+                break
+        data = self._pack(value, kind)
+        words[target + 1] = data
+        words[target] = key ^ data
+        self.stores += 1
+
+    def __contains__(self, key:int) -> bool:
+        return self.get(key) is not None
+
+    def __getitem__(self, key:int) -> Entry:
+        entry = self.get(key)
+        if entry is None: raise KeyError(key)
+        return entry
+
+    def __setitem__(self, key:int, entry:Entry) -> None:
+        self.put(key, *entry)
+
+    def clear(self) -> None:
+        """ Remove every entry, in every process sharing the table """
+        for i in range(2, 2 * (self.slots + 1)):
+            self.words[i] = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """ Fraction of lookups in this process that found an entry """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.
+
+    def close(self) -> None:
+        """ Detach this process from the table """
+        self.words.release()
+        self.memory.close()
+
+    def unlink(self) -> None:
+        """ Free the shared memory, once every process is done with it """
+        self.memory.unlink()
@@ -0,0 +1,110 @@
+import heapq
+import math
+from collections.abc import Callable, Iterable
+from itertools import count
+
+import numpy as np
+
+from .graph import Node, Label, Numeric, ShortestPathEnvironment
+from .incremental import weight
+
+Heuristic = Callable[[Node, Node], Numeric]  # (node, target) -> estimated distance
+
+
+def expand(source:Node,
+           targets:Iterable[Node],
+           heuristic:Heuristic | None = None) -> tuple[dict[Node, float], dict[Node, Node | None]]:
+    """ One search from source, stopping once every target is settled
+
+    Dijkstra's algorithm, or A* if a heuristic is given. With several
+    targets, A* is guided by the nearest target by heuristic, which stays
+    admissible as long as the heuristic is for every target.
+
+    :param    source: node to search from
+    :param   targets: nodes to find distances to
+    :param heuristic: optional consistent estimate of distance from a node to a target
+    :return: (distances, previous nodes) of every settled node
+    """
+    remaining = set(targets)
+    goals = list(remaining)
+    h = (lambda node: 0) if heuristic is None \
+        else (lambda node: min(heuristic(node, target) for target in goals))
+
+    dist:dict[Node, float] = {source: 0}
+    prev:dict[Node, Node | None] = {source: None}
+    settled:dict[Node, float] = {}
+    order = count()  # tie break, nodes do not compare
+    queue = [(h(source), next(order), source)]
+    while queue and remaining:
+        _, _, node = heapq.heappop(queue)
+        if node in settled: continue
+        settled[node] = dist[node]
+        remaining.discard(node)
+        for neighbour in node.neighbours:
+            d = dist[node] + weight(node, neighbour)
+            if d < dist.get(neighbour, math.inf):
+                dist[neighbour], prev[neighbour] = d, node
+                heapq.heappush(queue, (d + h(neighbour), next(order), neighbour))
+    return settled, prev
+
+
+def path_to(prev:dict[Node, Node | None], target:Node) -> list[Node]:
+    """ Path from the source of a search to a settled target """
+    path = [target]
+    while prev[path[-1]] is not None:
+        path.append(prev[path[-1]])
+    return path[::-1]
+
+
+def one_to_many(environment:ShortestPathEnvironment,
+                source:Node | Label,
+                targets:Iterable[Node | Label],
+                heuristic:Heuristic | None = None) -> np.ndarray:
+    """ Shortest distances from one source to many targets, with a single search
+
+    :param environment: environment whose graph to search
+    :param      source: source node or label
+    :param     targets: target nodes or labels
+    :param   heuristic: optional consistent estimate of distance from a node to a target
+    :return: array of distances in the order of targets, inf if unreachable
+    """
+    return many_to_many(environment, [source], targets, heuristic)[0]
+
+
+def many_to_many(environment:ShortestPathEnvironment,
+                 sources:Iterable[Node | Label],
+                 targets:Iterable[Node | Label],
+                 heuristic:Heuristic | None = None,
+                 paths:bool = False) -> np.ndarray:
+    """ Matrix of shortest distances between sources and targets
+
+    Each source is searched once, for every target at the same time, rather
+    than once per (source, target) pair.
+
+    :param environment: environment whose graph to search
+    :param     sources: source nodes or labels, one row each
+    :param     targets: target nodes or labels, one column each
+    :param   heuristic: optional consistent estimate of distance from a node to a target
+    :param       paths: if True, also store paths in environment.shortest_path,
+                        as {source: {target: (path, distance)}}
+    :return: (sources, targets) array of distances, inf if unreachable
+    """
+    sources = [environment.get_node(source) for source in sources]
+    targets = [environment.get_node(target) for target in targets]
+    matrix = np.full((len(sources), len(targets)), np.inf)
+    searched:dict[Node, tuple[dict, dict]] = {}  # repeated sources share a search
+    for i, source in enumerate(sources):
+        if source not in searched:
+            searched[source] = expand(source, targets, heuristic)
+        settled, prev = searched[source]
+        for j, target in enumerate(targets):
+            if target in settled: matrix[i, j] = settled[target]
+
+        if paths:
+            if not hasattr(environment, "shortest_path"):
+                environment.shortest_path = {}
+            delivered = environment.shortest_path.setdefault(source, {})
+            for target in targets:
+                delivered[target] = (path_to(prev, target), settled[target]) \
+                    if target in settled else ([], math.inf)
+    return matrix
@@ -0,0 +1,226 @@
+import heapq
+import math
+
+import numpy as np
+
+from ..agent.things import Obstacle
+
+Location = tuple[int, int]
+SQRT2 = math.sqrt(2)
+
+
+def occupancy(environment) -> np.ndarray:
+    """ Blocked cells of an XYEnvironment, as a boolean array indexed [x, y]
+
+    Cells holding an Obstacle, such as walls, or outside the environment's
+    walled bounds are blocked.
+
+    :param environment: XYEnvironment, or subclass, to read
+    :return: array of shape (width, height), True where blocked
+    """
+    blocked = np.ones((environment.width, environment.height), dtype=bool)
+    blocked[environment.x_start:environment.x_end,
+            environment.y_start:environment.y_end] = False
+    for thing in environment.things:
+        if isinstance(thing, Obstacle) and thing.location is not None:
+            blocked[tuple(thing.location)] = True
+    return blocked
+
+
+class GridPathfinder:
+    """ Shortest paths on a uniform cost grid, read from an occupancy array
+
+    Cells are never turned into nodes: the grid is stored once as a padded
+    byte string, and neighbours are found by index arithmetic, so grids of
+    millions of cells cost a few megabytes. Straight moves cost 1 and, with
+    `diagonal`, diagonal moves cost sqrt(2) and may not cut the corner of a
+    blocked cell.
+
+    `astar` expands cells one at a time. `jps`, Jump Point Search, only
+    queues cells where an optimal path may have to turn, skipping the many
+    equivalent paths through open space, and finds paths of the same length.
+    """
+    def __init__(self, blocked:np.ndarray, diagonal:bool = True) -> None:
+        """ Constructor for GridPathfinder
+
+        :param  blocked: boolean array indexed [x, y], True where blocked
+        :param diagonal: whether diagonal moves are allowed
+        """
+        blocked = np.asarray(blocked, dtype=bool)
+        if blocked.ndim != 2:
+            raise ValueError(f"{self}: occupancy must be a 2D array")
+        self.width, self.height = blocked.shape
+        self.diagonal = diagonal
+        self.stride = self.height + 2  # step in x of padded index
+        self.free = bytes(np.pad(~blocked, 1).astype(np.uint8).ravel())  # border is blocked
+        self.expanded = 0  # # of cells expanded by the last search
+
+    def __repr__(self) -> str:
+        """ String representation of the pathfinder """
+        return f"{self.__class__.__name__}[{self.width}x{self.height}]"
+
+    def index(self, location:Location) -> int:
+        """ Padded index of a cell, which must be free """
+        x, y = location
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise ValueError(f"{self}: {location} is out of bounds")
+        i = (x + 1) * self.stride + y + 1
+        if not self.free[i]:
+            raise ValueError(f"{self}: {location} is blocked")
+        return i
+
+    def location(self, i:int) -> Location:
+        """ Cell of a padded index """
+        x, y = divmod(i, self.stride)
+        return (x - 1, y - 1)
+
+    def heuristic(self, i:int, goal:int) -> float:
+        """ Octile, or Manhattan without diagonals, distance between indices """
+        dx = abs(i // self.stride - goal // self.stride)
+        dy = abs(i % self.stride - goal % self.stride)
+        if not self.diagonal: return dx + dy
+        return max(dx, dy) + (SQRT2 - 1) * min(dx, dy)
+
+    def neighbours(self, i:int) -> list[tuple[int, float]]:
+        """ Free neighbours of a cell and the cost of moving to each """
+        free, s = self.free, self.stride
+        result = [(i + d, 1.) for d in (s, -s, 1, -1) if free[i + d]]
+        if self.diagonal:
+            result += [(i + dx + dy, SQRT2) for dx in (s, -s) for dy in (1, -1)
+                           if free[i + dx] and free[i + dy] and free[i + dx + dy]]
+        return result
+
+    def _path(self,
+              prev:dict[int, int | None],
+              goal:int,
+              cost:float) -> tuple[list[Location], float]:
+        """ Cells from start to goal, filling in the cells between jump points """
+        points = [goal]
+        while prev[points[-1]] is not None:
+            points.append(prev[points[-1]])
+        points.reverse()
+        path = [points[0]]
+        for a, b in zip(points, points[1:]):
+            (ax, ay), (bx, by) = divmod(a, self.stride), divmod(b, self.stride)
+            step = (bx > ax) - (bx < ax), (by > ay) - (by < ay)
+            d = step[0] * self.stride + step[1]
+            for _ in range(max(abs(bx - ax), abs(by - ay))):
+                path.append(path[-1] + d)
+        return [self.location(i) for i in path], cost
+
+    def astar(self, start:Location, goal:Location) -> tuple[list[Location], float]:
+        """ Shortest path by A*, expanding every cell on the frontier
+
+        :param start: cell to start from
+        :param  goal: cell to reach
+        :return: (path as list of cells, cost), ([], inf) if unreachable
+        """
+        return self._search(start, goal, self.neighbours)
+
+    def jps(self, start:Location, goal:Location) -> tuple[list[Location], float]:
+        """ Shortest path by Jump Point Search, diagonal moves only
+
+        :param start: cell to start from
+        :param  goal: cell to reach
+        :return: (path as list of cells, cost), ([], inf) if unreachable
+        """
+        if not self.diagonal:
+            raise ValueError(f"{self}: jump point search needs diagonal moves")
+        return self._search(start, goal, None)
+
+    def _search(self, start:Location, goal:Location, expand) -> tuple[list[Location], float]:
+        """ A* over cells, or over jump points if expand is None """
+        start, goal = self.index(start), self.index(goal)
+        dist:dict[int, float] = {start: 0.}
+        prev:dict[int, int | None] = {start: None}
+        queue = [(self.heuristic(start, goal), start)]
+        closed = set()
+        self.expanded = 0
+        while queue:
+            _, i = heapq.heappop(queue)
+            if i in closed: continue
+            if i == goal: return self._path(prev, goal, dist[goal])
+            closed.add(i)
+            self.expanded += 1
+            successors = expand(i) if expand is not None \
+                else self._jump_points(i, prev[i], goal)
+            for j, cost in successors:
+                d = dist[i] + cost
+                if d < dist.get(j, math.inf):
+                    dist[j], prev[j] = d, i
+                    heapq.heappush(queue, (d + self.heuristic(j, goal), j))
+        return [], math.inf
+
+    def _directions(self, i:int, parent:int | None) -> list[tuple[int, int]]:
+        """ Pruned directions (dx, dy) to search from a jump point """
+        free, s = self.free, self.stride
+        if parent is None:
+            return [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+        (x, y), (px, py) = divmod(i, s), divmod(parent, s)
+        dx, dy = (x > px) - (x < px), (y > py) - (y < py)
+        directions = []
+        if dx and dy:  # diagonal: carry on, or along either component
+            walk_x, walk_y = free[i + dx*s], free[i + dy]
+            if walk_y: directions.append((0, dy))
+            if walk_x: directions.append((dx, 0))
+            if walk_x and walk_y: directions.append((dx, dy))
+        elif dx:  # horizontal: carry on, or turn where an obstacle ends
+            up, down = free[i + 1], free[i - 1]
+            if free[i + dx*s]:
+                directions.append((dx, 0))
+                if up: directions.append((dx, 1))
+                if down: directions.append((dx, -1))
+            if up: directions.append((0, 1))
+            if down: directions.append((0, -1))
+        else:  # vertical
+            right, left = free[i + s], free[i - s]
+            if free[i + dy]:
+                directions.append((0, dy))
+                if right: directions.append((1, dy))
+                if left: directions.append((-1, dy))
+            if right: directions.append((1, 0))
+            if left: directions.append((-1, 0))
+        return directions
+
+    def _jump_points(self, i:int, parent:int | None, goal:int) -> list[tuple[int, float]]:
+        """ Jump points reachable from a cell, and the cost to each """
+        free, s = self.free, self.stride
+        result = []
+        for dx, dy in self._directions(i, parent):
+            if dx and dy and not (free[i + dx*s] and free[i + dy]):
+                continue  # no corner cutting
+            j = self._jump(i, dx, dy, goal)
+            if j is not None:
+                steps = max(abs(j // s - i // s), abs(j % s - i % s))
+                result.append((j, steps * (SQRT2 if dx and dy else 1.)))
+        return result
+
+    def _jump(self, i:int, dx:int, dy:int, goal:int) -> int | None:
+        """ Next jump point from cell i in direction (dx, dy), if any """
+        free, s = self.free, self.stride
+        if dx and dy:
+            d = dx*s + dy
+            while True:
+                i += d
+                if not free[i]: return None
+                if i == goal: return i
+                if self._scan(i, dx, 0, goal) is not None \
+                        or self._scan(i, 0, dy, goal) is not None:
+                    return i
+                if not (free[i + dx*s] and free[i + dy]): return None
+        return self._scan(i, dx, dy, goal)
+
+    def _scan(self, i:int, dx:int, dy:int, goal:int) -> int | None:
+        """ Next jump point from cell i straight along x or y, if any """
+        free, s = self.free, self.stride
+        if dx:  # moving along x, obstacles to either side in y
+            d, side = dx*s, 1
+        else:
+            d, side = dy, s
+        while True:
+            i += d
+            if not free[i]: return None
+            if i == goal: return i
+            if (free[i + side] and not free[i - d + side]) \
+                    or (free[i - side] and not free[i - d - side]):
+                return i  # forced neighbour, an optimal path may turn here
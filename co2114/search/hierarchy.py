@@ -0,0 +1,332 @@
+import heapq
+import json
+import math
+import os
+from typing import Iterable, override
+
+import numpy as np
+
+from .graph import Graph, GraphEnvironment, Node, Label, Numeric, ShortestPathAgent
+
+VERSION = 1  # file format of `save`, checked by `load`
+UpwardEdges = dict[int, tuple[float, int]]  # higher ranked node -> (weight, middle node or -1)
+
+
+def _weight(w:Numeric) -> float:
+    """ Weight of an edge for searching, 1 if unweighted """
+    return 1. if w is None else float(w)
+
+
+def _hashable(label:object) -> Label:
+    """ Label read back from JSON, lists become tuples so it can be a key """
+    if isinstance(label, list): return tuple(_hashable(item) for item in label)
+    return label
+
+
+class ContractionHierarchy:
+    """ Contraction hierarchy over a static graph, for fast point to point queries
+
+    Preprocessing contracts nodes one at a time, least important first,
+    adding a shortcut between two neighbours of a contracted node whenever
+    the path through it is the only shortest path between them. A query is
+    then two small Dijkstra searches, from the source and from the target,
+    each only following edges up to more important nodes, meeting at the
+    shortest path. Shortcuts remember the node they bypass, so paths are
+    unpacked back to the original edges.
+
+    Build with `build`, persist with `save` and `load`. Queries take and
+    return node labels, see `path` for nodes of a bound environment.
+    """
+    def __init__(self,
+                 labels:list[Label],
+                 rank:list[int],
+                 up:list[UpwardEdges]) -> None:
+        """ Constructor for ContractionHierarchy, see `build` and `load`
+
+        :param labels: label of each node, by index
+        :param   rank: order each node was contracted in, by index
+        :param     up: upward edges of each node, by index
+        """
+        self.labels = labels
+        self.index = {label: i for i, label in enumerate(labels)}
+        if len(self.index) != len(labels):
+            raise ValueError(f"{self}: node labels must be unique")
+        self.rank = rank
+        self.up = up
+        self.nodes:dict[Label, Node] = {}  # label -> node, once bound
+
+    def __repr__(self) -> str:
+        """ String representation of the hierarchy """
+        return f"{self.__class__.__name__}[{len(self.labels)}]"
+
+    def __len__(self) -> int:
+        """ Number of nodes """
+        return len(self.labels)
+
+    @property
+    def shortcuts(self) -> int:
+        """ Number of shortcut edges added by contraction """
+        return sum(middle >= 0 for edges in self.up for _, middle in edges.values())
+
+    @classmethod
+    def build(cls,
+              graph:Graph | GraphEnvironment,
+              settle_limit:int = 60) -> "ContractionHierarchy":
+        """ Contract every node of a graph
+
+        :param        graph: graph, or graph environment, to preprocess
+        :param settle_limit: max. # of nodes settled per witness search, lower
+                             is faster to build but may add needless shortcuts
+        :return: the hierarchy, bound to the graph's nodes
+        """
+        if isinstance(graph, GraphEnvironment): graph = graph.graph
+        nodes = sorted(graph, key=lambda node: str(node.label))
+        index = {node: i for i, node in enumerate(nodes)}
+        adjacent:list[dict[int, float]] = [{} for _ in nodes]  # remaining graph
+        middle:dict[tuple[int, int], int] = {}  # shortcut -> node it bypasses
+        for node in nodes:
+            a = index[node]
+            for neighbour, w in node.weights.items():
+                w, b = _weight(w), index[neighbour]
+                if a != b and w < adjacent[a].get(b, math.inf):
+                    adjacent[a][b] = adjacent[b][a] = w
+        for edges in adjacent:  # closed edges are never used
+            for b in [b for b, w in edges.items() if w == math.inf]: del edges[b]
+
+        def witness(source:int, excluded:int, limit:float) -> dict[int, float]:
+            """ Distances from source avoiding a node, up to a limit """
+            dist, queue, settled = {source: 0.}, [(0., source)], 0
+            while queue and settled < settle_limit:
+                d, u = heapq.heappop(queue)
+                if d > dist[u]: continue
+                if d > limit: break
+                settled += 1
+                for v, w in adjacent[u].items():
+                    if v != excluded and d + w < dist.get(v, math.inf):
+                        dist[v] = d + w
+                        heapq.heappush(queue, (d + w, v))
+            return dist
+
+        def shortcuts(v:int) -> list[tuple[int, int, float]]:
+            """ Shortcuts needed to contract a node """
+            neighbours = list(adjacent[v].items())
+            needed = []
+            for i, (a, wa) in enumerate(neighbours[:-1]):
+                rest = neighbours[i+1:]
+                dist = witness(a, v, wa + max(w for _, w in rest))
+                for b, wb in rest:
+                    if dist.get(b, math.inf) > wa + wb:
+                        needed.append((a, b, wa + wb))
+            return needed
+
+        contracted = [0] * len(nodes)  # # of contracted neighbours, spreads contraction
+        def priority(v:int) -> int:
+            return 2 * len(shortcuts(v)) - len(adjacent[v]) + contracted[v]
+
+        queue = [(priority(v), v) for v in range(len(nodes))]
+        heapq.heapify(queue)
+        rank, up = [0] * len(nodes), [{} for _ in nodes]
+        order = 0
+        while queue:
+            _, v = heapq.heappop(queue)
+            p = priority(v)  # lazy update, priorities drift as nodes contract
+            if queue and p > queue[0][0]:
+                heapq.heappush(queue, (p, v))
+                continue
+            for a, b, w in shortcuts(v):
+                if w < adjacent[a].get(b, math.inf):
+                    adjacent[a][b] = adjacent[b][a] = w
+                    middle[min(a, b), max(a, b)] = v
+            for u, w in adjacent[v].items():  # remaining neighbours rank higher
+                up[v][u] = (w, middle.get((min(u, v), max(u, v)), -1))
+                del adjacent[u][v]
+                contracted[u] += 1
+            adjacent[v] = {}
+            rank[v] = order
+            order += 1
+
+        hierarchy = cls([node.label for node in nodes], rank, up)
+        hierarchy.nodes = {node.label: node for node in nodes}
+        return hierarchy
+
+    def bind(self, graph:Graph | GraphEnvironment) -> None:
+        """ Associate labels with the nodes of a graph, for `path`
+
+        :param graph: graph, or graph environment, the hierarchy was built from
+        """
+        if isinstance(graph, GraphEnvironment): graph = graph.graph
+        nodes = {node.label: node for node in graph}
+        if set(nodes) != set(self.labels):
+            raise ValueError(f"{self}: graph does not match hierarchy")
+        self.nodes = nodes
+
+    def save(self, path:str | os.PathLike) -> None:
+        """ Write the hierarchy to a compressed .npz file
+
+        Labels are kept as JSON, so must be strings, numbers or tuples of them.
+
+        :param path: file path to write to
+        """
+        counts = np.array([len(edges) for edges in self.up])
+        edges = [(b, w, m) for edges in self.up for b, (w, m) in edges.items()]
+        targets, weights, middles = zip(*edges) if edges else ((), (), ())
+        np.savez_compressed(
+            path,
+            version=VERSION,
+            labels=np.array(json.dumps(self.labels)),
+            rank=np.array(self.rank, dtype=np.int64),
+            offsets=np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+            targets=np.array(targets, dtype=np.int64),
+            weights=np.array(weights, dtype=np.float64),
+            middles=np.array(middles, dtype=np.int64))
+
+    @classmethod
+    def load(cls,
+             path:str | os.PathLike,
+             graph:Graph | GraphEnvironment | None = None) -> "ContractionHierarchy":
+        """ Read a hierarchy written by `save`
+
+        :param  path: file path to read from
+        :param graph: optional graph, or graph environment, to bind to
+        :return: the hierarchy
+        """
+        with np.load(path) as data:
+            version = int(data["version"])
+            if version != VERSION:
+                raise ValueError(f"{path}: unsupported hierarchy version")
+            labels = [_hashable(label) for label in json.loads(data["labels"].item())]
+            offsets = data["offsets"].tolist()
+            targets, weights, middles = (
+                data[key].tolist() for key in ("targets", "weights", "middles"))
+            up = [{targets[k]: (weights[k], middles[k])
+                       for k in range(offsets[i], offsets[i+1])}
+                  for i in range(len(offsets) - 1)]
+            hierarchy = cls(labels, data["rank"].tolist(), up)
+        if graph is not None: hierarchy.bind(graph)
+        return hierarchy
+
+    def search(self, source:int, target:int) -> tuple[float, list[int]]:
+        """ Bidirectional upward search between node indices
+
+        :param source: index of source node
+        :param target: index of target node
+        :return: (distance, [source, ..., target] of upward edges), inf if unreachable
+        """
+        dist = ({source: 0.}, {target: 0.})
+        prev:tuple[dict, dict] = ({source: None}, {target: None})
+        queues = ([(0., source)], [(0., target)])
+        best, meet = (0., source) if source == target else (math.inf, None)
+        side = 0
+        while queues[0] or queues[1]:
+            if not queues[side] or (queues[1-side] and queues[1-side][0] < queues[side][0]):
+                side = 1 - side  # expand the side with the lower key
+            d, u = heapq.heappop(queues[side])
+            if d >= best: queues[side].clear(); continue  # side can't improve
+            if d > dist[side][u]: continue
+            for v, (w, _) in self.up[u].items():
+                if d + w < dist[side].get(v, math.inf):
+                    dist[side][v] = d + w
+                    prev[side][v] = u
+                    heapq.heappush(queues[side], (d + w, v))
+                    if v in dist[1-side] and d + w + dist[1-side][v] < best:
+                        best, meet = d + w + dist[1-side][v], v
+            if u in dist[1-side] and d + dist[1-side][u] < best:
+                best, meet = d + dist[1-side][u], u
+        if meet is None: return math.inf, []
+
+        forward, u = [], meet
+        while u is not None: forward.append(u); u = prev[0][u]
+        backward, u = [], prev[1][meet]
+        while u is not None: backward.append(u); u = prev[1][u]
+        return best, forward[::-1] + backward
+
+    def unpack(self, route:list[int]) -> list[int]:
+        """ Replace shortcuts in a route with the original edges they bypass
+
+        :param route: node indices joined by hierarchy edges
+        :return: node indices joined by original edges
+        """
+        path, stack = route[:1], [(a, b) for a, b in reversed(list(zip(route, route[1:])))]
+        while stack:
+            a, b = stack.pop()
+            low, high = (a, b) if self.rank[a] < self.rank[b] else (b, a)
+            middle = self.up[low][high][1]
+            if middle < 0:
+                path.append(b)
+            else:
+                stack += [(middle, b), (a, middle)]
+        return path
+
+    def query(self, source:Label, target:Label) -> tuple[list[Label], float]:
+        """ Shortest path between two nodes, by label
+
+        :param source: label of source node
+        :param target: label of target node
+        :return: (path as list of labels, distance), ([], inf) if unreachable
+        """
+        distance, route = self.search(self.index[source], self.index[target])
+        return [self.labels[i] for i in self.unpack(route)], distance
+
+    def distance(self, source:Label, target:Label) -> float:
+        """ Shortest distance between two nodes, by label, without unpacking """
+        return self.search(self.index[source], self.index[target])[0]
+
+    def path(self, source:Node, target:Node) -> tuple[list[Node], float]:
+        """ Shortest path between two nodes of the bound graph
+
+        :param source: source node
+        :param target: target node
+        :return: (path as list of nodes, distance), ([], inf) if unreachable
+        """
+        if not self.nodes:
+            raise ValueError(f"{self}: not bound to a graph, see bind")
+        labels, distance = self.query(source.label, target.label)
+        return [self.nodes[label] for label in labels], distance
+
+    def queries(self, pairs:Iterable[tuple[Label, Label]]) -> list[float]:
+        """ Shortest distances for many (source, target) label pairs """
+        return [self.distance(source, target) for source, target in pairs]
+
+
+class ContractionHierarchyAgent(ShortestPathAgent):
+    """ Shortest path agent answering from a precomputed contraction hierarchy
+
+    Delivers on its first step, without exploring, so the environment's
+    `shortest_path` is filled in as for any other shortest path agent.
+    """
+    def __init__(self, hierarchy:ContractionHierarchy) -> None:
+        """ Initialise the agent with a hierarchy bound to the environment's graph
+
+        :param hierarchy: hierarchy built from, or bound to, the graph
+        """
+        super().__init__()
+        self.hierarchy = hierarchy
+
+    @override
+    def program(self, percepts:list[tuple[Node, Numeric]]) -> tuple[str, Node]:
+        """ Deliver the path to the target straight away """
+        return ("deliver", self.target)
+
+    @override
+    def utility(self, action:tuple[str, Node]) -> Numeric:
+        """ Delivering is the only action """
+        return 0
+
+    @override
+    def explore(self, node:Node) -> None:
+        """ Move to a node, not needed by the hierarchy """
+        self.location = node
+        self.visited.add(node)
+
+    @override
+    def deliver(self, node:Node) -> tuple[list[Node], Numeric]:
+        """ Deliver the shortest path to a node, and its distance
+
+        :param node: node to deliver the shortest path to
+        :return: (path as list of nodes, distance), ([], inf) if unreachable
+        """
+        path, distance = self.hierarchy.path(self.init, node)
+        for a, b in zip(path, path[1:]):
+            self.prev[b] = a
+            self.dist[b] = self.dist[a] + _weight(a.weights.get(b))
+        return path, distance
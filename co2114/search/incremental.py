@@ -0,0 +1,259 @@
+import heapq
+import math
+from itertools import count
+from typing import Iterable, override
+
+from .graph import Node, Label, Numeric, ShortestPathEnvironment, ShortestPathAgent
+
+Cost = tuple[float, int]  # (distance, # of edges), so zero weight edges still lengthen a path
+Key = tuple[float, int, float]
+WeightUpdate = tuple[Node | Label, Node | Label, Numeric]
+
+
+def weight(a:Node, b:Node) -> float:
+    """ Weight of the edge from a to b, 1 if unweighted, inf if closed
+
+    :param a: node the edge leaves
+    :param b: node the edge enters
+    :return: weight of edge
+    """
+    w = a.weights.get(b)
+    return 1 if w is None else w
+
+
+class DynamicShortestPathEnvironment(ShortestPathEnvironment):
+    """ A shortest path environment whose edge weights can change in place
+
+    Every change increments `version` and is passed to each agent with an
+    `update_weight(a, b, old, new)` method, so agents can repair their
+    search rather than start again. A delivered path is withdrawn by any
+    change, and running the environment again delivers the repaired path.
+    Closing a road is setting its weight to `math.inf`.
+    """
+    def __init__(self, *args, **kwargs) -> None:
+        """ Create a dynamic shortest path environment """
+        super().__init__(*args, **kwargs)
+        self.version = 0  # incremented by each weight change
+
+    def set_weight(self, a:Node | Label, b:Node | Label, weight:Numeric) -> None:
+        """ Change the weight of an existing edge, in both directions
+
+        :param      a: Node or label at one end of the edge
+        :param      b: Node or label at the other end of the edge
+        :param weight: new weight of the edge, math.inf to close it
+        """
+        self.set_weights([(a, b, weight)])
+
+    def set_weights(self, updates:Iterable[WeightUpdate]) -> None:
+        """ Change the weights of several existing edges, then notify agents once
+
+        :param updates: (node or label, node or label, weight) of each edge
+        """
+        changes = []
+        for a, b, new in updates:
+            a, b = self.get_node(a), self.get_node(b)
+            if b not in a.neighbours:
+                raise KeyError(f"{self}: no edge between {a} and {b}")
+            old = a.weights.get(b)
+            if old == new: continue
+            a.weights[b] = b.weights[a] = new  # undirected graph
+            changes.append((a, b, old, new))
+        if not changes: return
+
+        self.version += 1
+        for agent in self.agents:
+            if hasattr(agent, "update_weight"):
+                for change in changes:
+                    agent.update_weight(*change)
+        if hasattr(self, "shortest_path"):
+            for agent in self.agents:
+                self.shortest_path.pop(agent.init, None)
+        self.delivered = False
+
+
+class IncrementalShortestPathAgent(ShortestPathAgent):
+    """ Shortest path agent that repairs its search when edge weights change
+
+    Implements Lifelong Planning A* (LPA*). Each node has a distance `dist`
+    from the initial node, and a one step lookahead `rhs`, the best cost
+    via any neighbour. Nodes where the two differ are queued, and each
+    "explore" expands the queued node with the lowest key, until the target
+    is settled and delivered. When an edge changes, only its two end nodes
+    are re-evaluated, so the next run expands just the nodes whose distance
+    the change affects, instead of searching the whole graph again.
+
+    Edge weights are read from the nodes, as repairs can reach beyond the
+    neighbours of the agent's location. `heuristic` may be overridden with a
+    consistent estimate of the distance to the target, default 0.
+
+    Distances are compared with their # of edges as a tie break. LPA* needs
+    every edge to lengthen a path, or nodes joined by zero weight edges can
+    keep each other's stale distances after a weight increases.
+    """
+    def __init__(self) -> None:
+        """ Initialise the incremental shortest path agent. """
+        super().__init__()
+        self.rhs:dict[Node, Cost] = {}  # one step lookahead cost
+        self.hops:dict[Node, int] = {}  # # of edges of each distance in dist
+        self.queue:list[tuple[Key, int, Node]] = []  # heap, stale entries skipped
+        self.keys:dict[Node, tuple[Key, int]] = {}  # current key of each queued node
+        self.expansions = 0  # # of nodes expanded, in total
+        self._order = count()  # tie break, nodes do not compare
+
+    def heuristic(self, node:Node) -> Numeric:
+        """ Estimate of distance from node to target, needs to be consistent
+
+        :param node: node to estimate from
+        :return: estimated distance
+        """
+        return 0
+
+    def g(self, node:Node) -> float:
+        """ Current distance of node from the initial node, inf if unknown """
+        return self.dist.get(node, math.inf)
+
+    def cost(self, node:Node) -> Cost:
+        """ Current distance of node and its # of edges, (inf, 0) if unknown """
+        return (self.g(node), self.hops.get(node, 0))
+
+    def key(self, node:Node) -> Key:
+        """ Priority of a node in the queue """
+        distance, hops = min(self.cost(node), self.rhs.get(node, (math.inf, 0)))
+        return (distance + self.heuristic(node), hops, distance)
+
+    def top(self) -> tuple[Node | None, Key]:
+        """ Queued node with the lowest key, discarding stale entries """
+        while self.queue:
+            key, order, node = self.queue[0]
+            if self.keys.get(node) == (key, order):
+                return node, key
+            heapq.heappop(self.queue)
+        return None, (math.inf, math.inf, math.inf)
+
+    def update_node(self, node:Node) -> None:
+        """ Recompute the lookahead of a node, and queue it if inconsistent
+
+        :param node: node whose distance may have changed
+        """
+        if node is not self.init:
+            best, via = (math.inf, 0), None
+            for neighbour in node.neighbours:
+                distance, hops = self.cost(neighbour)
+                d = (distance + weight(neighbour, node), hops + 1)
+                if d < best: best, via = d, neighbour
+            self.rhs[node] = best
+            self.prev[node] = via
+        self.keys.pop(node, None)  # any queued entry becomes stale
+        if self.cost(node) != self.rhs[node]:
+            order = next(self._order)
+            key = self.key(node)
+            self.keys[node] = (key, order)
+            heapq.heappush(self.queue, (key, order, node))
+
+    @property
+    def is_settled(self) -> bool:
+        """ Whether the distance to the target is known to be shortest """
+        _, key = self.top()
+        target = self.target
+        return key >= self.key(target) \
+            and self.cost(target) == self.rhs.get(target, (math.inf, 0))
+
+    @override
+    def initialise(self, node:Node, target:Node | None) -> None:
+        """ Initialise the agent with its starting and target nodes.
+
+        The initial node is settled at distance 0, and its neighbours queued.
+
+        :param node:   Initial node for the agent.
+        :param target: Target node for the agent.
+        """
+        super().initialise(node, target)
+        self.rhs[node] = (0, 0)
+        self.visited.add(node)
+        for neighbour in node.neighbours:
+            self.update_node(neighbour)
+
+    def update_weight(self,
+                      a:Node,
+                      b:Node,
+                      old:Numeric,
+                      new:Numeric) -> None:
+        """ Repair the search after the weight of edge a-b changed
+
+        :param   a: node at one end of the edge
+        :param   b: node at the other end of the edge
+        :param old: previous weight of the edge
+        :param new: new weight of the edge
+        """
+        for node in (a, b):
+            if node in self.rhs or node in self.dist:  # reached by the search
+                self.update_node(node)
+
+    @override
+    def program(self, percepts:list[tuple[Node, Numeric]]) -> tuple[str, Node]:
+        """ Explore the next queued node, or deliver once the target is settled
+
+        :param percepts: neighbours of the agent's location, unused
+        :return: ("explore", node) or ("deliver", target)
+        """
+        node, _ = self.top()
+        if node is None or self.is_settled:
+            return ("deliver", self.target)
+        return ("explore", node)
+
+    @override
+    def utility(self, action:tuple[str, Node]) -> Numeric:
+        """ Negative key of explored nodes, so lower keys are preferred """
+        command, node = action
+        if command == "explore":
+            return -self.key(node)[0]
+        return 0
+
+    @override
+    def explore(self, node:Node) -> None:
+        """ Expand a queued node, settling or invalidating its distance
+
+        :param node: node to be expanded
+        """
+        self.location = node
+        self.visited.add(node)
+        self.expansions += 1
+        self.keys.pop(node, None)
+        if self.cost(node) > self.rhs[node]:  # distance improved
+            self.dist[node], self.hops[node] = self.rhs[node]
+        else:  # distance got worse, re-evaluate from its neighbours
+            self.dist.pop(node, None)
+            self.hops.pop(node, None)
+            self.update_node(node)
+        for neighbour in node.neighbours:
+            self.update_node(neighbour)
+
+    def replan(self) -> int:
+        """ Expand queued nodes until the target is settled, without stepping
+
+        :return: # of nodes expanded
+        """
+        expansions = self.expansions
+        while True:
+            node, _ = self.top()
+            if node is None or self.is_settled: break
+            self.explore(node)
+        return self.expansions - expansions
+
+    @override
+    def deliver(self, node:Node) -> tuple[list[Node], Numeric]:
+        """ Deliver the shortest path to a settled node, and its distance
+
+        :param node: node to deliver the shortest path to
+        :return: (path as list of nodes, distance), ([], inf) if unreachable
+        """
+        distance = self.g(node)
+        if distance == math.inf: return ([], math.inf)
+        path, seen = [node], {node}
+        while path[-1] is not self.init:  # step back along best predecessors
+            previous = self.prev.get(path[-1])
+            if previous is None or previous in seen:
+                raise RuntimeError(f"{self}: no settled path to {node}")
+            path.append(previous)
+            seen.add(previous)
+        return (path[::-1], distance)
@@ -1,31 +1,48 @@
+from collections.abc import MutableMapping
 from typing import override
 from co2114.optimisation.adversarial import (
     State,
     Numeric,
     AdversarialAgent
 )
+from co2114.optimisation.transposition import EXACT, LOWER, UPPER
 
 
 class AssignmentAgent02(AdversarialAgent):
 
-    def __init__(self):
+    def __init__(self, cache: MutableMapping | None = None):
         super().__init__()
-        self.cache = {}
-
-    def _state_key(self, state: State):
-        return tuple(tuple(tile.player for tile in row) for row in state)
+        # key -> (value, kind), or a TranspositionTable shared with other agents and processes
+        self.cache = {} if cache is None else cache
+
+    def _state_key(self, state: State) -> int:
+        # board in base 3, the agent's player, as values are relative to it,
+        # and who moved first, as it decides whose turn it is on even boards
+        key = 0
+        for row in state:
+            for tile in row:
+                key = 3 * key + {None: 0, "X": 1, "O": 2}[tile.player]
+        key = 2 * key + (getattr(self, "first_move", None) == "opponent")
+        return 2 * key + (getattr(self, "player", None) == "O")
 
     def minimax(self, state, alpha, beta):
         key = self._state_key(state)
 
-        if key in self.cache:
-            return self.cache[key]
+        entry = self.cache.get(key)
+        if entry is not None:
+            value, kind = entry
+            if kind == EXACT \
+                    or (kind == LOWER and value >= beta) \
+                    or (kind == UPPER and value <= alpha):
+                return value
 
         score = self.score(state)
         if score is not None:
-            self.cache[key] = score
+            self.cache[key] = (score, EXACT)
             return score
 
+        window = alpha, beta
+
         player_to_move = self.to_move(state)
 
         if player_to_move == "player":  
@@ -43,7 +60,14 @@ class AssignmentAgent02(AdversarialAgent):
                 if beta <= alpha:
                     break
 
-        self.cache[key] = value
+        # a value outside the window is only a bound on the true value
+        if value <= window[0]:
+            kind = UPPER
+        elif value >= window[1]:
+            kind = LOWER
+        else:
+            kind = EXACT
+        self.cache[key] = (value, kind)
         return value
 
     def utility(self, action: tuple[str, State]) -> Numeric:
@@ -69,6 +93,7 @@ if __name__ == "__main__":
 
     parser = argparse.ArgumentParser()
     parser.add_argument("--play", action="store_true")
+    parser.add_argument("--cache", help="file keeping solved positions between runs")
     args = parser.parse_args()
 
     if args.play:
@@ -82,9 +107,16 @@ if __name__ == "__main__":
         class AgentPlayer(AssignmentAgent02, TicTacToeAgent):
             pass
 
-        agent = AgentPlayer()
+        cache = None
+        if args.cache:
+            from co2114.optimisation.memo import PersistentCache, code_namespace
+            cache = PersistentCache(args.cache, code_namespace(AgentPlayer))
+
+        agent = AgentPlayer(cache=cache)
         environment.add_agent(agent, player="O")
         environment.run()
+        if cache is not None:
+            cache.close()
     else:
         agent = AssignmentAgent02()
         print("Sanity check passed.")
\ No newline at end of file
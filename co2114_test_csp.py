@@ -0,0 +1,260 @@
+import random
+import unittest
+from itertools import product
+
+from co2114.constraints.csp import Variable, Factor, ConstraintSatisfactionProblem as CSP
+from co2114.constraints.csp import util
+from co2114.constraints.csp import bitset
+from co2114.constraints.csp.bitset import BitsetCSP
+from co2114.constraints.csp.propagators import AllDifferent, LinearSum
+from co2114.constraints.csp.solver import BacktrackingSolver
+
+
+RELATIONS = [
+    lambda a, b: a != b,
+    lambda a, b: a < b,
+    lambda a, b: abs(a - b) != 1,
+    lambda a, b: (a + b) % 3 != 0,
+    lambda a, b: a + b >= 3,
+]  # binary relations on values, for random problems
+
+
+def random_csp(seed:int,
+               n:int = 6,
+               d:int = 4,
+               binary:int = 7,
+               unary:int = 2,
+               globals_:bool = False) -> CSP:
+    """ Utility function to build a small random CSP
+
+    :param seed: Seed of the random number generator.
+    :param n: Number of variables, each with domain 0 to d-1.
+    :param d: Size of each domain.
+    :param binary: Number of random binary constraints.
+    :param unary: Number of random unary constraints.
+    :param globals_: Whether to add an AllDifferent and a LinearSum constraint.
+    :return: The random CSP, built the same way for the same arguments.
+    """
+    rng = random.Random(seed)
+    variables = [Variable(set(range(d)), name=f"x{i}") for i in range(n)]
+    constraints = []
+    for _ in range(binary):
+        a, b = rng.sample(variables, 2)
+        relation = rng.choice(RELATIONS)
+        constraints.append(
+            Factor(lambda a, b, relation=relation: relation(a.value, b.value), [a, b]))
+    for _ in range(unary):
+        value = rng.randrange(d)
+        constraints.append(
+            Factor(lambda x, value=value: x.value != value, rng.choice(variables)))
+    if globals_:
+        constraints.append(AllDifferent(rng.sample(variables, 3)))
+        scope = rng.sample(variables, 3)
+        constraints.append(LinearSum(
+            scope, rng.randint(2, 3*d), [rng.choice([-1, 1, 2]) for _ in scope],
+            rng.choice(["==", "<=", ">="])))
+    return CSP(variables, constraints)
+
+
+def solutions(csp:CSP) -> set[tuple]:
+    """ Utility function enumerating every solution of a CSP by brute force
+
+    :param csp: The CSP, its variables are left unassigned.
+    :return: Set of tuples of values, in the order of csp.variables.
+    """
+    found = set()
+    for values in product(*(sorted(variable.domain) for variable in csp.variables)):
+        for variable, value in zip(csp.variables, values):
+            variable.value = value
+        if all(constraint.is_satisfied for constraint in csp.constraints):
+            found.add(values)
+    for variable in csp.variables:
+        variable.value = None
+    return found
+
+
+def supports(csp:CSP) -> list[set]:
+    """ Utility function giving the values of each variable used by some solution """
+    found = solutions(csp)
+    return [{values[i] for values in found} for i in range(len(csp.variables))]
+
+
+def propagated(csp:CSP) -> tuple[bool, list[set]]:
+    """ Utility function running the bitset engine's AC-3 on a CSP
+
+    :return: (whether AC-3 succeeded, domain of each variable after propagation)
+    """
+    engine = BitsetCSP(csp)
+    consistent = engine.ac3()
+    return consistent, [set(engine.domain(i)) for i in range(len(csp.variables))]
+
+
+class TestBacktrackingSolver(unittest.TestCase):
+    """ Tests for BacktrackingSolver against brute force enumeration """
+    def check(self, inference:str, globals_:bool) -> None:
+        """ Utility to solve random CSPs and check each result """
+        for seed in range(60):
+            with self.subTest(seed=seed, inference=inference):
+                csp = random_csp(seed, globals_=globals_)
+                expected = solutions(csp)
+                solved = BacktrackingSolver(inference).solve(csp)
+                if not expected:
+                    self.assertIsNone(solved)
+                    self.assertFalse(any(v.is_assigned for v in csp.variables))
+                else:
+                    self.assertIs(solved, csp)
+                    self.assertIn(tuple(v.value for v in csp.variables), expected)
+
+    def test_forward_checking(self):
+        """ Forward checking finds a solution exactly when one exists """
+        self.check("forward", False)
+
+    def test_mac(self):
+        """ Maintaining arc consistency finds a solution exactly when one exists """
+        self.check("mac", False)
+
+    def test_global_constraints(self):
+        """ Both inference modes handle AllDifferent and LinearSum constraints """
+        for inference in ("forward", "mac"):
+            self.check(inference, True)
+
+    def test_unknown_inference(self):
+        """ Unknown inference modes are rejected """
+        with self.assertRaises(ValueError):
+            BacktrackingSolver("backjumping")
+
+
+class TestAllDifferent(unittest.TestCase):
+    """ Tests for AllDifferentPropagator """
+    def test_hall_set(self):
+        """ Values taken by a Hall set are removed from the other variables """
+        x = [Variable({1, 2}, "x0"), Variable({1, 2}, "x1"),
+             Variable({1, 2, 3}, "x2"), Variable({1, 2, 3, 4}, "x3")]
+        consistent, domains = propagated(CSP(x, [AllDifferent(x)]))
+        self.assertTrue(consistent)
+        self.assertEqual(domains, [{1, 2}, {1, 2}, {3}, {4}])
+
+    def test_hall_set_not_found_pairwise(self):
+        """ Pairwise inequalities alone do not prune the Hall set """
+        x = [Variable({1, 2}, "x0"), Variable({1, 2}, "x1"), Variable({1, 2, 3}, "x2")]
+        pairwise = [Factor(lambda a, b: a.value != b.value, [a, b])
+                        for i, a in enumerate(x) for b in x[i+1:]]
+        self.assertEqual(propagated(CSP(x, pairwise))[1], [{1, 2}, {1, 2}, {1, 2, 3}])
+        self.assertEqual(propagated(CSP(x, [AllDifferent(x)]))[1], [{1, 2}, {1, 2}, {3}])
+
+    def test_too_few_values(self):
+        """ Fails when more variables than values remain """
+        x = [Variable({1, 2}, f"x{i}") for i in range(3)] + [Variable({1, 2, 3}, "x3")]
+        consistent, _ = propagated(CSP(x, [AllDifferent(x)]))
+        self.assertFalse(consistent)
+
+    def test_generalised_arc_consistency(self):
+        """ Keeps exactly the values used by some solution """
+        rng = random.Random(0)
+        for seed in range(100):
+            with self.subTest(seed=seed):
+                x = [Variable(set(rng.sample(range(6), rng.randint(1, 4))), f"x{i}")
+                         for i in range(rng.randint(2, 5))]
+                csp = CSP(x, [AllDifferent(x)])
+                expected = supports(csp)
+                consistent, domains = propagated(csp)
+                self.assertEqual(consistent, all(expected))
+                if consistent: self.assertEqual(domains, expected)
+
+
+class TestLinearSum(unittest.TestCase):
+    """ Tests for LinearSumPropagator """
+    def domains(self, coefficients:list[int], total:int, comparison:str,
+                domain:set[int] = set(range(6))) -> tuple[bool, list[set]]:
+        """ Utility to propagate a single linear constraint """
+        x = [Variable(domain, f"x{i}") for i in range(len(coefficients))]
+        return propagated(CSP(x, [LinearSum(x, total, coefficients, comparison)]))
+
+    def test_at_most(self):
+        """ Upper bounds of x + 2y + z <= 3 """
+        self.assertEqual(self.domains([1, 2, 1], 3, "<="),
+                         (True, [{0, 1, 2, 3}, {0, 1}, {0, 1, 2, 3}]))
+
+    def test_at_least(self):
+        """ Lower bounds of x + 2y + z >= 18 """
+        self.assertEqual(self.domains([1, 2, 1], 18, ">="),
+                         (True, [{3, 4, 5}, {4, 5}, {3, 4, 5}]))
+
+    def test_equal(self):
+        """ Both bounds of x - y == 4 """
+        self.assertEqual(self.domains([1, -1], 4, "=="),
+                         (True, [{4, 5}, {0, 1}]))
+
+    def test_infeasible(self):
+        """ Fails when the total cannot be reached """
+        self.assertFalse(self.domains([1, 1], -1, "<=")[0])
+        self.assertFalse(self.domains([1, 1], 11, ">=")[0])
+        self.assertFalse(self.domains([2, 2], 5, "==", {0, 1})[0])
+
+    def test_bounds(self):
+        """ Keeps every supported value, and the smallest and largest are within bounds """
+        rng = random.Random(1)
+        for comparison in ("==", "<=", ">="):
+            for seed in range(60):
+                with self.subTest(comparison=comparison, seed=seed):
+                    coefficients = [rng.choice([-2, -1, 1, 2, 3]) for _ in range(rng.randint(2, 4))]
+                    total = rng.randint(-6, 12)
+                    x = [Variable(set(rng.sample(range(6), 4)), f"x{i}")
+                             for i in range(len(coefficients))]
+                    csp = CSP(x, [LinearSum(x, total, coefficients, comparison)])
+                    expected = supports(csp)
+                    consistent, domains = propagated(csp)
+                    if not consistent:
+                        self.assertFalse(all(expected))
+                        continue
+                    for v, (c, domain) in enumerate(zip(coefficients, domains)):
+                        self.assertLessEqual(expected[v], domain)
+                        others = [(min(c*value for value in d), max(c*value for value in d))
+                                      for c, d in zip(coefficients, domains)]
+                        del others[v]
+                        for value in (min(domain), max(domain)):  # supported by the others' bounds
+                            smallest = c*value + sum(low for low, _ in others)
+                            largest = c*value + sum(high for _, high in others)
+                            if comparison in ("==", "<="): self.assertLessEqual(smallest, total)
+                            if comparison in ("==", ">="): self.assertGreaterEqual(largest, total)
+
+
+class TestDropIn(unittest.TestCase):
+    """ Tests for bitset ac3 and make_node_consistent against util """
+    def test_ac3(self):
+        """ Same result and domains as util.ac3 """
+        for seed in range(60):
+            with self.subTest(seed=seed):
+                original, bitwise = random_csp(seed, unary=0), random_csp(seed, unary=0)
+                consistent = util.ac3(original)
+                self.assertEqual(bitset.ac3(bitwise), consistent)
+                if consistent:
+                    self.assertEqual([v.domain for v in bitwise.variables],
+                                     [v.domain for v in original.variables])
+
+    def test_ac3_not_inplace(self):
+        """ Returns a propagated copy, leaving the CSP unchanged """
+        for seed in range(20):
+            with self.subTest(seed=seed):
+                original, bitwise = random_csp(seed, unary=0), random_csp(seed, unary=0)
+                copy = util.ac3(original, inplace=False)
+                result = bitset.ac3(bitwise, inplace=False)
+                self.assertEqual(result is None, copy is None)
+                self.assertTrue(all(v.domain == set(range(4)) for v in bitwise.variables))
+                if copy is not None:
+                    self.assertEqual([v.domain for v in result.variables],
+                                     [v.domain for v in copy.variables])
+
+    def test_make_node_consistent(self):
+        """ Same domains as util.make_node_consistent """
+        for seed in range(40):
+            with self.subTest(seed=seed):
+                original, bitwise = random_csp(seed, unary=4), random_csp(seed, unary=4)
+                util.make_node_consistent(original)
+                bitset.make_node_consistent(bitwise)
+                self.assertEqual([v.domain for v in bitwise.variables],
+                                 [v.domain for v in original.variables])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,204 @@
+import unittest
+import importlib
+import json
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, redirect_stdout, redirect_stderr
+from io import StringIO
+from pathlib import Path
+from collections.abc import Iterator
+
+SUITES: dict[str, tuple[str, str, str]] = {
+    "01": ("co2114_test_script_01", "TestAssignmentAgent01", "AssignmentAgent01"),
+    "02": ("co2114_test_script_02", "TestAssignmentAgent02", "AssignmentAgent02"),
+}  # assignment -> (test script module, test case, agent class)
+
+MARKER = "@@co2114-result@@"  # prefixes the result line printed by a worker
+
+
+class TestTimeout(Exception):
+    """ Raised inside a test that runs past its time limit. """
+
+
+@contextmanager
+def time_limit(seconds:float | None, cpu:float | None = None) -> Iterator[None]:
+    """ Raise TestTimeout in the block if it runs too long (Unix only)
+
+    :param seconds: max. wall clock time in seconds, or None for no limit
+    :param cpu: max. CPU time in seconds, or None for no limit
+    """
+    def expire(signum, frame):
+        kind = "CPU" if signum == signal.SIGPROF else "time"
+        raise TestTimeout(f"test exceeded {kind} limit")
+
+    timers = [(signal.ITIMER_REAL, signal.SIGALRM, seconds),
+              (signal.ITIMER_PROF, signal.SIGPROF, cpu)]
+    timers = [timer for timer in timers if timer[2]]
+    previous = [signal.signal(signum, expire) for _, signum, _ in timers]
+    for which, _, limit in timers:
+        signal.setitimer(which, limit)
+    try:
+        yield
+    finally:
+        for (which, signum, _), handler in zip(timers, previous):
+            signal.setitimer(which, 0)
+            signal.signal(signum, handler)
+
+
+def run_suite(assignment:str,
+              filepath:Path,
+              timeout:float | None = None,
+              cpu:float | None = None) -> dict:
+    """ Run the test suite for one agent file in this process
+
+    The agent file is loaded once and shared by every test. Output printed
+    by the agent or environments is discarded.
+
+    :param assignment: Assignment number, a key of SUITES
+    :param filepath: Path to the agent implementation
+    :param timeout: max. wall clock seconds per test
+    :param cpu: max. CPU seconds per test
+    :return: dictionary summarising the outcome of each test
+    """
+    script, case_name, class_name = SUITES[assignment]
+    summary = {"file": str(filepath), "status": "ok", "tests": {}}
+    start = time.perf_counter()
+    with redirect_stdout(StringIO()), redirect_stderr(StringIO()):
+        try:
+            module = importlib.import_module(script)
+            module.FILEPATH_AGENT = filepath
+            module.load_class_from_file(filepath, class_name)
+        except BaseException as error:  # submissions may even call exit()
+            summary["status"] = "load error"
+            summary["message"] = f"{type(error).__name__}: {error}"
+            return summary
+        case = getattr(module, case_name)
+
+        result = module.ReportableResult(StringIO(), True, 0)
+        for test in unittest.TestLoader().loadTestsFromTestCase(case):
+            began = time.perf_counter()
+            try:
+                with time_limit(timeout, cpu):
+                    test(result)
+            except TestTimeout as error:  # expired outside the test body
+                result.addError(test, (type(error), error, error.__traceback__))
+            summary["tests"][test.id()] = {
+                "outcome": "passed",
+                "time": round(time.perf_counter() - began, 4)}
+
+    for outcome, entries in (("failed", result.failures),
+                             ("error", result.errors),
+                             ("skipped", result.skipped)):
+        for test, message in entries:
+            name = getattr(test, "test_case", test).id()  # subtests count towards their test
+            summary["tests"].setdefault(name, {"time": 0.})
+            summary["tests"][name]["outcome"] = outcome
+            summary["tests"][name]["message"] = message.strip().splitlines()[-1]
+    summary["text"] = case.generate_summary(result)
+    summary["passed"] = sum(
+        test["outcome"] == "passed" for test in summary["tests"].values())
+    summary["total"] = len(summary["tests"])
+    summary["time"] = round(time.perf_counter() - start, 4)
+    return summary
+
+
+def grade(assignment:str,
+          filepaths:list[Path],
+          workers:int | None = None,
+          timeout:float | None = 10.,
+          cpu:float | None = None) -> list[dict]:
+    """ Run the test suite for many agent files in parallel
+
+    Each agent file is tested in its own worker process, so a submission
+    that crashes, exits or hangs cannot affect any other. A worker that
+    outlives its tests' combined time limits is killed.
+
+    :param assignment: Assignment number, a key of SUITES
+    :param filepaths: Paths to the agent implementations
+    :param workers: max. # of worker processes at once, default is # of CPUs
+    :param timeout: max. wall clock seconds per test
+    :param cpu: max. CPU seconds per test
+    :return: list of summaries, one per agent file, in the order given
+    """
+    script, case_name, _ = SUITES[assignment]
+    names = unittest.TestLoader().getTestCaseNames(
+        getattr(importlib.import_module(script), case_name))
+    deadline = None if timeout is None else 10. + timeout * len(names)
+
+    def work(filepath:Path) -> dict:
+        command = [sys.executable, str(Path(__file__).resolve()),
+                   assignment, str(filepath), "--worker"]
+        if timeout is not None: command += ["--timeout", str(timeout)]
+        if cpu is not None: command += ["--cpu", str(cpu)]
+        try:
+            process = subprocess.run(
+                command, capture_output=True, text=True, timeout=deadline,
+                stdin=subprocess.DEVNULL, cwd=Path(__file__).resolve().parent)
+        except subprocess.TimeoutExpired:
+            return {"file": str(filepath), "status": "timeout", "tests": {}}
+        for line in reversed(process.stdout.splitlines()):
+            if line.startswith(MARKER):
+                return json.loads(line[len(MARKER):])
+        return {"file": str(filepath), "status": "crashed", "tests": {},
+                "message": (process.stderr.strip().splitlines() or [""])[-1]}
+
+    with ThreadPoolExecutor(workers) as pool:  # threads only wait on processes
+        return list(pool.map(work, filepaths))
+
+
+if __name__ == "__main__":
+
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("assignment", choices=sorted(SUITES),
+        help="Assignment whose tests to run.")
+    parser.add_argument("agent_filepaths", type=str, nargs="+",
+        help="File paths to the agent implementations to be tested.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+        help="Number of agent files to test at once.")
+    parser.add_argument("--timeout", type=float, default=10.,
+        help="Wall clock time limit per test, in seconds.")
+    parser.add_argument("--cpu", type=float, default=None,
+        help="CPU time limit per test, in seconds.")
+    parser.add_argument("--json", type=str, default=None,
+        help="File path to write the machine-readable summary to.")
+    parser.add_argument("--verbose", action="store_true",
+        help="Print the test summary of each agent file.")
+    parser.add_argument("--worker", action="store_true",
+        help=argparse.SUPPRESS)  # internal: test a single file in this process
+    args = parser.parse_args()
+
+    if args.worker:
+        summary = run_suite(args.assignment, Path(args.agent_filepaths[0]),
+                            args.timeout, args.cpu)
+        print(MARKER + json.dumps(summary), flush=True)
+        sys.exit()
+
+    filepaths = [Path(filepath).resolve() for filepath in args.agent_filepaths]
+    for filepath in filepaths:
+        if not filepath.is_file():  # make sure files exist
+            raise FileNotFoundError(f"Agent file not found at {filepath}")
+
+    start = time.perf_counter()
+    summaries = grade(args.assignment, filepaths,
+                      args.workers, args.timeout, args.cpu)
+    elapsed = time.perf_counter() - start
+
+    for summary in summaries:
+        if args.verbose and "text" in summary:
+            print(summary["text"])
+        score = f"{summary['passed']}/{summary['total']}" \
+            if summary["status"] == "ok" else summary["status"]
+        print(f"{score:>12}  {summary['file']}")
+    print(f"Tested {len(summaries)} agent files in {elapsed:.1f}s")
+
+    if args.json is not None:
+        with open(args.json, "w") as file:
+            json.dump({"assignment": args.assignment,
+                       "time": round(elapsed, 4),
+                       "agents": summaries}, file, indent=2)
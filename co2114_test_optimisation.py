@@ -0,0 +1,1131 @@
+import importlib.util
+import json
+import multiprocessing
+import os
+import pickle
+import random
+import sqlite3
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from collections import deque
+from pathlib import Path
+from types import ModuleType
+
+import numpy as np
+
+from co2114.optimisation.batch import BatchHospitalPlacement
+from co2114.optimisation.checkpoint import CheckpointRunner, environment_from_checkpoint
+from co2114.optimisation.distances import (
+    BottleneckTracker, CapacitatedAssignment, TravelDistances,
+    distance_field, distance_matrix, max_distance)
+from co2114.optimisation.memo import PersistentCache, code_namespace
+from co2114.optimisation.optimisers import (
+    HospitalOptimiser, KCenterOptimiser, KMediansOptimiser, MemoisedOptimiser, placement_key)
+from co2114.optimisation.planning import HospitalPlacement, PRESET_STATES
+from co2114.optimisation.rendering import FastEnvironmentApp
+from co2114.optimisation.things import Hospital, House
+from co2114.optimisation.tracing import Tracer
+from co2114.optimisation.trajectory import Trajectory, TrajectoryRecorder
+from co2114.optimisation.transposition import EXACT, LOWER, UPPER, TranspositionTable
+from co2114.search.graph import ShortestPathAgent, ShortestPathEnvironment
+from co2114.optimisation.pareto import ParetoArchive, dominates, non_dominated
+
+from co2114_test_util import load_module_from_file
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # optional, only used to cross-check
+    linear_sum_assignment = None
+
+
+def capacitated_optimum(cost:np.ndarray, capacity:np.ndarray) -> float | None:
+    """ Utility function giving the least total cost by scipy, one column per unit of capacity
+
+    :param cost: (n, k) array of costs, inf if not allowed
+    :param capacity: (k,) array of capacities
+    :return: least total cost, None if no assignment avoids every inf cost
+    """
+    columns = np.repeat(np.arange(cost.shape[1]), capacity)
+    try:
+        rows, chosen = linear_sum_assignment(cost[:, columns])
+    except ValueError:  # infeasible
+        return None
+    return cost[rows, columns[chosen]].sum()
+
+
+WEEK4 = Path(__file__).parent / "Week4" / "Week4.py"  # lab optimisers
+ASSIGNMENT_02 = Path(__file__).parent / "co2114_assignment_02_249044600.py"  # minimax agent
+
+
+def load_week4() -> ModuleType:
+    """ Utility function to load the Week 4 lab module from its file """
+    return load_module_from_file(WEEK4)
+
+
+def random_placement(rng:random.Random, **kwargs) -> HospitalPlacement:
+    """ Utility function to create a small random Hospital Placement environment
+
+    :param rng: random number generator choosing the size and locations
+    :param kwargs: additional kwargs for HospitalPlacement, e.g. jump or swaps
+    :return: environment with houses and hospitals on distinct cells
+    """
+    width, height = rng.randint(4, 9), rng.randint(4, 9)
+    cells = rng.sample([(x, y) for x in range(width) for y in range(height)],
+                       rng.randint(3, 10))
+    k = rng.randint(1, 3)
+    with redirect_stdout(StringIO()):
+        return HospitalPlacement({"hospitals": cells[:k], "houses": cells[k:],
+                                  "height": height, "width": width}, **kwargs)
+
+
+def quietly(agent, percepts):
+    """ Utility function running an agent program without its progress output """
+    with redirect_stdout(StringIO()):
+        return agent.program(percepts)
+
+
+def random_states(rng:random.Random, n:int, hospitals:int) -> list[dict[str, list[tuple[int, int]] | int]]:
+    """ Utility function creating states of different sizes and house counts, as in PRESET_STATES
+
+    :param rng: random number generator choosing the size and locations
+    :param n: number of states
+    :param hospitals: number of hospitals in every state
+    """
+    states = []
+    for _ in range(n):
+        width, height = rng.randint(3, 12), rng.randint(3, 12)
+        cells = rng.sample([(x, y) for x in range(width) for y in range(height)],
+                           hospitals + rng.randint(1, min(15, width*height - hospitals)))
+        states.append({"hospitals": cells[:hospitals], "houses": cells[hospitals:],
+                       "width": width, "height": height})
+    return states
+
+
+@unittest.skipIf(linear_sum_assignment is None, "scipy is not installed")
+class TestCapacitatedAssignment(unittest.TestCase):
+    """ Tests for CapacitatedAssignment against scipy's linear_sum_assignment """
+    def instance(self, rng:np.random.Generator) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ Utility to create random houses, hospitals and capacities, enough for every house """
+        n, k = rng.integers(1, 50), rng.integers(1, 7)
+        capacity = rng.integers(1, 12, size=k)
+        while capacity.sum() < n:
+            capacity[rng.integers(k)] += 3
+        return rng.integers(0, 30, size=(n, 2)), rng.integers(0, 30, size=(k, 2)), capacity
+
+    def assertOptimal(self, assignment:np.ndarray, cost:np.ndarray, capacity:np.ndarray):
+        """ Utility to check an assignment respects capacities and has least total cost """
+        self.assertEqual(assignment.shape, (len(cost),))
+        self.assertTrue((np.bincount(assignment, minlength=len(capacity)) <= capacity).all())
+        self.assertEqual(cost[np.arange(len(cost)), assignment].sum(),
+                         capacitated_optimum(cost, capacity))
+
+    def test_against_scipy(self):
+        """ Least total distance, as found by scipy """
+        rng = np.random.default_rng(0)
+        for trial in range(100):
+            with self.subTest(trial=trial):
+                houses, hospitals, capacity = self.instance(rng)
+                cost = distance_matrix(houses, hospitals).astype(float)
+                self.assertOptimal(CapacitatedAssignment(capacity).solve(cost), cost, capacity)
+
+    def test_warm_start(self):
+        """ Optimal when started from the optimum before one hospital moved, or from any feasible assignment """
+        rng = np.random.default_rng(1)
+        for trial in range(100):
+            with self.subTest(trial=trial):
+                houses, hospitals, capacity = self.instance(rng)
+                solver = CapacitatedAssignment(capacity)
+                cost = distance_matrix(houses, hospitals).astype(float)
+                before = solver.solve(cost)
+
+                moved = hospitals.copy()
+                moved[rng.integers(len(moved))] += rng.choice([-1, 1]) * np.array([1, 0])
+                after = distance_matrix(houses, moved).astype(float)
+                self.assertOptimal(solver.solve(after, start=before), after, capacity)
+
+                feasible = np.repeat(np.arange(len(capacity)), capacity)[:len(houses)]
+                self.assertOptimal(solver.solve(cost, start=rng.permutation(feasible)), cost, capacity)
+
+    def test_infeasible_start(self):
+        """ A start over capacity is ignored """
+        cost = np.array([[1., 5.], [1., 5.], [5., 1.]])
+        solver = CapacitatedAssignment([1, 2])
+        self.assertOptimal(solver.solve(cost, start=np.array([0, 0, 0])), cost, np.array([1, 2]))
+
+    def test_unreachable(self):
+        """ Avoids inf costs whenever an assignment without them exists """
+        rng = np.random.default_rng(2)
+        for trial in range(100):
+            with self.subTest(trial=trial):
+                houses, hospitals, capacity = self.instance(rng)
+                cost = distance_matrix(houses, hospitals).astype(float)
+                cost[rng.random(cost.shape) < 0.3] = np.inf
+                solver = CapacitatedAssignment(capacity)
+                assignment = solver.solve(cost)
+                self.assertTrue((np.bincount(assignment, minlength=len(capacity)) <= capacity).all())
+                if capacitated_optimum(cost, capacity) is not None:
+                    self.assertOptimal(assignment, cost, capacity)
+                    self.assertOptimal(solver.solve(cost, start=assignment), cost, capacity)
+
+    def test_unreachable_small(self):
+        """ A house that cannot reach its nearest hospital goes to the other """
+        cost = np.array([[1., np.inf], [np.inf, 2.], [3., 4.]])
+        self.assertEqual(CapacitatedAssignment([2, 1]).solve(cost).tolist(), [0, 1, 0])
+
+
+class TestParetoArchive(unittest.TestCase):
+    """ Tests for ParetoArchive """
+    def test_against_brute_force(self):
+        """ Holds exactly the non-dominated points, added one at a time or in batches """
+        rng = np.random.default_rng(1)
+        for trial in range(100):
+            with self.subTest(trial=trial):
+                points = rng.integers(0, 8, size=(rng.integers(1, 60), rng.integers(2, 4))).astype(float)
+                order = rng.permutation(len(points))
+                archive = ParetoArchive(size=1000)
+                if trial % 2:
+                    archive.update(points[order], list(order))
+                else:
+                    for i in order: archive.add(points[i], i)
+                expected = {tuple(p) for p in points if not any(dominates(q, p) for q in points)}
+                self.assertEqual({tuple(point) for point, _ in archive}, expected)
+                self.assertEqual(len(archive), len(expected))
+                for point, i in archive:
+                    self.assertEqual(tuple(point), tuple(points[i]))
+
+    def test_non_dominated(self):
+        """ Marks each distinct non-dominated point once """
+        points = np.array([[1, 2], [2, 1], [1, 2], [2, 2], [0, 3]])
+        self.assertEqual(non_dominated(points).tolist(), [True, True, False, False, True])
+
+    def spread(self, archive:ParetoArchive) -> list[int]:
+        """ Utility giving the sorted items of an archive """
+        return sorted(item for _, item in archive)
+
+    def assertEven(self, kept:list[int], first:int, last:int, size:int):
+        """ Utility to check kept points include both ends with gaps near even """
+        self.assertEqual(len(kept), size)
+        self.assertEqual((kept[0], kept[-1]), (first, last))
+        even = (last - first) / (size - 1)
+        for a, b in zip(kept, kept[1:]):
+            self.assertLessEqual(abs((b - a) - even), 1, f"uneven spread {kept}")
+
+    def test_prune_added(self):
+        """ Points added one at a time along a front are pruned to an even spread """
+        archive = ParetoArchive(size=5)
+        for x in range(11):
+            archive.add([x, 10 - x], x)
+        self.assertEven(self.spread(archive), 0, 10, 5)
+
+    def test_prune_batch(self):
+        """ Pruning a full archive at once keeps an even spread """
+        for n, size in ((11, 5), (20, 5), (17, 5), (9, 3)):
+            with self.subTest(n=n, size=size):
+                self.assertEven(self.pruned(n, size), 0, n - 1, size)
+
+    def test_prune_gaps(self):
+        """ Pruned points are at least half as far apart as the most even spread """
+        for n in range(3, 40):
+            for size in range(2, n):
+                with self.subTest(n=n, size=size):
+                    kept = self.pruned(n, size)
+                    self.assertEqual((kept[0], kept[-1], len(kept)), (0, n - 1, size))
+                    self.assertGreaterEqual(min(np.diff(kept)), (n - 1) // (size - 1) / 2)
+
+    def pruned(self, n:int, size:int) -> list[int]:
+        """ Utility to prune n evenly spaced points along a front at once """
+        archive = ParetoArchive(size=n)
+        archive.update(np.array([[x, n - 1 - x] for x in range(n)]), list(range(n)))
+        archive.size = size
+        archive.prune()
+        return self.spread(archive)
+
+    def test_prune_keeps_best(self):
+        """ The best point in each objective is kept, and items stay with their points """
+        rng = np.random.default_rng(2)
+        for trial in range(20):
+            with self.subTest(trial=trial):
+                points = rng.random((200, 3))
+                archive = ParetoArchive(size=10)
+                archive.update(points, list(range(len(points))))
+                self.assertLessEqual(len(archive), 10)
+                front = points[non_dominated(points)]
+                kept = np.array([point for point, _ in archive])
+                self.assertTrue(np.allclose(kept.min(axis=0), front.min(axis=0)))
+                for point, i in archive:
+                    self.assertTrue(np.array_equal(point, points[i]))
+
+
+def read_table(table:TranspositionTable, keys:list[int]) -> list:
+    """ Utility function reading keys from a table, then storing their negations, in a worker process """
+    entries = [table.get(key) for key in keys]
+    for key, entry in zip(keys, entries):
+        if entry is not None: table[key] = (-entry[0], entry[1])
+    table.close()
+    return entries
+
+
+class TestLocalSearch(unittest.TestCase):
+    """ Tests for the Week 4 hill climbing strategies and tabu search """
+    @classmethod
+    def setUpClass(cls):
+        cls.week4 = load_week4()
+
+    def test_unknown_strategy(self):
+        """ Unknown hill climbing strategies are rejected """
+        with self.assertRaises(ValueError):
+            self.week4.HillClimbOptimiser("random")
+
+    def test_strategies(self):
+        """ Steepest moves to the best neighbour, first to any improving one, both stop at local optima """
+        rng = random.Random(0)
+        for trial in range(40):
+            with self.subTest(trial=trial):
+                environment = random_placement(rng, jump=rng.randint(1, 2), swaps=trial % 2 == 1)
+                state, neighbours = environment.state, environment.neighbours
+                steepest = self.week4.HillClimbOptimiser("steepest")
+                first = self.week4.HillClimbOptimiser("first")
+                current = steepest.utility(state)
+                best = max(steepest.utility(n) for n in neighbours)
+
+                command, choice = quietly(steepest, (state, neighbours))
+                if best > current:
+                    self.assertEqual(command, "explore")
+                    self.assertEqual(steepest.utility(choice), best)
+                else:
+                    self.assertEqual((command, choice), ("done", None))
+
+                command, choice = quietly(first, (state, neighbours))
+                self.assertEqual(command, "explore" if best > current else "done")
+                if choice is not None:
+                    self.assertIn(choice, neighbours)
+                    self.assertGreater(first.utility(choice), current)
+
+    def test_first_improvement_converges(self):
+        """ First improvement only ever improves, and finishes at a local optimum """
+        rng = random.Random(1)
+        for trial in range(10):
+            with self.subTest(trial=trial):
+                environment = random_placement(rng)
+                agent = self.week4.HillClimbOptimiser("first")
+                objective = agent.utility(environment.state)
+                while True:
+                    command, choice = quietly(agent, environment.percept(agent))
+                    if command == "done": break
+                    self.assertGreater(agent.utility(choice), objective)
+                    objective = agent.utility(choice)
+                    with redirect_stdout(StringIO()):
+                        agent.explore(choice)
+                    environment.refresh()
+                self.assertTrue(all(agent.utility(n) <= objective for n in environment.neighbours))
+
+    def test_tabu_tenure(self):
+        """ Recently visited layouts are skipped, and only the last `tenure` are kept """
+        environment = random_placement(random.Random(2))
+        agent = self.week4.TabuSearchOptimiser(tenure=3)
+        state, neighbours = environment.state, environment.neighbours
+        ranked = sorted(neighbours, key=agent.utility, reverse=True)
+        agent.best_utility = agent.utility(ranked[0])  # no aspiration
+        agent.tabu.extend(agent.layout(n) for n in ranked[:2])
+
+        command, choice = quietly(agent, (state, neighbours))
+        self.assertEqual(command, "explore")
+        self.assertEqual(agent.utility(choice), agent.utility(ranked[2]))
+        self.assertNotIn(agent.layout(choice), list(agent.tabu)[:2])
+        self.assertEqual(list(agent.tabu), [agent.layout(n) for n in ranked[:2]] + [agent.layout(state)])
+
+        quietly(agent, (choice, environment.neighbours))
+        self.assertEqual(len(agent.tabu), 3)
+        self.assertNotIn(agent.layout(ranked[0]), agent.tabu)
+
+    def test_tabu_aspiration(self):
+        """ A tabu layout is allowed if it beats the best found so far """
+        rng = random.Random(3)
+        for trial in range(20):
+            with self.subTest(trial=trial):
+                environment = random_placement(rng)
+                agent = self.week4.TabuSearchOptimiser()
+                state, neighbours = environment.state, environment.neighbours
+                best = max(neighbours, key=agent.utility)
+                if agent.utility(best) <= agent.utility(state): continue
+                agent.tabu.extend(agent.layout(n) for n in neighbours)
+
+                command, choice = quietly(agent, (state, neighbours))
+                self.assertEqual(command, "explore")
+                self.assertEqual(agent.utility(choice), agent.utility(best))
+
+    def test_tabu_patience(self):
+        """ Finishes on the best layout after `patience` steps without a new best """
+        environment = random_placement(random.Random(4))
+        agent = self.week4.TabuSearchOptimiser(patience=3)
+        best = environment.state
+        agent.best, agent.best_utility = best, agent.utility(best) + 1
+        for step in range(3):
+            command, choice = quietly(agent, (environment.state, environment.neighbours))
+        self.assertEqual((command, choice), ("done", best))
+
+
+class TestBatchHospitalPlacement(unittest.TestCase):
+    """ Tests for BatchHospitalPlacement against full recomputation and the scalar environment """
+    def objective(self, hospitals:list, houses:list, objective:str) -> int:
+        """ Utility giving the total or worst-case distance from each house to its nearest hospital """
+        nearest = [min(abs(x - i) + abs(y - j) for i, j in hospitals) for x, y in houses]
+        return sum(nearest) if objective == "sum" else max(nearest)
+
+    def test_score(self):
+        """ Scores of every candidate move equal the objective recomputed after the move """
+        rng = random.Random(5)
+        for objective in ("sum", "max"):
+            for trial in range(30):
+                with self.subTest(objective=objective, trial=trial):
+                    states = random_states(rng, rng.randint(1, 6), rng.randint(1, 4))
+                    batch = BatchHospitalPlacement.from_states(states, objective=objective)
+                    index, locations, _ = batch.neighbours()
+                    scores = batch.score(index, locations)
+                    for b, state in enumerate(states):
+                        self.assertEqual(batch.objectives[b],
+                                         self.objective(state["hospitals"], state["houses"], objective))
+                        for c, h in enumerate(index):
+                            hospitals = list(state["hospitals"])
+                            hospitals[h] = tuple(locations[b, c])
+                            self.assertEqual(scores[b, c],
+                                             self.objective(hospitals, state["houses"], objective))
+
+    def hill_climb(self, state:dict, objective:str) -> list[tuple[int, int]]:
+        """ Utility running steepest ascent in HospitalPlacement, giving the final hospital locations """
+        agent = HospitalOptimiser()
+        if objective == "max":  # plain worst-case distance, as in the batch
+            agent.utility = lambda state: -self.objective(
+                list(state["hospitals"].values()), list(state["houses"].values()), "max")
+        with redirect_stdout(StringIO()):
+            environment = HospitalPlacement(state)
+            while True:
+                current = agent.utility(environment.state)
+                best = max(environment.neighbours, key=agent.utility, default=None)
+                if best is None or agent.utility(best) <= current: break
+                agent.explore(best)
+                environment.refresh()
+        return list(environment.state["hospitals"].values())
+
+    def test_run(self):
+        """ Each preset ends where steepest ascent in HospitalPlacement does """
+        presets = [state for state in PRESET_STATES.values() if state and "hospitals" in state]
+        for objective in ("sum", "max"):
+            for state in presets:
+                with self.subTest(objective=objective, hospitals=len(state["hospitals"])):
+                    batch = BatchHospitalPlacement.from_states([state], objective=objective)
+                    batch.run(1000)
+                    self.assertTrue(batch.is_done)
+                    self.assertEqual([tuple(h) for h in batch.hospitals[0].tolist()],
+                                     self.hill_climb(state, objective))
+
+    def test_run_mixed(self):
+        """ Instances of different sizes batched together end as when run alone """
+        rng = random.Random(6)
+        for objective in ("sum", "max"):
+            for trial in range(10):
+                with self.subTest(objective=objective, trial=trial):
+                    states = random_states(rng, 5, rng.randint(1, 3))
+                    batch = BatchHospitalPlacement.from_states(states, objective=objective)
+                    final = batch.run(1000)
+                    for b, state in enumerate(states):
+                        alone = BatchHospitalPlacement.from_states([state], objective=objective)
+                        self.assertEqual(alone.run(1000)[0], final[b])
+                        self.assertTrue(np.array_equal(alone.hospitals[0], batch.hospitals[b]))
+
+
+def breadth_first(blocked:np.ndarray, source:tuple[int, int]) -> np.ndarray:
+    """ Utility function giving travel distances from a cell by plain breadth first search
+
+    :param blocked: (width, height) boolean array, True where impassable
+    :param source: (x, y) cell to search from
+    :return: (width, height) float array of distances, inf where unreachable or blocked
+    """
+    dist = np.full(blocked.shape, np.inf)
+    if blocked[source]: return dist
+    dist[source] = 0
+    queue = deque([source])
+    while queue:
+        x, y = queue.popleft()
+        for a, b in ((x+1, y), (x-1, y), (x, y+1), (x, y-1)):
+            if 0 <= a < blocked.shape[0] and 0 <= b < blocked.shape[1] \
+                    and not blocked[a, b] and dist[a, b] == np.inf:
+                dist[a, b] = dist[x, y] + 1
+                queue.append((a, b))
+    return dist
+
+
+class TestTravelDistances(unittest.TestCase):
+    """ Tests for distance_field and TravelDistances """
+    def test_open_grid(self):
+        """ Without obstacles, distances are Manhattan distances to the nearest source """
+        rng = np.random.default_rng(7)
+        for trial in range(20):
+            with self.subTest(trial=trial):
+                width, height = rng.integers(1, 15, size=2)
+                sources = np.column_stack([rng.integers(0, width, 3), rng.integers(0, height, 3)])
+                cells = np.array([(x, y) for x in range(width) for y in range(height)])
+                expected = distance_matrix(cells, sources).min(axis=1).reshape(width, height)
+                field = distance_field(np.zeros((width, height), dtype=bool), sources)
+                self.assertTrue(np.array_equal(field, expected))
+
+    def test_wall(self):
+        """ Travel goes around a wall, and enclosed or blocked cells are unreachable """
+        blocked = np.zeros((7, 5), dtype=bool)
+        blocked[3, :4] = True  # wall with a gap at y = 4
+        blocked[5, 0:3] = blocked[6, 2] = True  # (6, 0) and (6, 1) enclosed
+        field = distance_field(blocked, np.array([(0, 0)]))
+        self.assertEqual(field[2, 0], 2)
+        self.assertEqual(field[4, 0], 4 + 4 + 4)  # up to the gap, across and down, not 4
+        self.assertTrue(np.isinf(field[6, 0]) and np.isinf(field[6, 1]))
+        self.assertTrue(np.isinf(field[blocked]).all())
+        self.assertTrue(np.array_equal(field, breadth_first(blocked, (0, 0))))
+
+    def test_random_obstacles(self):
+        """ Same as breadth first search from each source, taking the nearest """
+        rng = np.random.default_rng(8)
+        for trial in range(30):
+            with self.subTest(trial=trial):
+                blocked = rng.random(tuple(rng.integers(1, 12, size=2))) < 0.3
+                sources = np.column_stack([rng.integers(0, blocked.shape[0], 2),
+                                           rng.integers(0, blocked.shape[1], 2)])
+                expected = np.minimum(*(breadth_first(blocked, tuple(s)) for s in sources))
+                self.assertTrue(np.array_equal(distance_field(blocked, sources), expected))
+
+    def test_eviction(self):
+        """ Totals stay correct when each hospital cell's distances are evicted in turn """
+        rng = np.random.default_rng(9)
+        blocked = rng.random((10, 8)) < 0.2
+        free = np.argwhere(~blocked)
+        houses = free[rng.choice(len(free), 12, replace=False)]
+        cached, evicting = TravelDistances(blocked, houses), TravelDistances(blocked, houses, maxsize=1)
+        for trial in range(30):
+            with self.subTest(trial=trial):
+                hospitals = free[rng.choice(len(free), 3, replace=False)]
+                fields = [breadth_first(blocked, tuple(h)) for h in hospitals]
+                nearest = np.min([f[houses[:, 0], houses[:, 1]] for f in fields], axis=0)
+                expected = nearest.sum() if np.isfinite(nearest).all() else np.inf
+                self.assertEqual(evicting.total(hospitals), expected)
+                self.assertEqual(evicting.total(hospitals[::-1]), expected)
+                self.assertEqual(cached.total(hospitals), expected)
+                self.assertLessEqual(len(evicting._from), 1)
+
+
+class TestMaxDistance(unittest.TestCase):
+    """ Tests for BottleneckTracker and KCenterOptimiser against full recomputation """
+    def test_tracker(self):
+        """ Evaluated and committed moves give the worst-case distance recomputed from scratch """
+        rng = np.random.default_rng(10)
+        for trial in range(50):
+            with self.subTest(trial=trial):
+                houses = rng.integers(0, 20, size=(rng.integers(0, 30), 2))
+                hospitals = rng.integers(0, 20, size=(rng.integers(1, 5), 2))
+                tracker = BottleneckTracker(houses, hospitals)
+                for _ in range(20):
+                    i, location = rng.integers(len(hospitals)), tuple(rng.integers(0, 20, size=2))
+                    moved = hospitals.copy()
+                    moved[i] = location
+                    self.assertEqual(tracker.evaluate(i, location), max_distance(houses, moved))
+                    if rng.random() < 0.5:
+                        tracker.move(i, location)
+                        hospitals = moved
+                    self.assertEqual(tracker.value, max_distance(houses, hospitals))
+                    if len(houses):
+                        nearest = distance_matrix(houses, hospitals).min(axis=1)
+                        self.assertEqual(tracker.bottleneck.tolist(),
+                                         np.flatnonzero(nearest == nearest.max()).tolist())
+
+    def test_k_center(self):
+        """ Solved layouts are on free cells, at the smallest radius with a greedy cover """
+        rng = random.Random(11)
+        for trial in range(30):
+            with self.subTest(trial=trial):
+                environment = random_placement(rng)
+                agent, state = KCenterOptimiser(), environment.state
+                solved = agent.solve(state)
+                locations = list(solved.values())
+                self.assertEqual(len(set(locations)), len(locations))
+                self.assertFalse(set(locations) & set(state["houses"].values()))
+
+                houses = np.array(list(state["houses"].values()))
+                cells = np.array([(x, y) for x in range(environment.width)
+                                      for y in range(environment.height)
+                                          if (x, y) not in state["houses"].values()])
+                dist = distance_matrix(cells, houses)
+                radius = next(r for r in np.unique(dist)
+                                  if agent.cover(dist <= r, len(locations)) is not None)
+                self.assertLessEqual(max_distance(houses, np.array(locations)), radius)
+
+
+class TestKMedians(unittest.TestCase):
+    """ Tests for KMediansOptimiser """
+    def test_converges(self):
+        """ Total distance never increases, and the final layout is a fixed point """
+        rng = random.Random(12)
+        for trial in range(30):
+            with self.subTest(trial=trial):
+                environment = random_placement(rng)
+                agent = KMediansOptimiser(seeding=trial % 2 == 0, seed=trial)
+                environment.add_agent(agent)
+                objective = HospitalOptimiser().utility
+                totals = [objective(environment.state)]
+                with redirect_stdout(StringIO()):
+                    for _ in range(100):
+                        if environment.is_done: break
+                        environment.step()
+                        environment.refresh()
+                        totals.append(objective(environment.state))
+                    self.assertTrue(environment.is_done)
+                    self.assertEqual(agent.program(environment.percept(agent)), ("done", None))
+                    centres = np.array(list(environment.state["hospitals"].values()))
+                    houses = np.array(list(environment.state["houses"].values())).reshape(-1, 2)
+                    step = agent.snap(agent.update(houses, centres), houses, environment.state["bounds"])
+                self.assertGreaterEqual(distance_matrix(houses, step).min(axis=1).sum(), -totals[-1])
+                self.assertEqual(totals, sorted(totals))
+
+    def test_seeding_gated(self):
+        """ A seeded layout worse than the current one is not explored """
+        with redirect_stdout(StringIO()):
+            environment = HospitalPlacement({"hospitals": [(1, 1), (7, 1)], "houses": [(0, 1), (2, 1), (6, 1), (8, 1)],
+                                             "width": 9, "height": 3})
+        for seed in range(20):
+            agent = KMediansOptimiser(seed=seed)
+            self.assertEqual(quietly(agent, environment.percept(agent)), ("done", None))
+            self.assertTrue(agent.seeded)
+
+
+class TestHospitalPlacementCache(unittest.TestCase):
+    """ Tests for the version, state and occupied caches of HospitalPlacement """
+    def assertInSync(self, environment:HospitalPlacement):
+        """ Utility to check cached state and occupied match the things in the environment """
+        self.assertEqual(environment.state["hospitals"],
+                         {hospital: hospital.location for hospital in environment.hospitals})
+        self.assertEqual(environment.occupied,
+                         {thing.location for thing in environment.hospitals + environment.houses})
+
+    def test_direct_moves(self):
+        """ Setting a hospital location then refreshing bumps the version, and caches follow """
+        rng = random.Random(13)
+        environment = random_placement(rng)
+        for trial in range(30):
+            with self.subTest(trial=trial):
+                version = environment.refresh()
+                self.assertEqual(environment.refresh(), version)  # nothing moved
+                free = [(x, y) for x in range(environment.width)
+                            for y in range(environment.height) if (x, y) not in environment.occupied]
+                hospital = rng.choice(environment.hospitals)
+                hospital.location = rng.choice(free)
+                self.assertEqual(environment.refresh(), version + 1)
+                self.assertInSync(environment)
+
+                hospital.location = hospital.location  # same locations, no new version
+                self.assertEqual(environment.refresh(), version + 1)
+
+    def test_cached_reads(self):
+        """ Reading state or occupied after a direct move refreshes them without an explicit refresh """
+        environment = random_placement(random.Random(14))
+        before = environment.state
+        hospital = environment.hospitals[0]
+        old = hospital.location
+        free = next((x, y) for x in range(environment.width)
+                        for y in range(environment.height) if (x, y) not in environment.occupied)
+        hospital.location = free
+        self.assertIn(free, environment.occupied)
+        self.assertNotIn(old, environment.occupied)
+        self.assertIsNot(environment.state, before)
+        self.assertInSync(environment)
+
+    def test_add_and_delete(self):
+        """ Adding or deleting things bumps the version and updates the caches """
+        environment = random_placement(random.Random(15))
+        for thing in (Hospital(), House()):
+            version = environment.refresh()
+            free = next((x, y) for x in range(environment.width)
+                            for y in range(environment.height) if (x, y) not in environment.occupied)
+            with redirect_stdout(StringIO()):
+                environment.add_thing(thing, free)
+            self.assertGreater(environment.refresh(), version)
+            self.assertIn(free, environment.occupied)
+            self.assertInSync(environment)
+
+            version = environment.refresh()
+            with redirect_stdout(StringIO()):
+                environment.delete_thing(thing)
+            self.assertGreater(environment.refresh(), version)
+            self.assertNotIn(free, environment.occupied)
+            self.assertInSync(environment)
+
+
+class RandomWalkAgent(ShortestPathAgent):
+    """ Shortest path agent exploring random neighbours, delivering at its target """
+    def explore(self, node):
+        self.location = node
+        self.visited.add(node)
+
+    def deliver(self, node):
+        return [node], 0
+
+    def program(self, percepts):
+        if self.at_goal: return ("deliver", self.location)
+        return ("explore", random.choice(percepts)[0])
+
+
+class TestTrajectory(unittest.TestCase):
+    """ Tests for TrajectoryRecorder and Trajectory round trips """
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "trajectory.bin")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def record(self, environment, snapshot, steps:int, seed:int = 0) -> list:
+        """ Utility to record a run, giving a snapshot of the environment after each step """
+        snapshots = []
+        with redirect_stdout(StringIO()), TrajectoryRecorder(environment, self.path, seed=seed) as recorder:
+            for _ in range(steps):
+                if environment.is_done: break
+                recorder.step()
+                snapshots.append(snapshot(environment))
+        return snapshots
+
+    def test_hospital_placement(self):
+        """ Restoring each record of a hospital placement run gives the state after that step """
+        week4 = load_week4()
+        def make():
+            with redirect_stdout(StringIO()):
+                environment = week4.HospitalPlacementEnv(PRESET_STATES["3"])
+                environment.add_agent(week4.SimulatedAnnealingOptimiser(num_steps=40))
+            return environment
+        locations = lambda environment: [hospital.location for hospital in environment.hospitals]
+
+        snapshots = self.record(make(), locations, 40, seed=1)
+        trajectory = Trajectory(self.path)
+        self.assertEqual(len(trajectory), len(snapshots))
+        self.assertEqual(trajectory.steps.tolist(), list(range(len(snapshots))))
+        replay = make()
+        for t, expected in enumerate(snapshots):
+            with self.subTest(t=t):
+                trajectory.restore(replay, t)
+                self.assertEqual(locations(replay), expected)
+                self.assertEqual(replay.state["hospitals"],
+                                 dict(zip(replay.hospitals, expected)))
+
+        os.remove(self.path)  # same seed, same run
+        self.assertEqual(self.record(make(), locations, 40, seed=1), snapshots)
+        self.assertTrue(np.array_equal(Trajectory(self.path).records, trajectory.records))
+
+    def test_shortest_path(self):
+        """ Restoring each record of a graph walk gives the agent's location and visited nodes """
+        graph = {"vertices": list("ABCDEFG"),
+                 "edges": [("A", "B"), ("A", "D"), ("B", "D"), ("B", "C"), ("D", "C"),
+                           ("C", "E"), ("C", "F"), ("E", "F"), ("F", "G")]}
+        def make():
+            environment = ShortestPathEnvironment.from_dict(graph)
+            agent = RandomWalkAgent()
+            with redirect_stdout(StringIO()):
+                environment.add_agent(agent, init="A", target="G")
+            return environment, agent
+        def snapshot(environment):
+            agent, = environment.agents
+            return agent.location.label, sorted(node.label for node in agent.visited)
+
+        environment, _ = make()
+        snapshots = self.record(environment, snapshot, 200, seed=2)
+        self.assertTrue(environment.is_done)
+        trajectory = Trajectory(self.path)
+        self.assertEqual([record.command for record in trajectory][-1], "deliver")
+        replay, agent = make()
+        for t, expected in enumerate(snapshots):
+            with self.subTest(t=t):
+                trajectory.restore(replay, t, [agent])
+                self.assertEqual(snapshot(replay), expected)
+
+
+class TestCheckpoint(unittest.TestCase):
+    """ Tests for resuming interrupted runs with CheckpointRunner """
+    @classmethod
+    def setUpClass(cls):
+        cls.week4 = load_week4()
+
+    def run_to_end(self, agent, interrupt:int | None = None) -> list[tuple[int, int]]:
+        """ Utility to run an optimiser for 60 steps, checkpointing every 10
+
+        :param agent: function creating the optimiser
+        :param interrupt: step at which the run is interrupted and resumed from its checkpoint, if any
+        :return: final hospital locations
+        """
+        with tempfile.TemporaryDirectory() as directory, redirect_stdout(StringIO()):
+            path = os.path.join(directory, "run.checkpoint")
+            random.seed(0)
+            np.random.seed(0)
+            environment = self.week4.HospitalPlacementEnv(PRESET_STATES["4"])
+            environment.add_agent(optimiser := agent())
+            if interrupt is not None:
+                calls, step = [], environment.step
+                def interrupted():
+                    calls.append(None)
+                    if len(calls) == interrupt: raise KeyboardInterrupt
+                    step()
+                environment.step = interrupted
+                with self.assertRaises(KeyboardInterrupt):
+                    CheckpointRunner(environment, optimiser, path, every=10).run(60)
+
+                random.seed(1)  # state is restored from the checkpoint
+                environment = environment_from_checkpoint(path, self.week4.HospitalPlacementEnv)
+                environment.add_agent(optimiser := agent())
+            stats = CheckpointRunner(environment, optimiser, path, every=10).run(60)
+            self.assertIsNotNone(stats["best"])
+            return [hospital.location for hospital in environment.hospitals]
+
+    def test_resume(self):
+        """ Simulated annealing and tabu search end as uninterrupted runs do """
+        optimisers = {
+            "annealing": lambda: self.week4.SimulatedAnnealingOptimiser(num_steps=60),
+            "tabu": lambda: self.week4.TabuSearchOptimiser(tenure=5, patience=100)}
+        for name, agent in optimisers.items():
+            expected = self.run_to_end(agent)
+            for interrupt in (11, 15, 37):  # after the checkpoint at step 10 or 30
+                with self.subTest(optimiser=name, interrupt=interrupt):
+                    self.assertEqual(self.run_to_end(agent, interrupt), expected)
+
+
+class TestPersistentCache(unittest.TestCase):
+    """ Tests for PersistentCache, code_namespace and MemoisedOptimiser """
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "memo.sqlite")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        """ Values, including None, are read back after closing and reopening """
+        values = {1: 2.5, "layout": None, b"key": [1, (2, 3)], 2**62: {"a": 1}}
+        with PersistentCache(self.path, "ns", batch=3) as cache:
+            for key, value in values.items():
+                cache[key] = value
+        with PersistentCache(self.path, "ns") as cache:
+            self.assertEqual(len(cache), len(values))
+            for key, value in values.items():
+                self.assertIn(key, cache)
+                self.assertEqual(cache[key], value)
+            self.assertNotIn(3, cache)
+            self.assertEqual(cache.get(3, "default"), "default")
+            with self.assertRaises(KeyError):
+                cache[3]
+        with PersistentCache(self.path, "other") as cache:
+            self.assertEqual(len(cache), 0)
+            self.assertNotIn(1, cache)
+
+    def test_eviction(self):
+        """ Over max_entries, the least recently used are evicted down to 90% """
+        with PersistentCache(self.path, max_entries=20, batch=1) as cache:
+            for key in range(20):
+                cache[key] = key
+            cache.get(0)  # recently used, so kept
+            cache[20] = 20
+            self.assertEqual(len(cache), 18)
+            self.assertEqual([key for key in range(21) if key not in cache], [1, 2, 3])
+
+    def test_version(self):
+        """ Files of another version are emptied on open """
+        with PersistentCache(self.path) as cache:
+            cache[1] = 1
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA user_version=0")
+        connection.close()
+        with PersistentCache(self.path) as cache:
+            self.assertEqual(len(cache), 0)
+
+    def write_agent(self, name:str, body:str) -> type:
+        """ Utility to load an agent class named Agent from a new module file with the given method body """
+        path = os.path.join(self.directory.name, f"{name}.py")
+        with open(path, "w") as file:
+            file.write(f"class Agent:\n    def utility(self, state):\n        {body}\n")
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module  # for inspect to find the source
+        self.addCleanup(sys.modules.pop, name)
+        spec.loader.exec_module(module)
+        return module.Agent
+
+    def test_code_namespace(self):
+        """ Namespaces change with the agent's code or settings, not otherwise """
+        first, same, edited = (self.write_agent("first", "return 1"),
+                               self.write_agent("same", "return 1"),
+                               self.write_agent("edited", "return 2"))
+        self.assertEqual(code_namespace(first), code_namespace(same()))
+        self.assertNotEqual(code_namespace(first), code_namespace(edited))
+        self.assertNotEqual(code_namespace(first, "sum"), code_namespace(first, "max"))
+        self.assertTrue(code_namespace(first).startswith("Agent:"))
+
+    def test_placement_key(self):
+        """ Keys ignore the order of things, and differ for different layouts """
+        environment = random_placement(random.Random(16))
+        state = environment.state
+        shuffled = state.copy()
+        shuffled["hospitals"] = dict(reversed(state["hospitals"].items()))
+        shuffled["houses"] = dict(reversed(state["houses"].items()))
+        self.assertEqual(placement_key(shuffled), placement_key(state))
+        for neighbour in environment.neighbours:
+            self.assertNotEqual(placement_key(neighbour), placement_key(state))
+
+    def test_memoised_optimiser(self):
+        """ Utilities are computed once, then read from the memo in later runs """
+        class Memoised(MemoisedOptimiser, HospitalOptimiser):
+            pass
+        environment = random_placement(random.Random(17))
+        states = [environment.state] + environment.neighbours
+        expected = [HospitalOptimiser().utility(state) for state in states]
+        self.assertEqual([Memoised().utility(state) for state in states], expected)  # no memo
+
+        for run in range(2):
+            with PersistentCache(self.path, code_namespace(Memoised)) as cache:
+                agent = Memoised()
+                agent.memo = cache
+                self.assertEqual([agent.utility(state) for state in states], expected)
+                self.assertEqual(cache.hits, len(states) if run else 0)
+
+
+class TestTranspositionTable(unittest.TestCase):
+    """ Tests for TranspositionTable, alone and with the assignment's minimax agent """
+    def setUp(self):
+        self.table = TranspositionTable(size=1 << 10)
+        self.addCleanup(self.table.__exit__)
+
+    def test_other_process(self):
+        """ A pickled table attaches to the same entries in another process """
+        entries = {key: (float(key % 7 - 3), key % 3) for key in range(1, 2**64, 2**57 + 12345)}
+        for key, entry in entries.items():
+            self.table[key] = entry
+        attached = pickle.loads(pickle.dumps(self.table))
+        self.assertEqual({key: attached.get(key) for key in entries}, entries)
+        attached.close()
+
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            read = pool.apply(read_table, (self.table, list(entries) + [2]))
+        self.assertEqual(read, list(entries.values()) + [None])
+        self.assertEqual({key: self.table[key] for key in entries},
+                         {key: (-value, kind) for key, (value, kind) in entries.items()})
+
+    def test_torn(self):
+        """ A slot whose words come from different writes reads as a miss """
+        self.table[5] = (1.0, EXACT)
+        i = next(i for i in self.table._indices(5) if self.table.words[i + 1])
+        self.table.words[i + 1] = self.table._pack(-1.0, LOWER)  # data of a second write only
+        self.assertNotIn(5, self.table)
+        self.assertIsNone(self.table.get(5))
+        with self.assertRaises(KeyError):
+            self.table[5]
+
+    def test_collision(self):
+        """ Keys sharing every slot overwrite each other, and are never read as each other """
+        table = TranspositionTable(size=4, probes=1)
+        self.addCleanup(table.__exit__)
+        start = table._indices(1)
+        other = next(key for key in range(2, 1000) if table._indices(key) == start)
+        table[1] = (1.0, EXACT)
+        table[other] = (2.0, UPPER)
+        self.assertEqual(table.get(other), (2.0, UPPER))
+        self.assertIsNone(table.get(1))
+        for key in range(1000):
+            if key != other: self.assertNotEqual(table.get(key), (2.0, UPPER))
+
+    def test_minimax(self):
+        """ The assignment's agent moves the same with a dictionary or a shared table """
+        from co2114.optimisation.adversarial import Tile, TicTacToeAgent
+        module = load_module_from_file(ASSIGNMENT_02)
+        class Player(module.AssignmentAgent02, TicTacToeAgent):
+            pass
+        def move(agent, cells:str) -> tuple[str, list]:
+            """ Cells after the agent moves, and the value of each move, from cells given row by row, . for empty """
+            state = [[Tile(None if cell == "." else cell) for cell in cells[i:i+3]] for i in (0, 3, 6)]
+            _, chosen = agent.program(state)
+            values = [agent.utility(("move", option)) for option in agent.moves(state)]
+            return "".join(tile.player or "." for row in chosen for tile in row), values
+
+        positions = [  # cells, player to move, whether it moved first
+            (".........", "X", "player"), ("....X....", "O", "opponent"),
+            ("X...O....", "X", "player"), ("X.O.X...O", "X", "player"),
+            ("O........", "X", "opponent"), ("O...X...O", "X", "opponent"),
+            ("XX.OO....", "O", "player"), (".X.O.X.O.", "O", "player")]
+        table = TranspositionTable(size=1 << 16)  # large enough to keep every position
+        self.addCleanup(table.__exit__)
+        for cells, player, first in positions:
+            with self.subTest(cells=cells, player=player, first=first):
+                agents = [Player(cache={}), Player(cache=table), Player(cache=table)]
+                for agent in agents:  # then a cold and a warm table
+                    agent.player, agent.first_move = player, first
+                expected = move(agents[0], cells)
+                self.assertEqual(expected[0].count("."), cells.count(".") - 1)
+                self.assertEqual(move(agents[1], cells), expected)
+                self.assertEqual(move(agents[2], cells), expected)
+        self.assertGreater(table.hits, 0)
+
+
+class TestTracer(unittest.TestCase):
+    """ Tests for Tracer on a Hospital Placement environment """
+    def traced(self, steps:int = 5, **kwargs) -> tuple[Tracer, HospitalPlacement, KMediansOptimiser]:
+        """ Utility to run KMedians with a tracer attached, until done
+
+        :param steps: max. number of steps to run
+        :param kwargs: kwargs for Tracer
+        :return: the detached tracer, the environment and the agent
+        """
+        environment = random_placement(random.Random(3))
+        agent = KMediansOptimiser(seed=0)
+        environment.add_agent(agent)
+        with Tracer(seed=0, **kwargs) as tracer, redirect_stdout(StringIO()):
+            tracer.attach(environment)
+            for _ in range(steps):
+                if environment.is_done: break
+                environment.step()
+        return tracer, environment, agent
+
+    def within(self, inner:dict, outer:dict) -> bool:
+        """ Utility to check one span lies within another """
+        return outer["ts"] <= inner["ts"] and \
+            inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+
+    def test_nesting(self):
+        """ Programs nest within steps, and utilities within programs """
+        tracer, _, _ = self.traced()
+        spans = {name: [event for event in tracer.events if event["name"] == name]
+                     for name in ("step", "KMediansOptimiser.program", "KMediansOptimiser.utility")}
+        steps, programs, utilities = spans.values()
+        self.assertEqual([event["args"]["step"] for event in steps], list(range(1, tracer.steps + 1)))
+        self.assertEqual(len(programs), len(steps))
+        self.assertGreaterEqual(len(utilities), 2*len(steps))  # current and proposed, each step
+        for program in programs:
+            self.assertEqual(sum(self.within(program, step) for step in steps), 1)
+        for utility in utilities:
+            self.assertEqual(sum(self.within(utility, program) for program in programs), 1)
+        self.assertEqual(tracer.summary()["step"]["count"], len(steps))
+
+    def test_unsampled(self):
+        """ Nothing within a step is recorded when no steps are sampled """
+        tracer, _, _ = self.traced(sample=0)
+        self.assertGreater(tracer.steps, 0)
+        self.assertEqual((tracer.events, tracer.dropped), ([], 0))
+        with self.assertRaises(ValueError):
+            Tracer(sample=1.5)
+
+    def test_max_events(self):
+        """ Spans beyond max_events are dropped and counted """
+        tracer, _, _ = self.traced(max_events=7)
+        full, _, _ = self.traced()
+        self.assertEqual(len(tracer.events), 7)
+        self.assertGreater(len(full.events), 7)
+        self.assertEqual(tracer.dropped, len(full.events) - 7)
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "trace.json"
+            tracer.export(path)
+            with open(path) as file:
+                self.assertEqual(json.load(file)["otherData"]["dropped"], tracer.dropped)
+
+    def test_detach(self):
+        """ Detaching restores attributes of instances and classes """
+        environment = random_placement(random.Random(4))
+        agent = KMediansOptimiser(seed=0)
+        environment.add_agent(agent)
+        neighbours = vars(HospitalPlacement)["neighbours"]
+        traced = {environment: ("step", "percept", "execute_action"), agent: ("program", "utility")}
+        before = {owner: {attribute: vars(owner).get(attribute) for attribute in attributes}
+                      for owner, attributes in traced.items()}
+        tracer = Tracer()
+        tracer.attach(environment, extra=[(HospitalPlacement, "neighbours")])
+        self.assertIsNot(vars(environment)["step"], before[environment].get("step"))
+        self.assertIsNot(vars(agent)["program"], before[agent].get("program"))
+        self.assertIn("utility", vars(agent))
+        self.assertIsNot(vars(HospitalPlacement)["neighbours"], neighbours)
+        with redirect_stdout(StringIO()):
+            environment.step()
+        self.assertIn("HospitalPlacement.neighbours", tracer.summary())
+        tracer.detach()
+        for owner, attributes in traced.items():
+            self.assertEqual({attribute: vars(owner).get(attribute) for attribute in attributes},
+                             before[owner])
+        self.assertIs(vars(HospitalPlacement)["neighbours"], neighbours)
+
+        tracer.wrap(KMediansOptimiser, "explore")  # inherited, so removed again on detach
+        self.assertIn("explore", vars(KMediansOptimiser))
+        tracer.detach()
+        self.assertNotIn("explore", vars(KMediansOptimiser))
+        self.assertIs(KMediansOptimiser.explore, HospitalOptimiser.explore)
+
+
+class TestFastEnvironmentApp(unittest.TestCase):
+    """ Tests for FastEnvironmentApp, with no display """
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+    def app(self, environment:HospitalPlacement, **kwargs) -> FastEnvironmentApp:
+        """ Utility to create an app quietly """
+        with redirect_stdout(StringIO()):
+            return FastEnvironmentApp(environment, **kwargs)
+
+    def test_snapshot(self):
+        """ One symbol per occupied tile, the same one wherever things share a tile """
+        with redirect_stdout(StringIO()):
+            environment = HospitalPlacement({"hospitals": [(1, 1), (3, 2)], "houses": [(0, 0), (4, 2)],
+                                             "width": 5, "height": 4})
+        environment.hospitals[1].location = (4, 2)  # moved onto the house
+        app = self.app(environment)
+        hospital, house = str(Hospital()), str(House())
+        self.assertEqual(app.snapshot(), {(1, 1): hospital, (0, 0): house,
+                                          (4, 2): min(hospital, house)})
+
+    def test_dirty(self):
+        """ Only tiles whose symbol changed are redrawn """
+        with redirect_stdout(StringIO()):
+            environment = HospitalPlacement({"hospitals": [(1, 1), (3, 2)], "houses": [(0, 0), (4, 3)],
+                                             "width": 5, "height": 4})
+        app = self.app(environment)
+        self.assertEqual(sorted(app.dirty(app.snapshot())), [(0, 0), (1, 1), (3, 2), (4, 3)])
+        app.redraw()
+        self.assertEqual((app.cells, app.frames), (app.snapshot(), 1))
+        self.assertEqual(app.dirty(app.snapshot()), [])
+
+        first, second = environment.hospitals
+        first.location = (2, 1)  # moved to an empty tile
+        second.location = (4, 3)  # moved onto a house, which is still drawn there
+        self.assertEqual(app.snapshot()[(4, 3)], min(str(Hospital()), str(House())))
+        self.assertEqual(sorted(app.dirty(app.snapshot())), [(1, 1), (2, 1), (3, 2)])
+        app.redraw()
+        self.assertEqual(app.dirty(app.snapshot()), [])
+
+        rng = random.Random(5)
+        for trial in range(20):  # against a full redraw of random moves
+            with self.subTest(trial=trial):
+                before = app.snapshot()
+                for hospital in environment.hospitals:
+                    if rng.random() < 0.5:
+                        hospital.location = (rng.randrange(5), rng.randrange(4))
+                after = app.snapshot()
+                changed = {location for location in before.keys() | after.keys()
+                               if before.get(location) != after.get(location)}
+                self.assertEqual(set(app.dirty(after)), changed)
+                app.redraw()
+
+    def test_run(self):
+        """ Runs to completion and closes, drawing frames as it goes """
+        environment = random_placement(random.Random(6))
+        agent = KMediansOptimiser(seed=0)
+        environment.add_agent(agent)
+        app = self.app(environment, steps=50, close_when_done=True)
+        with redirect_stdout(StringIO()):
+            app.run()
+        self.assertTrue(environment.is_done)
+        self.assertLessEqual(app.counter, 50)
+        self.assertGreater(app.frames, 1)
+        self.assertEqual(app.cells, app.snapshot())
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -1,10 +1,10 @@
 import unittest
-import importlib.util
-import sys
 from pathlib import Path
 
 from co2114_.search.graph import Agent, ShortestPathEnvironment
 
+from co2114_test_util import load_module_from_file
+
 
 # from template import AssignmentAgent01
 
@@ -24,11 +24,7 @@ def load_class_from_file(filepath:Path, class_name:str) -> type:
     :param filepath: Path to the file containing the class.
     :param class_name: Name of the class to load.
     """
-    spec = importlib.util.spec_from_file_location(filepath.stem, filepath)
-    module = importlib.util.module_from_spec(spec)
-    sys.modules[spec.name] = module
-    spec.loader.exec_module(module)
-    cls = getattr(module, class_name)
+    cls = getattr(load_module_from_file(filepath), class_name)
     return cls
 
 
@@ -1,6 +1,4 @@
 import unittest
-import importlib.util
-import sys
 from pathlib import Path
 from copy import deepcopy
 from typing import override
@@ -10,6 +8,8 @@ from co2114.optimisation.adversarial import (
     Tile, Board, is_terminal, State, Numeric,
     TicTacToeGame, TicTacToeAgent)
 
+from co2114_test_util import load_module_from_file
+
 global FILEPATH_AGENT
 
 def load_class_from_file(filepath:Path, class_name:str) -> type:
@@ -18,11 +18,7 @@ def load_class_from_file(filepath:Path, class_name:str) -> type:
     :param filepath: Path to the file containing the class.
     :param class_name: Name of the class to load.
     """
-    spec = importlib.util.spec_from_file_location(filepath.stem, filepath)
-    module = importlib.util.module_from_spec(spec)
-    sys.modules[spec.name] = module
-    spec.loader.exec_module(module)
-    cls = getattr(module, class_name)
+    cls = getattr(load_module_from_file(filepath), class_name)
     return cls
 
 def get_agent(instantiate=True) -> Agent | type[Agent]:
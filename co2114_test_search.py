@@ -0,0 +1,266 @@
+import heapq
+import math
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+from co2114.search.batch import many_to_many, one_to_many
+from co2114.search.graph import Graph, Node, ShortestPathEnvironment
+from co2114.search.grid import GridPathfinder, SQRT2
+from co2114.search.hierarchy import ContractionHierarchy
+from co2114.search.incremental import (
+    DynamicShortestPathEnvironment, IncrementalShortestPathAgent)
+
+
+def random_graph(n:int, edges:int, seed:int, weights:tuple[int, int] = (0, 9)) -> dict[str, Node]:
+    """ Utility function to build a connected random weighted graph
+
+    :param n: Number of nodes, labelled "0" to "n-1".
+    :param edges: Number of extra edges on top of a random spanning tree.
+    :param seed: Seed of the random number generator.
+    :param weights: Inclusive range of integer edge weights, may include 0.
+    :return: Mapping of labels to nodes.
+    """
+    rng = random.Random(seed)
+    nodes = {str(i): Node(str(i)) for i in range(n)}
+    for i in range(1, n):
+        nodes[str(i)].add_neighbour(nodes[str(rng.randrange(i))], rng.randint(*weights))
+    for _ in range(edges):
+        a, b = rng.sample(range(n), 2)
+        nodes[str(a)].add_neighbour(nodes[str(b)], rng.randint(*weights))
+    return nodes
+
+
+def dijkstra(source:Node) -> dict[Node, float]:
+    """ Utility function giving reference distances from a node to every node """
+    dist = {source: 0}
+    queue = [(0, id(source), source)]
+    while queue:
+        d, _, node = heapq.heappop(queue)
+        if d > dist[node]: continue
+        for neighbour in node.neighbours:
+            w = node.weights.get(neighbour)
+            nd = d + (1 if w is None else w)
+            if nd < dist.get(neighbour, math.inf):
+                dist[neighbour] = nd
+                heapq.heappush(queue, (nd, id(neighbour), neighbour))
+    return dist
+
+
+def path_length(path:list[Node]) -> float:
+    """ Utility function summing edge weights along a path """
+    return sum(1 if a.weights.get(b) is None else a.weights[b]
+               for a, b in zip(path, path[1:]))
+
+
+class TestIncrementalShortestPath(unittest.TestCase):
+    """ Tests for IncrementalShortestPathAgent """
+    def environment(self, nodes:dict[str, Node], init:str, target:str):
+        """ Utility to create an environment over nodes with an agent added """
+        environment = DynamicShortestPathEnvironment()
+        for node in nodes.values():
+            environment.add_node(node)
+        agent = IncrementalShortestPathAgent()
+        environment.add_agent(agent, init, target)
+        return environment, agent
+
+    def test_zero_weight_edge(self):
+        """ Delivers across a zero weight edge without looping """
+        nodes = {label: Node(label) for label in "sabt"}
+        nodes["s"].add_neighbour(nodes["a"], 1)
+        nodes["a"].add_neighbour(nodes["b"], 0)
+        nodes["b"].add_neighbour(nodes["t"], 1)
+        _, agent = self.environment(nodes, "s", "t")
+        agent.replan()
+        path, distance = agent.deliver(nodes["t"])
+        self.assertEqual([node.label for node in path], ["s", "a", "b", "t"])
+        self.assertEqual(distance, 2)
+
+    def test_against_dijkstra(self):
+        """ Paths and distances match Dijkstra, before and after weight changes """
+        for seed in range(20):
+            with self.subTest(seed=seed):
+                nodes = random_graph(30, 30, seed)
+                environment, agent = self.environment(nodes, "0", "29")
+                rng = random.Random(seed)
+                for change in range(4):
+                    agent.replan()
+                    path, distance = agent.deliver(nodes["29"])
+                    self.assertEqual(distance, dijkstra(nodes["0"])[nodes["29"]])
+                    self.assertEqual(path_length(path), distance)
+                    self.assertIs(path[0], nodes["0"])
+                    self.assertIs(path[-1], nodes["29"])
+                    a = nodes[str(rng.randrange(30))]
+                    b = rng.choice(sorted(a.neighbours, key=lambda node: node.label))
+                    environment.set_weight(a, b, rng.randint(0, 9))
+
+
+class TestManyToMany(unittest.TestCase):
+    """ Tests for many_to_many and one_to_many against Dijkstra's algorithm """
+    def environment(self, seed:int) -> tuple[ShortestPathEnvironment, dict[str, Node]]:
+        """ Utility to create an environment over a random graph, with an unreachable island """
+        nodes = random_graph(30, 20, seed, weights=(1, 9))
+        nodes["x"], nodes["y"] = Node("x"), Node("y")
+        nodes["x"].add_neighbour(nodes["y"], 2)
+        environment = ShortestPathEnvironment()
+        for node in nodes.values():
+            environment.add_node(node)
+        return environment, nodes
+
+    def test_against_dijkstra(self):
+        """ Distances match Dijkstra, with repeated sources and inf for unreachable targets """
+        for seed in range(20):
+            with self.subTest(seed=seed):
+                environment, nodes = self.environment(seed)
+                rng = random.Random(seed)
+                sources = rng.choices(list(nodes), k=8) + ["x", "x"]
+                targets = rng.sample(list(nodes), 10) + ["y"]
+                reference = {label: dijkstra(nodes[label]) for label in set(sources) | set(targets)}
+                expected = np.array([[reference[s].get(nodes[t], math.inf) for t in targets]
+                                         for s in sources])
+                self.assertTrue(np.array_equal(many_to_many(environment, sources, targets), expected))
+                for i, source in enumerate(sources):
+                    self.assertTrue(np.array_equal(
+                        one_to_many(environment, nodes[source], [nodes[t] for t in targets]), expected[i]))
+
+                halfway = lambda node, target: reference[target.label].get(node, math.inf) / 2
+                self.assertTrue(np.array_equal(  # a consistent heuristic finds the same distances
+                    many_to_many(environment, sources, targets, heuristic=halfway), expected))
+
+    def test_paths(self):
+        """ Delivered paths run from source to target with the delivered distance """
+        for seed in range(20):
+            with self.subTest(seed=seed):
+                environment, nodes = self.environment(seed)
+                rng = random.Random(seed)
+                sources = rng.choices(list(nodes), k=5) + ["x"]
+                targets = rng.sample(list(nodes), 8) + ["y"]
+                matrix = many_to_many(environment, sources, targets, paths=True)
+                for i, source in enumerate(sources):
+                    delivered = environment.shortest_path[nodes[source]]
+                    self.assertEqual(set(delivered), {nodes[t] for t in targets})
+                    for j, target in enumerate(targets):
+                        path, distance = delivered[nodes[target]]
+                        self.assertEqual(distance, matrix[i, j])
+                        if math.isinf(distance):
+                            self.assertEqual(path, [])
+                            continue
+                        self.assertEqual((path[0], path[-1]), (nodes[source], nodes[target]))
+                        self.assertTrue(all(b in a.neighbours for a, b in zip(path, path[1:])))
+                        self.assertEqual(path_length(path), distance)
+
+
+class TestContractionHierarchy(unittest.TestCase):
+    """ Tests for ContractionHierarchy """
+    def graph(self, nodes:dict[str, Node]) -> Graph:
+        """ Utility to create a graph of nodes """
+        graph = Graph()
+        for node in nodes.values():
+            graph.add_node(node)
+        return graph
+
+    def check(self, hierarchy:ContractionHierarchy, nodes:dict[str, Node], rng:random.Random):
+        """ Utility to compare random queries with Dijkstra """
+        for _ in range(30):
+            a, b = rng.sample(list(nodes.values()), 2)
+            expected = dijkstra(a).get(b, math.inf)
+            self.assertEqual(hierarchy.distance(a.label, b.label), expected)
+            path, distance = hierarchy.path(a, b)
+            self.assertEqual(distance, expected)
+            if expected == math.inf:
+                self.assertEqual(path, [])
+                continue
+            self.assertIs(path[0], a)
+            self.assertIs(path[-1], b)
+            for u, v in zip(path, path[1:]):
+                self.assertIn(v, u.neighbours)
+            self.assertEqual(path_length(path), expected)
+
+    def test_against_dijkstra(self):
+        """ Paths and distances match Dijkstra, before and after save and load """
+        for seed in range(10):
+            with self.subTest(seed=seed):
+                nodes = random_graph(60, 60, seed)
+                nodes["isolated"] = Node("isolated")
+                graph = self.graph(nodes)
+                hierarchy = ContractionHierarchy.build(graph)
+                self.check(hierarchy, nodes, random.Random(seed))
+                with tempfile.TemporaryDirectory() as directory:
+                    path = os.path.join(directory, "hierarchy.npz")
+                    hierarchy.save(path)
+                    loaded = ContractionHierarchy.load(path, graph)
+                self.assertEqual(loaded.labels, hierarchy.labels)
+                self.check(loaded, nodes, random.Random(seed))
+
+    def test_save_load_labels(self):
+        """ Int and tuple labels are kept by save and load, so the graph can be bound """
+        for labels in ([3, 1, 2, 10], [(0, 0), (0, 1), (1, 1), (1, 0)]):
+            with self.subTest(labels=labels):
+                nodes = [Node(label) for label in labels]
+                for a, b in zip(nodes, nodes[1:]):
+                    a.add_neighbour(b, 2)
+                graph = self.graph(dict(enumerate(nodes)))
+                with tempfile.TemporaryDirectory() as directory:
+                    path = os.path.join(directory, "hierarchy.npz")
+                    ContractionHierarchy.build(graph).save(path)
+                    loaded = ContractionHierarchy.load(path, graph)
+                self.assertEqual(sorted(loaded.labels), sorted(labels))
+                route, distance = loaded.path(nodes[0], nodes[-1])
+                self.assertEqual(route, nodes)
+                self.assertEqual(distance, 6)
+
+
+class TestGridPathfinder(unittest.TestCase):
+    """ Tests for GridPathfinder """
+    def check_path(self, blocked:np.ndarray, path:list[tuple[int, int]], cost:float):
+        """ Utility to check a path moves between free neighbours without cutting corners """
+        total = 0.
+        for (ax, ay), (bx, by) in zip(path, path[1:]):
+            dx, dy = bx - ax, by - ay
+            self.assertTrue(max(abs(dx), abs(dy)) == 1, f"{(ax, ay)} to {(bx, by)} is not a move")
+            self.assertFalse(blocked[bx, by])
+            if dx and dy:
+                self.assertFalse(blocked[ax + dx, ay] or blocked[ax, ay + dy],
+                                 f"{(ax, ay)} to {(bx, by)} cuts a corner")
+            total += SQRT2 if dx and dy else 1.
+        self.assertAlmostEqual(total, cost)
+
+    def test_jps_against_astar(self):
+        """ Jump point search finds paths as short as A*, without cutting corners """
+        rng = np.random.default_rng(0)
+        for trial in range(60):
+            with self.subTest(trial=trial):
+                width, height = rng.integers(5, 40, size=2)
+                blocked = rng.random((width, height)) < rng.uniform(0.1, 0.4)
+                free = np.argwhere(~blocked)
+                if len(free) < 2: continue
+                start, goal = (tuple(map(int, free[i])) for i in rng.choice(len(free), 2, replace=False))
+                pathfinder = GridPathfinder(blocked)
+                expected, cost = pathfinder.astar(start, goal)
+                path, jps_cost = pathfinder.jps(start, goal)
+                self.assertAlmostEqual(jps_cost, cost)
+                if cost == math.inf:
+                    self.assertEqual(path, [])
+                    continue
+                self.assertEqual((path[0], path[-1]), (start, goal))
+                self.check_path(blocked, expected, cost)
+                self.check_path(blocked, path, jps_cost)
+
+    def test_corner(self):
+        """ Does not squeeze through a diagonal gap between two blocked cells """
+        blocked = np.zeros((2, 2), dtype=bool)
+        blocked[0, 1] = blocked[1, 0] = True
+        for search in ("astar", "jps"):
+            self.assertEqual(getattr(GridPathfinder(blocked), search)((0, 0), (1, 1)), ([], math.inf))
+
+    def test_jps_needs_diagonal(self):
+        """ Jump point search is refused without diagonal moves """
+        with self.assertRaises(ValueError):
+            GridPathfinder(np.zeros((3, 3), dtype=bool), diagonal=False).jps((0, 0), (2, 2))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
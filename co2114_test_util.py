@@ -0,0 +1,23 @@
+import importlib.util
+import sys
+from pathlib import Path
+from types import ModuleType
+
+_MODULES: dict[Path, ModuleType] = {}  # modules already loaded, by file path
+
+def load_module_from_file(filepath:Path) -> ModuleType:
+    """ Utility function to load a module from a given file path, once
+
+    Later calls with the same file path return the module already loaded,
+    so tests do not re-execute the agent file every time they get an agent.
+
+    :param filepath: Path to the module file.
+    """
+    filepath = Path(filepath).resolve()
+    if filepath not in _MODULES:
+        spec = importlib.util.spec_from_file_location(filepath.stem, filepath)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = module
+        spec.loader.exec_module(module)
+        _MODULES[filepath] = module
+    return _MODULES[filepath]